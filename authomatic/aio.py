@@ -0,0 +1,750 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio
+-------
+
+Coroutine versions of the methods which make requests to **providers**.
+Unlike the :class:`.Future` based ``async_*`` methods, they don't need
+a thread for each call, so an :mod:`asyncio` application can keep
+thousands of them in flight at once.
+
+.. warning::
+
+    Requires Python 3.5 or newer.
+
+You should not need to use this module directly.
+Use the methods which return the coroutines instead:
+
+* :meth:`.Authomatic.access_async`
+* :meth:`.AuthorizationProvider.access_async`
+* :meth:`.Credentials.refresh_async`
+* :meth:`.User.update_async`
+
+::
+
+    response = await authomatic.access_async(credentials, url)
+    await credentials.refresh_async()
+    await user.update_async()
+
+The requests are made by a :class:`.StreamsTransport` which keeps the
+connections alive in an :class:`.AsyncConnectionPool`.
+
+.. autosummary::
+    :nosignatures:
+
+    StreamsTransport
+    AsyncConnectionPool
+
+"""
+
+import asyncio
+import collections
+import logging
+import re
+import ssl
+import threading
+import time
+
+from authomatic import cache, core, providers
+from authomatic.exceptions import (CredentialsError, FetchError,
+                                   FetchTimeoutError)
+from authomatic.pool import IDEMPOTENT_METHODS
+from authomatic.providers import oauth2
+from authomatic.six.moves import http_client
+from authomatic.six.moves import urllib_parse as parse
+from authomatic.transports import BufferedResponse, split_timeout
+
+
+__all__ = ['StreamsTransport', 'AsyncConnectionPool', 'fetch', 'access',
+           'refresh', 'update_user']
+
+# The same validation of the request as in http.client, which prevents
+# injection of headers and requests.
+_is_legal_header_name = re.compile(r'[^:\s][^:\r\n]*\Z').match
+_is_illegal_header_value = re.compile(r'\n(?![ \t])|\r(?![ \t\n])').search
+_contains_disallowed_url_char = re.compile('[\x00-\x20\x7f]').search
+
+
+class AsyncConnectionPool(object):
+    """
+    A pool of keep-alive :mod:`asyncio` stream connections keyed by
+    event loop, scheme and host.
+    """
+
+    def __init__(self, maxsize=10, idle_timeout=60, ssl_context=None):
+        """
+        :param int maxsize:
+            Maximum number of idle connections kept per host.
+
+        :param float idle_timeout:
+            Number of seconds after which an unused connection is evicted.
+
+        :param ssl_context:
+            :class:`ssl.SSLContext` used for ``https`` connections.
+            If ``None``, :func:`ssl.create_default_context` will be used.
+        """
+
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._idle = collections.defaultdict(collections.deque)
+        self._stats = dict(hits=0, misses=0, evictions=0, discards=0)
+
+    @property
+    def stats(self):
+        """
+        A :class:`dict` with the same pool statistics as
+        :attr:`.ConnectionPool.stats`.
+        """
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = sum(len(i) for i in self._idle.values())
+            return stats
+
+    @staticmethod
+    def _close(writer):
+        try:
+            writer.close()
+        except RuntimeError:
+            # The event loop of the connection has already been closed.
+            pass
+
+    def _evict(self, now):
+        """
+        Closes connections which have been idle for too long and drops
+        the connections of closed event loops, e.g. of :func:`asyncio.run`.
+        """
+
+        for key, idle in list(self._idle.items()):
+            closed = key[0].is_closed()
+            while idle and (closed or now - idle[0][2] > self.idle_timeout):
+                self._close(idle.popleft()[1])
+                self._stats['evictions'] += 1
+            if not idle:
+                del self._idle[key]
+
+    async def get(self, scheme, host):
+        """
+        Returns a connection for the host.
+
+        :param str scheme:
+            ``'http'`` or ``'https'``.
+
+        :param str host:
+            Host with an optional port.
+
+        :returns:
+            A ``(key, reader, writer, reused)`` tuple.
+        """
+
+        key = (asyncio.get_event_loop(), scheme.lower(), host)
+
+        with self._lock:
+            self._evict(time.time())
+            idle = self._idle[key]
+            while idle:
+                reader, writer, last_used = idle.pop()
+                if reader.at_eof() or writer.transport.is_closing():
+                    self._close(writer)
+                    self._stats['discards'] += 1
+                else:
+                    self._stats['hits'] += 1
+                    return key, reader, writer, True
+            self._stats['misses'] += 1
+
+        split = parse.urlsplit('//' + host)
+        if key[1] == 'https':
+            reader, writer = await asyncio.open_connection(
+                split.hostname, split.port or 443, ssl=self.ssl_context,
+                server_hostname=split.hostname)
+        else:
+            reader, writer = await asyncio.open_connection(
+                split.hostname, split.port or 80)
+
+        return key, reader, writer, False
+
+    def put(self, key, reader, writer):
+        """
+        Returns a connection to the pool.
+        """
+
+        with self._lock:
+            self._evict(time.time())
+            idle = self._idle[key]
+            if len(idle) >= self.maxsize:
+                self._close(writer)
+                self._stats['discards'] += 1
+            else:
+                idle.append((reader, writer, time.time()))
+
+    def discard(self, key, writer):
+        """
+        Closes a connection which can't be reused.
+        """
+
+        self._close(writer)
+        with self._lock:
+            self._stats['discards'] += 1
+
+    def clear(self):
+        """
+        Closes all idle connections.
+        """
+
+        with self._lock:
+            for idle in self._idle.values():
+                while idle:
+                    self._close(idle.pop()[1])
+            self._idle.clear()
+
+
+async def _read_chunked(reader):
+    """Reads a body with the chunked transfer encoding."""
+
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';')[0].strip(), 16)
+        if not size:
+            # Skip trailers.
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+async def _read_response(reader, method):
+    """
+    Reads a HTTP/1.x response.
+
+    :returns:
+        A ``(response, keep_alive)`` tuple where the response is
+        a :class:`.BufferedResponse`.
+    """
+
+    while True:
+        status_line = await reader.readline()
+        if not status_line:
+            raise http_client.BadStatusLine('Remote end closed connection '
+                                            'without response.')
+
+        try:
+            version, status, reason = (status_line.decode('latin-1')
+                                       .rstrip('\r\n').split(' ', 2) + [''])[:3]
+            status = int(status)
+        except ValueError:
+            raise http_client.BadStatusLine(status_line)
+
+        headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((name.strip(), value.strip()))
+
+        # Skip informational responses like 100 Continue.
+        if status >= 200:
+            break
+
+    lowered = dict((k.lower(), v.lower()) for k, v in headers)
+    connection = lowered.get('connection', '')
+    keep_alive = 'close' not in connection and \
+        (version == 'HTTP/1.1' or 'keep-alive' in connection)
+
+    if method == 'HEAD' or status in (204, 304):
+        body = b''
+    elif 'chunked' in lowered.get('transfer-encoding', ''):
+        body = await _read_chunked(reader)
+    elif 'content-length' in lowered:
+        body = await reader.readexactly(int(lowered['content-length']))
+    else:
+        # The body ends when the server closes the connection.
+        body = await reader.read()
+        keep_alive = False
+
+    response = BufferedResponse(status, reason, headers, body,
+                                11 if version == 'HTTP/1.1' else 10)
+    return response, keep_alive
+
+
+class StreamsTransport(object):
+    """
+    A HTTP/1.1 transport based on :mod:`asyncio` streams.
+
+    It has the same interface as :class:`.BaseTransport`, except that the
+    :meth:`.request` method is a coroutine, which reads the whole response.
+    """
+
+    def __init__(self, pool=None):
+        """
+        :param pool:
+            An :class:`.AsyncConnectionPool` instance.
+            If ``None``, a pool with default settings will be created.
+        """
+
+        #: The :class:`.AsyncConnectionPool` used by the transport.
+        self.pool = pool or AsyncConnectionPool()
+
+    @staticmethod
+    def _host(split):
+        """
+        Returns the host with the port of a split URL without the user info.
+        """
+
+        host = split.hostname or ''
+        if _contains_disallowed_url_char(host):
+            raise http_client.InvalidURL("Host can't contain control "
+                                         "characters. {0!r}".format(host))
+        if ':' in host:
+            host = '[{0}]'.format(host)
+        if split.port:
+            host = '{0}:{1}'.format(host, split.port)
+        return host
+
+    @staticmethod
+    def _head(method, host, path, body, headers):
+        """Serializes the request line and headers."""
+
+        if _contains_disallowed_url_char(method):
+            raise ValueError("Method can't contain control characters. "
+                             "{0!r}".format(method))
+        if _contains_disallowed_url_char(path):
+            raise http_client.InvalidURL("URL can't contain control "
+                                         "characters. {0!r}".format(path))
+
+        lines = ['{0} {1} HTTP/1.1'.format(method, path)]
+        names = set(k.lower() for k in headers)
+
+        if 'host' not in names:
+            lines.append('Host: {0}'.format(host))
+
+        for name, value in headers.items():
+            value = str(value)
+            if not _is_legal_header_name(name):
+                raise ValueError('Invalid header name {0!r}'.format(name))
+            if _is_illegal_header_value(value):
+                raise ValueError('Invalid header value {0!r}'.format(value))
+            lines.append('{0}: {1}'.format(name, value))
+
+        if 'content-length' not in names and \
+                (body or method in ('POST', 'PUT', 'PATCH')):
+            lines.append('Content-Length: {0}'.format(len(body)))
+
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def request(self, method, url, body=None, headers=None,
+                      timeout=None):
+        """
+        Sends the request and reads the response.
+
+        :param str method:
+            HTTP method of the request.
+
+        :param str url:
+            Absolute URL of the request including the query string.
+
+        :param str body:
+            Body of the request.
+
+        :param dict headers:
+            HTTP headers of the request.
+
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple, see
+            :func:`.split_timeout`. The read timeout applies to reading
+            of the whole response.
+
+        :returns:
+            :class:`.BufferedResponse`
+        """
+
+        split = parse.urlsplit(url)
+        path = parse.urlunsplit(('', '', split.path or '/', split.query, ''))
+        scheme, host = split.scheme, self._host(split)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        body = body or b''
+        head = self._head(method, host, path, body, headers or {})
+        connect_timeout, read_timeout = split_timeout(timeout)
+
+        while True:
+            key, reader, writer, reused = await asyncio.wait_for(
+                self.pool.get(scheme, host), connect_timeout)
+            try:
+                writer.write(head + body)
+                await writer.drain()
+                response, keep_alive = await asyncio.wait_for(
+                    _read_response(reader, method), read_timeout)
+            except asyncio.TimeoutError:
+                self.pool.discard(key, writer)
+                raise
+            except (OSError, asyncio.IncompleteReadError,
+                    http_client.HTTPException):
+                self.pool.discard(key, writer)
+                if reused and method in IDEMPOTENT_METHODS:
+                    continue
+                raise
+            except BaseException:
+                # E.g. cancellation in the middle of the response.
+                self.pool.discard(key, writer)
+                raise
+
+            if keep_alive:
+                self.pool.put(key, reader, writer)
+            else:
+                self.pool.discard(key, writer)
+
+            return response
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+
+        self.pool.clear()
+
+
+# Used when there is no Authomatic instance to get the transport from.
+_default_transport = None
+
+
+def _get_transport(settings):
+    """
+    Returns the asyncio transport of an :class:`.Authomatic` instance
+    and creates it if necessary.
+    """
+
+    global _default_transport
+
+    if isinstance(settings, core.Authomatic):
+        if settings.async_transport is None:
+            settings.async_transport = StreamsTransport(
+                AsyncConnectionPool(ssl_context=settings.ssl_context))
+        return settings.async_transport
+
+    if _default_transport is None:
+        _default_transport = StreamsTransport()
+    return _default_transport
+
+
+async def _send(provider, transport, method, url, body, headers, timeout,
+                expires, retry=None):
+    """
+    Coroutine version of :meth:`.BaseProvider._send`.
+    """
+
+    policy = provider.retry_policy
+    retriable = policy is not None and policy.allows(method, retry)
+    if retriable:
+        policy.start()
+
+    attempt = 0
+    while True:
+        remaining = None if expires is None else expires - time.time()
+        if remaining is not None and remaining <= 0:
+            raise FetchTimeoutError('Deadline exceeded!', url=url)
+
+        response = error = None
+        try:
+            response = await transport.request(
+                method, url, body, headers,
+                timeout=providers._request_timeout(timeout, remaining))
+        except Exception as e:
+            error = e
+
+        if retriable and attempt < policy.total and \
+                policy.is_retryable(response, error):
+            delay = policy.delay(attempt, response)
+            if delay is not None and \
+                    (remaining is None or delay < remaining) and \
+                    policy.acquire():
+                provider._log(logging.INFO,
+                              u'Retrying {0} in {1:.2f} seconds.'
+                              .format(url, delay))
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+        if error is not None:
+            raise providers._fetch_error(error, url)
+
+        return response
+
+
+async def fetch(provider, url, method='GET', params=None, headers=None,
+                body='', max_redirects=5, content_parser=None, timeout=None,
+                deadline=None, retry=None, rate_limit=False):
+    """
+    Coroutine version of :meth:`.BaseProvider._fetch`.
+
+    :param provider:
+        A :class:`.BaseProvider` instance.
+
+    The rest of the arguments is the same as in :meth:`.BaseProvider._fetch`.
+
+    :returns:
+        :class:`.Response`
+    """
+
+    if timeout is None:
+        timeout = provider.timeout
+    if deadline is None:
+        deadline = provider.deadline
+
+    request_url, body, headers = provider._prepare_request(url, method, params,
+                                                           headers, body)
+    transport = _get_transport(provider.settings)
+
+    cache_key = provider._cache_key(request_url, method)
+    cache_entry = None
+    if cache_key:
+        cache_entry = provider.cache.get(cache_key)
+        if cache_entry is not None:
+            if cache_entry.is_fresh():
+                response = core.Response(cache_entry.to_response(),
+                                         content_parser,
+                                         provider.content_parsers)
+                response.from_cache = True
+                return response
+            headers = dict(headers, **cache_entry.validators())
+
+    rate_limit_keys = {}
+    if rate_limit:
+        rate_limit_keys, delay = provider._acquire_rate_limit(url)
+        if delay:
+            await asyncio.sleep(delay)
+
+    expires = None if deadline is None else time.time() + deadline
+
+    while True:
+        request_url = provider.redirect_cache.resolve(request_url)
+
+        response = await _send(provider, transport, method, request_url, body,
+                               headers, timeout, expires, retry)
+
+        redirect = provider._redirect(response, request_url, method, body,
+                                      headers)
+        if redirect is None:
+            provider._update_rate_limit(rate_limit_keys, response)
+            if cache_key:
+                response = cache.store(provider.cache, cache_key, response,
+                                       cache_entry)
+            return core.Response(response, content_parser,
+                                 provider.content_parsers)
+
+        if max_redirects <= 0:
+            raise FetchError('Max redirects reached!',
+                             url=redirect[0],
+                             status=response.status)
+        max_redirects -= 1
+
+        request_url, method, body, headers = redirect
+        provider._log(logging.DEBUG,
+                      u'Redirecting to {0}'.format(request_url))
+
+
+async def provider_access(provider, url, params=None, method='GET',
+                          headers=None, body='', max_redirects=5,
+                          content_parser=None, timeout=None, deadline=None):
+    """
+    Coroutine version of :meth:`.AuthorizationProvider.access`.
+    """
+
+    if not provider.user and not provider.credentials:
+        raise CredentialsError(u'There is no authenticated user!')
+
+    provider._log(logging.INFO,
+                  u'Accessing protected resource {0}.'.format(url))
+
+    request_elements = provider.create_request_elements(
+        request_type=provider.PROTECTED_RESOURCE_REQUEST_TYPE,
+        credentials=provider.credentials,
+        url=url,
+        body=body,
+        params=params,
+        headers=headers or {},
+        method=method)
+
+    response = await fetch(provider, *request_elements,
+                           max_redirects=max_redirects,
+                           content_parser=content_parser,
+                           timeout=timeout,
+                           deadline=deadline,
+                           rate_limit=True)
+
+    provider._log(logging.INFO, u'Got response. HTTP status = {0}.'
+                  .format(response.status))
+    return response
+
+
+async def access(authomatic, credentials, url, params=None, method='GET',
+                 headers=None, body='', max_redirects=5, content_parser=None,
+                 timeout=None, deadline=None):
+    """
+    Coroutine version of :meth:`.Authomatic.access`.
+    """
+
+    credentials = authomatic.credentials(credentials)
+    provider = credentials.provider_class(
+        authomatic, adapter=None, provider_name=credentials.provider_name)
+    provider.credentials = credentials
+
+    return await provider_access(provider, url, params, method, headers, body,
+                                 max_redirects, content_parser, timeout,
+                                 deadline)
+
+
+# Futures of the refreshes in flight by event loops and refresh keys.
+_refresh_flights = {}
+
+
+async def _run_in_executor(settings, func, *args):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(core._get_executor(settings), func,
+                                      *args)
+
+
+async def _refresh_request(credentials, provider):
+    """
+    Coroutine version of :meth:`.OAuth2.refresh_credentials`.
+    """
+
+    request_elements = provider._refresh_request_elements(credentials)
+    if request_elements is None:
+        return
+
+    provider._log(logging.INFO, u'Refreshing credentials.')
+    response = await fetch(provider, *request_elements, retry=True)
+
+    return provider._update_refreshed_credentials(credentials, response)
+
+
+async def _acquire_lock(settings, backend, key):
+    """
+    Acquires the refresh lock in the executor and releases it if the
+    coroutine is cancelled while waiting.
+    """
+
+    loop = asyncio.get_event_loop()
+    executor = core._get_executor(settings)
+    acquiring = loop.run_in_executor(executor, backend.acquire, key)
+    try:
+        return await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        def release(future):
+            if not future.cancelled() and future.exception() is None:
+                executor.submit(backend.release, future.result())
+        acquiring.add_done_callback(release)
+        raise
+
+
+async def _refresh_once(credentials, provider):
+    """
+    Coroutine version of :meth:`.Credentials._refresh_once`.
+    """
+
+    settings = credentials._settings
+    backend = getattr(settings, 'refresh_lock', None)
+    if not backend:
+        response = await _refresh_request(credentials, provider)
+    else:
+        handle = await _acquire_lock(
+            settings, backend, '{0}:{1}'.format(*credentials._refresh_key()))
+        try:
+            record = await _run_in_executor(settings, backend.read, handle)
+            if credentials._is_refreshed(record):
+                response = credentials._adopt_refreshed(record)
+            else:
+                refresh_token = credentials.refresh_token
+                response = await _refresh_request(credentials, provider)
+                if response is not None and 200 <= response.status < 300:
+                    await _run_in_executor(
+                        settings, backend.write, handle,
+                        credentials._refresh_record(refresh_token))
+        finally:
+            await _run_in_executor(settings, backend.release, handle)
+
+    return response, credentials._refresh_fields()
+
+
+async def refresh(credentials, force=False, soon=86400, timeout=None,
+                  deadline=None):
+    """
+    Coroutine version of :meth:`.Credentials.refresh`.
+
+    Concurrent refreshes of the same refresh token in the same event loop
+    are coalesced into a single request. Refreshes in other threads are not,
+    but the ``refresh_lock`` serializes them like those of other processes.
+    """
+
+    ProviderClass = credentials.provider_class
+
+    if not hasattr(ProviderClass, 'refresh_credentials'):
+        return
+
+    if not (force or credentials.expire_soon(soon)):
+        return
+
+    if ProviderClass.refresh_credentials is not \
+            oauth2.OAuth2.refresh_credentials:
+        # Custom refresh procedure, we can only run it in a thread.
+        return await _run_in_executor(credentials._settings,
+                                      credentials.refresh, force, soon,
+                                      timeout, deadline)
+
+    settings = credentials._settings or credentials
+    provider = ProviderClass(settings, None, credentials.provider_name,
+                             timeout=timeout, deadline=deadline)
+
+    key = (asyncio.get_event_loop(), credentials._refresh_key())
+    flight = _refresh_flights.get(key)
+    if flight is not None:
+        # Don't let the cancellation of a follower cancel the leader.
+        response, fields = await asyncio.shield(flight)
+        credentials._adopt_fields(response, fields)
+        return response
+
+    flight = _refresh_flights[key] = key[0].create_future()
+    try:
+        result = await _refresh_once(credentials, provider)
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            flight.cancel()
+        else:
+            flight.set_exception(e)
+            # The followers re-raise it, don't log it if there are none.
+            flight.exception()
+        raise
+    else:
+        flight.set_result(result)
+    finally:
+        del _refresh_flights[key]
+
+    return result[0]
+
+
+async def update_user(provider):
+    """
+    Coroutine version of :meth:`.AuthorizationProvider.update_user`.
+    """
+
+    if not provider.user_info_url:
+        return
+
+    if type(provider)._access_user_info is not \
+            providers.AuthorizationProvider._access_user_info:
+        # The provider needs a custom procedure, we can only run it in
+        # a thread.
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            core._get_executor(provider.settings), provider._access_user_info)
+    else:
+        url = provider.user_info_url.format(**provider.user.__dict__)
+        response = await provider_access(provider, url)
+
+    provider.user = provider._update_or_create_user(response.data,
+                                                    content=response.content)
+    return core.UserInfoResponse(provider.user, response.httplib_response)
@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP Cache
+----------
+
+An opt-in private HTTP cache of ``GET`` requests to **protected resources**
+which follows the ``Cache-Control``, ``Expires``, ``ETag`` and
+``Last-Modified`` headers of the **provider** responses.
+
+Fresh responses are served without any request to the **provider**.
+Stale responses with validators are revalidated with a conditional request
+and a ``304 Not Modified`` response is served from the cache.
+
+The responses are cached per **user**, the cache key consists of the URL
+and the identity of the :class:`.Credentials`, so that the cached
+**protected resources** of one **user** are never served to another one.
+
+Pass a cache backend to the :class:`.Authomatic` constructor to enable it:
+
+::
+
+    from authomatic import Authomatic
+    from authomatic.cache import MemoryCache, SQLiteCache
+
+    authomatic = Authomatic(CONFIG, 'secret',
+                            cache=MemoryCache(max_bytes=50 * 1024 * 1024))
+
+    # Or share the cache among processes.
+    authomatic = Authomatic(CONFIG, 'secret',
+                            cache=SQLiteCache('/var/cache/authomatic.db'))
+
+.. note::
+
+    Responses with the ``Vary`` header are not cached.
+
+.. autosummary::
+    :nosignatures:
+
+    BaseCache
+    MemoryCache
+    SQLiteCache
+    CacheEntry
+
+"""
+
+import abc
+import calendar
+import collections
+import email.utils
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from authomatic import jsoncodec
+from authomatic.six.moves import urllib_parse as parse
+from authomatic.transports import BufferedResponse
+
+
+__all__ = ['BaseCache', 'MemoryCache', 'SQLiteCache', 'CacheEntry']
+
+
+#: Request parameters which change with every request and must not be part of
+#: the cache key, e.g. the OAuth 1.0a signature.
+VOLATILE_PARAMS = frozenset(['oauth_nonce', 'oauth_timestamp',
+                             'oauth_signature'])
+
+#: Maximum size of a cacheable response body in bytes.
+MAX_ENTRY_SIZE = 1024 * 1024
+
+
+def _parse_date(value):
+    """Parses a HTTP date header to a timestamp."""
+
+    if value:
+        parsed = email.utils.parsedate(value)
+        if parsed:
+            return calendar.timegm(parsed)
+
+
+def _parse_cache_control(value):
+    """Parses the ``Cache-Control`` header to a :class:`dict`."""
+
+    directives = {}
+    for directive in (value or '').split(','):
+        name, _, argument = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def cache_key(url, identity=''):
+    """
+    Creates a cache key of a request.
+
+    :param str url:
+        The request URL including the query string.
+
+    :param str identity:
+        Identity of the credentials used to sign the request.
+
+    :returns:
+        :class:`str`
+    """
+
+    scheme, host, path, query, fragment = parse.urlsplit(url)
+    params = sorted((k, v) for k, v in parse.parse_qsl(query, True)
+                    if k not in VOLATILE_PARAMS)
+    url = parse.urlunsplit((scheme, host.lower(), path,
+                            parse.urlencode(params), ''))
+
+    key = u'{0}\n{1}'.format(identity, url).encode('utf-8')
+    return hashlib.sha256(key).hexdigest()
+
+
+class CacheEntry(object):
+    """
+    A cached response.
+    """
+
+    def __init__(self, status, reason, headers, body, expires, version=11):
+        """
+        :param int status:
+            HTTP status code.
+
+        :param str reason:
+            HTTP reason phrase.
+
+        :param list headers:
+            List of ``(header, value)`` tuples.
+
+        :param bytes body:
+            The whole response body.
+
+        :param float expires:
+            Timestamp until which the response is fresh.
+
+        :param int version:
+            HTTP version.
+        """
+
+        self.status = status
+        self.reason = reason
+        self.headers = list(headers)
+        self.body = body
+        self.expires = expires
+        self.version = version
+
+    @classmethod
+    def from_response(cls, response, body, now=None):
+        """
+        Creates an entry from a response if it can be stored.
+
+        :param response:
+            The response returned by a :class:`.BaseTransport`.
+
+        :param bytes body:
+            The whole body of the response.
+
+        :returns:
+            :class:`.CacheEntry` or ``None``.
+        """
+
+        if response.status != 200:
+            return
+
+        entry = cls(response.status, response.reason, response.getheaders(),
+                    body, 0, getattr(response, 'version', 11))
+
+        if entry.getheader('Vary'):
+            return
+
+        cache_control = _parse_cache_control(entry.getheader('Cache-Control'))
+        if 'no-store' in cache_control:
+            return
+
+        entry.expires = entry._expires(cache_control, now or time.time())
+        if entry.expires <= (now or time.time()) and not entry.validators():
+            # Would never be used.
+            return
+
+        return entry
+
+    def _expires(self, cache_control, now):
+        """Computes the freshness lifetime of the response."""
+
+        if 'no-cache' in cache_control:
+            return 0
+
+        date = _parse_date(self.getheader('Date')) or now
+        age = max(0, now - date)
+        try:
+            age = max(age, int(self.getheader('Age') or 0))
+        except ValueError:
+            pass
+
+        max_age = cache_control.get('max-age')
+        if max_age is not None:
+            try:
+                return now + int(max_age) - age
+            except ValueError:
+                return 0
+
+        expires = _parse_date(self.getheader('Expires'))
+        if expires is not None:
+            return now + expires - date - age
+
+        return 0
+
+    @property
+    def size(self):
+        """
+        Approximate size of the entry in bytes.
+        """
+
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def getheader(self, name, default=None):
+        """
+        Returns the value of the :data:`name` header or :data:`default`.
+        """
+
+        name = name.lower()
+        for k, v in self.headers:
+            if k.lower() == name:
+                return v
+        return default
+
+    def is_fresh(self, now=None):
+        """
+        ``True`` if the entry can be served without revalidation.
+        """
+
+        return (now or time.time()) < self.expires
+
+    def validators(self):
+        """
+        Returns the headers of a conditional request which revalidates
+        the entry.
+
+        :returns:
+            :class:`dict`
+        """
+
+        headers = {}
+        etag = self.getheader('ETag')
+        if etag:
+            headers['If-None-Match'] = etag
+        last_modified = self.getheader('Last-Modified')
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def revalidated(self, response, now=None):
+        """
+        Returns a copy of the entry updated by the headers of
+        a ``304 Not Modified`` response.
+        """
+
+        updated = dict((k.lower(), (k, v)) for k, v in response.getheaders())
+        headers = [updated.pop(k.lower(), (k, v)) for k, v in self.headers]
+        headers.extend(v for k, v in updated.items()
+                       if k not in ('content-length', 'transfer-encoding'))
+
+        entry = CacheEntry(self.status, self.reason, headers, self.body, 0,
+                           self.version)
+        cache_control = _parse_cache_control(entry.getheader('Cache-Control'))
+        entry.expires = entry._expires(cache_control, now or time.time())
+        return entry
+
+    def to_response(self):
+        """
+        Returns the entry as a :class:`.BufferedResponse`.
+        """
+
+        return BufferedResponse(self.status, self.reason, self.headers,
+                                self.body, self.version)
+
+
+class _PrefetchedResponse(object):
+    """
+    A response whose body has been partially read ahead.
+    """
+
+    def __init__(self, prefix, response):
+        self._prefix = BufferedResponse(response.status, response.reason, [],
+                                        prefix)
+        self._response = response
+
+        self.msg = getattr(response, 'msg', None)
+        self.version = getattr(response, 'version', None)
+        self.status = response.status
+        self.reason = response.reason
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def read(self, amt=None):
+        if amt is None:
+            return self._prefix.read() + self._response.read()
+
+        data = self._prefix.read(amt)
+        if not data:
+            data = self._response.read(amt)
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def store(cache, key, response, entry=None, max_entry_size=MAX_ENTRY_SIZE):
+    """
+    Stores a response of a ``GET`` request in the cache.
+
+    :param cache:
+        A :class:`.BaseCache` instance.
+
+    :param str key:
+        Key created by :func:`.cache_key`.
+
+    :param response:
+        The response returned by a :class:`.BaseTransport`.
+
+    :param entry:
+        The stale :class:`.CacheEntry` which has been revalidated by the
+        request or ``None``.
+
+    :param int max_entry_size:
+        Responses with bigger bodies won't be cached.
+
+    :returns:
+        The response to be used instead of the :data:`response`.
+    """
+
+    if response.status == 304 and entry is not None:
+        response.read()
+        entry = entry.revalidated(response)
+        cache.set(key, entry)
+        return entry.to_response()
+
+    if response.status != 200:
+        return response
+
+    # Read ahead one byte more to find out whether the body fits.
+    body = response.read(max_entry_size + 1)
+    if len(body) > max_entry_size:
+        return _PrefetchedResponse(body, response)
+    rest = response.read()
+    if rest:
+        return _PrefetchedResponse(body + rest, response)
+
+    entry = CacheEntry.from_response(response, body)
+    if entry is not None:
+        cache.set(key, entry)
+
+    return BufferedResponse(response.status, response.reason,
+                            response.getheaders(), body,
+                            getattr(response, 'version', 11))
+
+
+class BaseCache(object):
+    """
+    Abstract base class for all cache backends.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def get(self, key):
+        """
+        Returns the :class:`.CacheEntry` stored under the :data:`key` or
+        ``None``.
+        """
+
+    @abc.abstractmethod
+    def set(self, key, entry):
+        """
+        Stores the :class:`.CacheEntry` under the :data:`key`.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """
+        Deletes the entry stored under the :data:`key`.
+        """
+
+    @abc.abstractmethod
+    def clear(self):
+        """
+        Deletes all entries.
+        """
+
+
+class MemoryCache(BaseCache):
+    """
+    A thread-safe in-memory LRU cache which evicts the least recently used
+    entries when their total size exceeds :attr:`.max_bytes`.
+    """
+
+    def __init__(self, max_bytes=10 * 1024 * 1024):
+        """
+        :param int max_bytes:
+            Maximum total size of the cached entries in bytes.
+        """
+
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self):
+        """
+        Total size of the cached entries in bytes.
+        """
+
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # Mark as recently used.
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            self._entries[key] = entry
+            self._size += entry.size
+
+            while self._size > self.max_bytes:
+                self._size -= self._entries.popitem(last=False)[1].size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class SQLiteCache(BaseCache):
+    """
+    A cache stored in a :mod:`sqlite3` database file, which can be shared by
+    multiple processes and survives restarts.
+
+    When there are more than :attr:`.max_entries` entries, the stale ones and
+    then the least recently used ones are evicted.
+
+    Every process opens its own connection when it first uses the cache,
+    so the cache can be created before a pre-forking server forks.
+    """
+
+    def __init__(self, path, table='authomatic_cache', max_entries=10000):
+        """
+        :param str path:
+            Path of the database file.
+
+        :param str table:
+            Name of the table.
+
+        :param int max_entries:
+            Maximum number of cached entries.
+        """
+
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # The connection by the id of the process which opened it.
+        self._connections = {}
+
+    def _connection(self):
+        """Returns the connection of the process, must hold the lock."""
+
+        pid = os.getpid()
+        connection = self._connections.get(pid)
+        if connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False,
+                                         isolation_level=None)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS {0} (key TEXT PRIMARY KEY, '
+                'meta TEXT, body BLOB, expires REAL, accessed REAL)'
+                .format(self.table))
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS {0}_accessed ON {0} (accessed)'
+                .format(self.table))
+            # A connection inherited from the parent process must not be
+            # used, nor closed, in the child.
+            self._connections = {pid: connection}
+        return connection
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute(
+                'SELECT COUNT(*) FROM {0}'.format(self.table)).fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT meta, body FROM {0} WHERE key = ?'.format(self.table),
+                (key,)).fetchone()
+            if row is not None:
+                # Mark as recently used.
+                connection.execute(
+                    'UPDATE {0} SET accessed = ? WHERE key = ?'
+                    .format(self.table), (time.time(), key))
+
+        if row is not None:
+            meta = jsoncodec.loads(row[0])
+            return CacheEntry(meta['status'], meta['reason'],
+                              [tuple(h) for h in meta['headers']],
+                              bytes(row[1]), meta['expires'], meta['version'])
+
+    def set(self, key, entry):
+        meta = jsoncodec.dumps(dict(status=entry.status,
+                               reason=entry.reason,
+                               headers=entry.headers,
+                               expires=entry.expires,
+                               version=entry.version))
+
+        now = time.time()
+
+        with self._lock:
+            connection = self._connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO {0} (key, meta, body, expires, '
+                'accessed) VALUES (?, ?, ?, ?, ?)'.format(self.table),
+                (key, meta, sqlite3.Binary(entry.body), entry.expires, now))
+
+            excess = connection.execute(
+                'SELECT COUNT(*) FROM {0}'.format(self.table)).fetchone()[0] \
+                - self.max_entries
+            if excess > 0:
+                # Stale entries first, then the least recently used ones.
+                connection.execute(
+                    'DELETE FROM {0} WHERE key IN (SELECT key FROM {0} '
+                    'ORDER BY expires > ?, accessed LIMIT ?)'
+                    .format(self.table), (now, excess))
+
+    def delete(self, key):
+        with self._lock:
+            self._connection().execute(
+                'DELETE FROM {0} WHERE key = ?'.format(self.table), (key,))
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute('DELETE FROM {0}'.format(self.table))
+
+    def close(self):
+        """
+        Closes the database connection of the process.
+        """
+
+        with self._lock:
+            connection = self._connections.pop(os.getpid(), None)
+        if connection is not None:
+            connection.close()
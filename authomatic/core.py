@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import base64
+import binascii
 import collections
+from concurrent import futures
 import copy
 import datetime
 from . import exceptions
 import hashlib
 import hmac
-import json
 import logging
+import re
 try:
     import cPickle as pickle
 except ImportError:
@@ -15,6 +18,11 @@ except ImportError:
 import sys
 import threading
 import time
+try:
+    from types import MappingProxyType as _frozen
+except ImportError:
+    _frozen = dict
+import zlib
 from xml.etree import ElementTree
 
 from authomatic.exceptions import (
@@ -24,7 +32,10 @@ from authomatic.exceptions import (
     RequestElementsError,
     SessionError,
 )
-from authomatic import six
+from authomatic import jsoncodec, locks, six
+from authomatic.pool import ConnectionPool
+from authomatic.ratelimit import RateLimitTracker
+from authomatic.transports import BufferedResponse, HTTPClientTransport
 from authomatic.six.moves import urllib_parse as parse
 
 
@@ -144,7 +155,7 @@ def json_qs_parser(body):
     """
     try:
         # Try JSON first.
-        return json.loads(body)
+        return jsoncodec.loads(body)
     except:
         pass
 
@@ -158,6 +169,95 @@ def json_qs_parser(body):
     return dict(parse.parse_qsl(body))
 
 
+def json_parser(body):
+    """
+    Parses response body from JSON.
+
+    :raises ValueError:
+        If the body is not valid JSON.
+    """
+
+    return jsoncodec.loads(body)
+
+
+def xml_parser(body):
+    """
+    Parses response body from XML.
+
+    :returns:
+        :class:`xml.etree.ElementTree.Element`
+    """
+
+    return ElementTree.fromstring(body)
+
+
+def qs_parser(body):
+    """
+    Parses response body from query string.
+    """
+
+    return dict(parse.parse_qsl(body))
+
+
+#: Content parsers by the media type of the ``Content-Type`` header.
+#: Media types with the ``+json`` or ``+xml`` suffix are parsed as JSON or XML.
+#: Use :func:`.register_content_parser` to add a parser.
+CONTENT_PARSERS = {
+    'application/json': json_parser,
+    'application/javascript': json_parser,
+    'text/javascript': json_parser,
+    'text/json': json_parser,
+    'application/xml': xml_parser,
+    'text/xml': xml_parser,
+    'application/x-www-form-urlencoded': qs_parser,
+}
+
+
+def register_content_parser(media_type, parser):
+    """
+    Registers a parser of responses with the media type.
+
+    :param str media_type:
+        Media type without parameters, e.g. ``'application/json'``.
+
+    :param function parser:
+        Callable which accepts :attr:`.Response.content` and returns the
+        parsed data. It should raise :exc:`ValueError` if the content is
+        invalid so that :func:`.json_qs_parser` can be tried instead.
+    """
+
+    CONTENT_PARSERS[media_type.lower()] = parser
+
+
+def get_content_parser(content_type, content_parsers=None):
+    """
+    Finds the parser of a response by its ``Content-Type`` header.
+
+    :param str content_type:
+        Value of the ``Content-Type`` header.
+
+    :param dict content_parsers:
+        Parsers by media type which take precedence over
+        the :data:`.CONTENT_PARSERS`, e.g. of a provider.
+
+    :returns:
+        The parser or ``None`` if the content type is unknown.
+    """
+
+    media_type = (content_type or '').split(';', 1)[0].strip().lower()
+    if not media_type:
+        return None
+
+    for parsers in (content_parsers, CONTENT_PARSERS):
+        if parsers and media_type in parsers:
+            return parsers[media_type]
+
+    if media_type.endswith('+json'):
+        return json_parser
+    if media_type.endswith('+xml'):
+        return xml_parser
+
+
 def import_string(import_name, silent=False):
     """
     Imports an object by string in dotted notation.
@@ -206,13 +306,201 @@ def id_to_name(config, short_name):
     """
 
     for k, v in list(config.items()):
-        if v.get('id') == short_name:
+        if hasattr(v, 'get') and v.get('id') == short_name:
             return k
             break
     else:
         raise Exception('No provider with id={0} found in the config!'.format(short_name))
 
 
+def _basic_authorization(consumer_key, consumer_secret):
+    """
+    Returns the value of the Basic ``Authorization`` header.
+    """
+
+    res = ':'.join((consumer_key, consumer_secret))
+    return 'Basic {0}'.format(base64.b64encode(six.b(res)).decode())
+
+
+class ProviderRegistry(object):
+    """
+    The :doc:`config` compiled once when an :class:`.Authomatic` instance is
+    created, so that logins, deserialization of :class:`.Credentials` and
+    provider instances don't have to resolve the same things again.
+
+    Errors in the config are raised as :class:`.ConfigError` right away.
+
+    The registry doesn't change, providers added to the config later are
+    still resolved on demand by :meth:`.provider_class`.
+    """
+
+    def __init__(self, config):
+        """
+        :param dict config:
+            :doc:`config`.
+
+        :raises ConfigError:
+            If a provider has no ``class_``, its class can't be imported,
+            is missing in the ``PROVIDER_ID_MAP`` of its module or its ``id``
+            is not a unique integer.
+        """
+
+        #: The :doc:`config`.
+        self.config = config
+
+        classes = {}
+        names_by_id = {}
+        settings = {}
+        type_ids = {}
+        type_classes = {}
+        basic_auth = {}
+
+        defaults = config.get('__defaults__') or {}
+
+        for name, provider_config in config.items():
+            if name == '__defaults__' or not hasattr(provider_config, 'get'):
+                continue
+
+            ProviderClass = self._resolve(name, provider_config)
+            classes[name] = ProviderClass
+
+            merged = self.merge_settings(config, name)
+            settings[name] = _frozen(merged)
+
+            provider_id = provider_config.get('id')
+            if provider_id is not None:
+                if not isinstance(provider_id, six.integer_types) or \
+                        isinstance(provider_id, bool):
+                    raise ConfigError('The "id" of provider {0} must be an '
+                                      'integer!'.format(name))
+                if provider_id in names_by_id:
+                    raise ConfigError('Providers {0} and {1} have the same '
+                                      'id={2}!'.format(names_by_id[provider_id],
+                                                       name, provider_id))
+                names_by_id[provider_id] = name
+
+            get_type_id = getattr(ProviderClass, 'get_type_id', None)
+            if get_type_id is not None:
+                try:
+                    type_ids[ProviderClass] = get_type_id()
+                except (AttributeError, ValueError):
+                    raise ConfigError('The class of provider {0} is not in '
+                                      'the PROVIDER_ID_MAP of its module!'
+                                      .format(name))
+
+            provider_type = ProviderClass.get_type()
+            if provider_type not in type_classes:
+                type_classes[provider_type] = import_string(provider_type,
+                                                            True)
+
+            consumer_key = merged.get('consumer_key')
+            consumer_secret = merged.get('consumer_secret')
+            if consumer_key and consumer_secret and \
+                    getattr(ProviderClass, '_x_use_authorization_header', False):
+                basic_auth[(consumer_key, consumer_secret)] = \
+                    _basic_authorization(consumer_key, consumer_secret)
+
+        #: Provider classes by provider names.
+        self.classes = _frozen(classes)
+
+        #: Provider names by their ``id`` in the config.
+        self.names_by_id = _frozen(names_by_id)
+
+        #: Settings of the providers by provider names with the
+        #: ``__defaults__`` already applied.
+        self.settings = _frozen(settings)
+
+        #: :attr:`.AuthorizationProvider.type_id` by provider classes.
+        self.type_ids = _frozen(type_ids)
+
+        #: Classes of the provider types by the values of
+        #: :meth:`.BaseProvider.get_type`.
+        self.type_classes = _frozen(type_classes)
+
+        #: Values of the Basic ``Authorization`` header by
+        #: ``(consumer_key, consumer_secret)``.
+        self.basic_auth = _frozen(basic_auth)
+
+    @staticmethod
+    def _resolve(name, provider_config):
+        class_ = provider_config.get('class_')
+        if not class_:
+            raise ConfigError('The "class_" key not specified in the config'
+                              ' for provider {0}!'.format(name))
+        try:
+            return resolve_provider_class(class_)
+        except ImportStringError as e:
+            raise ConfigError('Could not import the class of provider {0}!'
+                              .format(name), original_message=e.message)
+
+    @staticmethod
+    def merge_settings(config, name):
+        """
+        Merges the settings of a provider with the ``__defaults__``.
+
+        Values of the provider which evaluate to ``False`` don't override the
+        defaults, which is the order of precedence of
+        :meth:`.BaseProvider._kwarg`.
+
+        :param dict config:
+            :doc:`config`.
+
+        :param str name:
+            Name of the provider.
+
+        :returns:
+            :class:`dict`
+        """
+
+        merged = dict(config.get('__defaults__') or {})
+        for key, value in (config.get(name) or {}).items():
+            if value or key not in merged:
+                merged[key] = value
+        return merged
+
+    def provider_class(self, name):
+        """
+        Returns the class of a provider.
+
+        :param str name:
+            Name of the provider in the :doc:`config`.
+
+        :raises ConfigError:
+            If the provider is not in the config or its class can't be
+            resolved.
+        """
+
+        ProviderClass = self.classes.get(name)
+        if ProviderClass is not None:
+            return ProviderClass
+
+        provider_config = self.config.get(name)
+        if not provider_config:
+            raise ConfigError('Provider name "{0}" not specified!'
+                              .format(name))
+        return self._resolve(name, provider_config)
+
+    def name_by_id(self, provider_id):
+        """
+        Returns the name of a provider by its ``id`` in the :doc:`config`.
+        """
+
+        name = self.names_by_id.get(provider_id)
+        if name is None:
+            name = id_to_name(self.config, provider_id)
+        return name
+
+    def settings_of(self, name):
+        """
+        Returns the settings of a provider merged with the ``__defaults__``.
+        """
+
+        settings = self.settings.get(name)
+        if settings is None:
+            settings = self.merge_settings(self.config, name)
+        return settings
+
+
 class ReprMixin(object):
     """
     Provides __repr__() method with output *ClassName(arg1=value, arg2=value)*.
@@ -266,42 +554,110 @@ class ReprMixin(object):
         return '{0}({1})'.format(name, args)
 
 
-class Future(threading.Thread):
+#: Number of worker threads of the default executor.
+DEFAULT_MAX_WORKERS = 10
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def _get_default_executor():
+    """
+    Returns the executor shared by all :class:`.Future` instances which
+    are not bound to an :class:`.Authomatic` instance and creates it if
+    necessary.
     """
-    Represents an activity run in a separate thread.
-    Subclasses the standard library :class:`threading.Thread` and adds :attr:`.get_result` method.
 
-    .. warning::
+    global _default_executor
+
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = futures.ThreadPoolExecutor(DEFAULT_MAX_WORKERS)
+        return _default_executor
+
+
+def _get_executor(settings):
+    """
+    Returns the executor of an :class:`.Authomatic` instance or the default
+    executor.
+    """
+
+    if isinstance(settings, Authomatic):
+        return settings.executor
+    return _get_default_executor()
 
-        |async|
 
+class Future(futures.Future):
     """
+    Represents an activity run by a bounded thread pool executor.
+    Subclasses the standard library :class:`concurrent.futures.Future`
+    and adds the :meth:`.get_result` method.
 
-    def __init__(self, func, *args, **kwargs):
+    It works with the :func:`concurrent.futures.as_completed` and
+    :func:`concurrent.futures.wait` functions, supports callbacks
+    and cancellation of activities which have not started yet,
+    and re-raises the exception raised by the activity.
+
+    """
+
+    def __init__(self, func=None, *args, **kwargs):
         """
         :param callable func:
-            The function to be run in separate thread.
+            The function to be run by the default executor.
 
-        Calls :data:`func` in separate thread and returns immediately.
-        Accepts arbitrary positional and keyword arguments which will be passed to :data:`func`.
+        If :data:`func` is passed, submits it to the default executor and
+        returns immediately.
+        Accepts arbitrary positional and keyword arguments which will be
+        passed to :data:`func`.
+        Use :meth:`.submit` to run the :data:`func` by another executor.
         """
 
         super(Future, self).__init__()
-        self._func = func
-        self._args = args
-        self._kwargs = kwargs
-        self._result = None
 
-        self.start()
+        if func is not None:
+            _get_default_executor().submit(self._run, func, args, kwargs)
+
+
+    @classmethod
+    def submit(cls, executor, func, *args, **kwargs):
+        """
+        Submits the :data:`func` to the :data:`executor`.
+
+        :param executor:
+            A :class:`concurrent.futures.Executor` instance.
+
+        :param callable func:
+            The function to be run by the :data:`executor`.
+
+        Accepts arbitrary positional and keyword arguments which will be
+        passed to :data:`func`.
+
+        :returns:
+            :class:`.Future`
+        """
+
+        future = cls()
+        executor.submit(future._run, func, args, kwargs)
+        return future
+
 
+    def _run(self, func, args, kwargs):
+        if not self.set_running_or_notify_cancel():
+            # Cancelled before it could start.
+            return
 
-    def run(self):
-        self._result = self._func(*self._args, **self._kwargs)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.set_exception(e)
+        else:
+            self.set_result(result)
 
 
     def get_result(self, timeout=None):
         """
         Waits for the wrapped :data:`func` to finish and returns its result.
+        Same as :meth:`concurrent.futures.Future.result`.
 
         .. note::
 
@@ -310,12 +666,17 @@ class Future(threading.Thread):
         :param timeout:
             :class:`float` or ``None`` A timeout for the :data:`func` to return in seconds.
 
+        :raises concurrent.futures.TimeoutError:
+            If the :data:`func` doesn't return within the :data:`timeout`.
+
+        :raises Exception:
+            Whatever the :data:`func` raised.
+
         :returns:
             The result of the wrapped :data:`func`.
         """
 
-        self.join(timeout)
-        return self._result
+        return self.result(timeout)
 
 
 class Session(object):
@@ -558,17 +919,31 @@ class User(ReprMixin):
 
     def async_update(self):
         """
-        Same as :meth:`.update` but runs asynchronously in a separate thread.
+        Same as :meth:`.update` but runs asynchronously in a thread pool.
+
+        :returns:
+            :class:`.Future` instance representing the activity.
+        """
+
+        return Future.submit(_get_executor(self.provider.settings),
+                             self.update)
+
+
+    def update_async(self):
+        """
+        Same as :meth:`.update` but returns a coroutine to be awaited in
+        an :mod:`asyncio` event loop.
 
         .. warning::
 
-            |async|
+            Requires Python 3.5 or newer.
 
         :returns:
-            :class:`.Future` instance representing the separate thread.
+            Coroutine which returns :class:`.UserInfoResponse`.
         """
 
-        return Future(self.update)
+        from authomatic import aio
+        return aio.update_user(self.provider)
 
     def to_dict(self):
         """
@@ -611,6 +986,306 @@ class SupportedUserAttributes(SupportedUserAttributesNT):
         return super(SupportedUserAttributes, cls).__new__(cls, **defaults)
 
 
+#: Version of the compact :class:`.Credentials` serialization format.
+#: Versions must stay below ``0xD0`` so that the base64url encoded string
+#: never starts with a digit like the legacy format.
+CREDENTIALS_FORMAT_VERSION = 1
+
+# Kinds of fields in the compact format.
+_NONE, _INT, _TEXT, _HEX, _TOKEN = range(5)
+
+_HEX_RE = re.compile(r'^(?:[0-9a-f]{2})+$')
+_ASCII_RE = re.compile(r'^[\x21-\x7e]+$')
+_SEPARATOR_RE = re.compile(r'([^A-Za-z0-9_-])')
+# Tokens with more separators are stored as text, which is longer but
+# faster to decode than many short runs.
+_MAX_TOKEN_PARTS = 33
+# Number of characters decoded before the length of the head is known.
+_HEAD_PREFIX = 48
+
+if six.PY3:
+    _B64_TO_URL = bytes.maketrans(b'+/', b'-_')
+    _URL_TO_B64 = bytes.maketrans(b'-_', b'+/')
+else:
+    import string as _string
+    _B64_TO_URL = _string.maketrans(b'+/', b'-_')
+    _URL_TO_B64 = _string.maketrans(b'-_', b'+/')
+
+
+def _write_varint(out, value):
+    """Appends an unsigned integer to a bytearray in 7 bit groups."""
+
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    """Reads an unsigned integer, returns it with the next position."""
+
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+def _serialize_compact(provider_id, provider_type_id, items):
+    """
+    Encodes the credentials to the compact format.
+
+    The binary layout is a head followed by a body::
+
+        head: version | provider type | length of the head |
+              class index | provider ID | number of fields | fields... |
+              zero padding to 3 bytes
+        body: runs of token fields padded to 3 bytes
+
+    Everything after the two leading bytes is a varint, the length of the
+    head is in groups of 3 bytes. Every field starts
+    with a ``value << 3 | kind`` varint, where the value is the integer of
+    an ``_INT`` or the length of the bytes of a ``_TEXT`` or ``_HEX`` field
+    which follow it in the head. A ``_TOKEN`` field, typically an access
+    token, is split to runs of base64url characters and the value is the
+    number of runs, each stored as its length preceded by the separator
+    character. The runs are stored in the body as decoded base64url, so
+    that their characters appear unchanged in the encoded string and only
+    the head needs to be decoded.
+    """
+
+    provider_type, _, class_index = str(provider_type_id).partition('-')
+
+    head = bytearray()
+    _write_varint(head, int(class_index))
+    _write_varint(head, _zigzag(int(provider_id)))
+    _write_varint(head, len(items))
+
+    body = []
+    for value in items:
+        if value is None:
+            head.append(_NONE)
+            continue
+
+        if isinstance(value, six.integer_types) and \
+                not isinstance(value, bool):
+            _write_varint(head, _zigzag(value) << 3 | _INT)
+            continue
+
+        text = value if isinstance(value, six.string_types) else str(value)
+        if isinstance(text, six.binary_type):
+            text = text.decode('utf-8')
+
+        if _HEX_RE.match(text):
+            payload = binascii.unhexlify(text)
+            _write_varint(head, len(payload) << 3 | _HEX)
+            head.extend(payload)
+            continue
+
+        if _ASCII_RE.match(text):
+            parts = _SEPARATOR_RE.split(text)
+            # Costs in encoded characters, runs are padded to 4 characters.
+            token_cost = sum(-len(run) % 4 for run in parts[::2]) + \
+                len(text) + len(parts) * 4 // 3
+            if len(parts) <= _MAX_TOKEN_PARTS and \
+                    token_cost < len(text) * 4 // 3:
+                _write_varint(head, (len(parts) // 2 + 1) << 3 | _TOKEN)
+                for i, part in enumerate(parts):
+                    if i % 2:
+                        head.append(ord(part))
+                    else:
+                        _write_varint(head, len(part))
+                        body.append(part + 'A' * (-len(part) % 4))
+                continue
+
+        payload = text.encode('utf-8')
+        _write_varint(head, len(payload) << 3 | _TEXT)
+        head.extend(payload)
+
+    # The length of the head includes the varint of the length.
+    size = len(head) + 3
+    while True:
+        prefix = bytearray((CREDENTIALS_FORMAT_VERSION, int(provider_type)))
+        _write_varint(prefix, (size + 2) // 3)
+        if len(prefix) + len(head) <= size:
+            break
+        size += 1
+
+    head = prefix + head
+    head.extend(bytearray(-len(head) % 3))
+    encoded = binascii.b2a_base64(bytes(head))[:-1].translate(_B64_TO_URL)
+    return encoded.decode('ascii') + ''.join(body)
+
+
+def _deserialize_compact(serialized):
+    """
+    Decodes credentials encoded by :func:`._serialize_compact`.
+
+    :returns:
+        A ``(provider_id, provider_type_id, items)`` tuple with the items
+        converted to the same strings as in the legacy format.
+    """
+
+    try:
+        if isinstance(serialized, six.binary_type):
+            serialized = serialized.decode('ascii')
+        # The head is usually short enough to be decoded at once.
+        data = bytearray(binascii.a2b_base64(
+            serialized[:_HEAD_PREFIX].encode('ascii').translate(_URL_TO_B64)))
+
+        version = data[0]
+        if version != CREDENTIALS_FORMAT_VERSION:
+            raise CredentialsError('Unsupported credentials format version '
+                                   '{0}!'.format(version))
+
+        provider_type = data[1]
+        groups, pos = _read_varint(data, 2)
+        if groups * 4 > _HEAD_PREFIX:
+            data = bytearray(binascii.a2b_base64(serialized[:groups * 4]
+                                                 .encode('ascii')
+                                                 .translate(_URL_TO_B64)))
+
+        class_index, pos = _read_varint(data, pos)
+        provider_id, pos = _read_varint(data, pos)
+        count, pos = _read_varint(data, pos)
+
+        items = []
+        tokens = []
+        for _ in range(count):
+            header = data[pos]
+            if header < 0x80:
+                pos += 1
+            else:
+                header, pos = _read_varint(data, pos)
+            kind = header & 7
+            value = header >> 3
+
+            if kind == _NONE:
+                items.append('None')
+            elif kind == _INT:
+                items.append(str(_unzigzag(value)))
+            elif kind == _TEXT:
+                end = pos + value
+                items.append(bytes(data[pos:end]).decode('utf-8'))
+                pos = end
+            elif kind == _HEX:
+                end = pos + value
+                items.append(binascii.hexlify(data[pos:end]).decode('ascii'))
+                pos = end
+            elif kind == _TOKEN:
+                runs = []
+                separator = ''
+                for i in range(value):
+                    if i:
+                        separator = chr(data[pos])
+                        pos += 1
+                    length = data[pos]
+                    if length < 0x80:
+                        pos += 1
+                    else:
+                        length, pos = _read_varint(data, pos)
+                    runs.append((separator, length))
+                tokens.append((len(items), runs))
+                items.append(None)
+            else:
+                raise ValueError('Unknown field kind {0}!'.format(kind))
+
+        offset = groups * 4
+        if pos > groups * 3:
+            raise ValueError('Invalid length of the head!')
+        for index, runs in tokens:
+            parts = []
+            for separator, length in runs:
+                parts.append(separator)
+                parts.append(serialized[offset:offset + length])
+                offset += length + (-length % 4)
+            items[index] = ''.join(parts)
+
+        if offset != len(serialized):
+            raise ValueError('Invalid length!')
+    except (IndexError, TypeError, ValueError, binascii.Error) as e:
+        raise CredentialsError('Invalid serialized credentials!',
+                               original_message=str(e))
+
+    return (_unzigzag(provider_id),
+            '{0}-{1}'.format(provider_type, class_index),
+            items)
+
+
+# Fields of the credentials from which a CredentialsRecord is created.
+_RECORD_DEFAULTS = dict(token='', token_type='', refresh_token='',
+                        token_secret='', _expiration_time=0, _expire_in=0)
+
+
+def _serialize(provider_id, provider_type_id, items, compact=False):
+    """
+    Encodes the provider ID, provider type ID and the items returned by
+    ``to_tuple()`` of the provider type.
+    """
+
+    if compact:
+        return _serialize_compact(provider_id, provider_type_id, items)
+
+    # Provider ID and provider type ID are always the first two items.
+    result = (provider_id, provider_type_id) + tuple(items)
+
+    # Make sure that all items are strings and percent encode them
+    # separately, which is faster than encoding the newlines with them.
+    quoted = [parse.quote(str(i), '') for i in result]
+
+    # Concatenate by percent encoded newline.
+    return '%0A'.join(quoted)
+
+
+def _deserialize(serialized):
+    """
+    Decodes credentials encoded by :func:`._serialize` in any format.
+
+    :returns:
+        A ``(provider_id, provider_type_id, items)`` tuple.
+    """
+
+    if serialized[:1].isdigit() or serialized[:1] == '-':
+        # The legacy format starts with the provider ID.
+        if '%0a' in serialized:
+            split = parse.unquote(serialized).split('\n')
+        else:
+            # Every "%" starts an escape, so the items can be split by the
+            # encoded newline and only the items with escapes decoded.
+            split = [parse.unquote(i) if '%' in i else i
+                     for i in serialized.split('%0A')]
+
+        # We need the provider ID to move forward.
+        if split[0] is None:
+            raise CredentialsError('To deserialize credentials you need to specify a unique ' + \
+                                   'integer under the "id" key in the config for each provider!')
+
+        return int(split[0]), split[1], split[2:]
+
+    return _deserialize_compact(serialized)
+
+
+#: Lightweight credentials produced by :meth:`.Authomatic.deserialize_many`.
+#: Doesn't contain the consumer key and secret.
+CredentialsRecord = collections.namedtuple(
+    typename='CredentialsRecord',
+    field_names=['provider_name', 'provider_id', 'provider_type_id', 'token',
+                 'token_type', 'refresh_token', 'token_secret',
+                 'expiration_time']
+)
+
+
 class Credentials(ReprMixin):
     """Contains all necessary information to fetch **user's protected resources**."""
 
@@ -621,6 +1296,9 @@ class Credentials(ReprMixin):
         #: :class:`dict` :doc:`config`.
         self.config = config
 
+        # The Authomatic instance the credentials belong to, if any.
+        self._settings = kwargs.get('settings')
+
         #: :class:`str` User **access token**.
         self.token = kwargs.get('token', '')
 
@@ -642,6 +1320,9 @@ class Credentials(ReprMixin):
         self.expire_in = int(kwargs.get('expire_in', 0))
 
         if provider:
+            if isinstance(provider.settings, Authomatic):
+                self._settings = provider.settings
+
             #: :class:`str` Provider name specified in the :doc:`config`.
             self.provider_name = provider.name
 
@@ -744,7 +1425,7 @@ class Credentials(ReprMixin):
             return False
 
 
-    def refresh(self, force=False, soon=86400):
+    def refresh(self, force=False, soon=86400, timeout=None, deadline=None):
         """
         Refreshes the credentials only if the **provider** supports it and
         if it will expire in less than one day.
@@ -764,27 +1445,186 @@ class Credentials(ReprMixin):
 
         :param int soon:
             Number of seconds specifying what means *soon*.
+
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple.
+            If ``None``, the ``timeout`` from :doc:`config` will be used.
+
+        :param float deadline:
+            Total number of seconds the refresh request may take
+            including redirects.
+            If ``None``, the ``deadline`` from :doc:`config` will be used.
+
+        Concurrent refreshes of credentials with the same refresh token are
+        coalesced into a single request to the **provider**, even if they
+        are different :class:`.Credentials` instances. All callers get the
+        same new tokens and the same :class:`.Response` or exception, which
+        they must not modify.
+
+        Refreshes in other processes are serialized by the ``refresh_lock``
+        of the :class:`.Authomatic` instance if it has one. If the
+        credentials have been refreshed by another process in the meantime,
+        they take its new tokens and the response is a synthetic ``200``
+        response with the tokens in its :attr:`.Response.data`.
+
+        :returns:
+            :class:`.Response` of the refresh request or ``None``.
         """
 
         if hasattr(self.provider_class, 'refresh_credentials'):
             if force or self.expire_soon(soon):
                 logging.info('PROVIDER NAME: {0}'.format(self.provider_name))
-                return self.provider_class(self, None, self.provider_name).refresh_credentials(self)
+                settings = self._settings or self
+                provider = self.provider_class(settings, None, self.provider_name,
+                                               timeout=timeout, deadline=deadline)
+
+                (response, fields), coalesced = _refresh_flights.do(
+                    self._refresh_key(), self._refresh_once, provider)
+
+                if coalesced:
+                    self._adopt_fields(response, fields)
+                return response
+
+
+    def _adopt_fields(self, response, fields):
+        """Takes the fields of a successful refresh made by another call."""
+
+        if response is not None and 200 <= response.status < 300:
+            (self.token, self.refresh_token, self.token_type,
+             self.expiration_time) = fields
+
+
+    def _refresh_key(self):
+        """Identifies the refresh token without keeping it."""
+
+        refresh_token = self.refresh_token or self.token or ''
+        if isinstance(refresh_token, six.text_type):
+            refresh_token = refresh_token.encode('utf-8')
+        return (self.provider_name,
+                hashlib.sha1(refresh_token).hexdigest())
+
+
+    def _refresh_once(self, provider):
+        """
+        Refreshes the credentials and returns the response with the fields
+        which the followers copy.
+        """
+
+        backend = getattr(self._settings, 'refresh_lock', None)
+        if not backend:
+            response = provider.refresh_credentials(self)
+        else:
+            handle = backend.acquire('{0}:{1}'.format(*self._refresh_key()))
+            try:
+                record = backend.read(handle)
+                if self._is_refreshed(record):
+                    response = self._adopt_refreshed(record)
+                else:
+                    refresh_token = self.refresh_token
+                    response = provider.refresh_credentials(self)
+                    if response is not None and 200 <= response.status < 300:
+                        backend.write(handle,
+                                      self._refresh_record(refresh_token))
+            finally:
+                backend.release(handle)
+
+        return response, self._refresh_fields()
+
+
+    def _refresh_fields(self):
+        """The fields which the followers of a refresh copy."""
+
+        return (self.token, self.refresh_token, self.token_type,
+                self.expiration_time)
+
+
+    def _refresh_record(self, refresh_token):
+        """
+        Returns the lock record of a refresh of the :data:`refresh_token`.
+        """
+
+        # The other processes already have the refresh token unless the
+        # provider rotated it.
+        return dict(token=self.token,
+                    refresh_token=self.refresh_token
+                    if self.refresh_token != refresh_token else None,
+                    token_type=self.token_type,
+                    expiration_time=self.expiration_time,
+                    refreshed=int(time.time()))
+
+
+    def _is_refreshed(self, record):
+        """
+        Whether the lock record holds new valid tokens refreshed by another
+        process.
+        """
+
+        if not record or not record.get('token') or \
+                record['token'] == self.token:
+            return False
+
+        now = int(time.time())
+        expiration_time = record.get('expiration_time')
+        if expiration_time:
+            return expiration_time > now
+        return now - (record.get('refreshed') or 0) < REFRESH_RECORD_MAX_AGE
+
+
+    def _adopt_refreshed(self, record):
+        """
+        Takes the tokens of a lock record and returns a synthetic response.
+        """
+
+        self.token = record['token']
+        self.refresh_token = record.get('refresh_token') or self.refresh_token
+        self.token_type = record.get('token_type') or self.token_type
+        self.expiration_time = record.get('expiration_time') or 0
+
+        data = dict(access_token=self.token, token_type=self.token_type)
+        if record.get('refresh_token'):
+            data['refresh_token'] = record['refresh_token']
+        if self.expiration_time:
+            data['expires_in'] = self.expiration_time - int(time.time())
+
+        return Response(BufferedResponse(
+            200, 'OK', [('Content-Type', 'application/json')],
+            jsoncodec.dumps(data).encode('utf-8')))
 
 
     def async_refresh(self, *args, **kwargs):
         """
-        Same as :meth:`.refresh` but runs asynchronously in a separate thread.
+        Same as :meth:`.refresh` but runs asynchronously in a thread pool.
+
+        :returns:
+            :class:`.Future` instance representing the activity.
+        """
+
+        return Future.submit(_get_executor(self._settings), self.refresh,
+                             *args, **kwargs)
+
+
+    def refresh_async(self, force=False, soon=86400, timeout=None,
+                      deadline=None):
+        """
+        Same as :meth:`.refresh` but returns a coroutine to be awaited in
+        an :mod:`asyncio` event loop.
+
+        Concurrent refreshes of the same refresh token in the same event
+        loop are coalesced into a single request and the ``refresh_lock``
+        is used like by :meth:`.refresh`, but only the blocking calls of the
+        lock backend run in the executor of the :class:`.Authomatic`
+        instance.
 
         .. warning::
 
-            |async|
+            Requires Python 3.5 or newer.
 
         :returns:
-            :class:`.Future` instance representing the separate thread.
+            Coroutine which returns :class:`.Response` or ``None``.
         """
 
-        return Future(self.refresh, *args, **kwargs)
+        from authomatic import aio
+        return aio.refresh(self, force, soon, timeout, deadline)
 
 
     def provider_type_class(self):
@@ -795,13 +1635,42 @@ class Credentials(ReprMixin):
             :class:`authomatic.providers.BaseProvider` subclass.
         """
 
+        registry = getattr(self._settings, 'registry', None)
+        if registry is not None:
+            type_class = registry.type_classes.get(self.provider_type)
+            if type_class is not None:
+                return type_class
+
         return resolve_provider_class(self.provider_type)
 
 
-    def serialize(self):
+    def to_dict(self):
+        """
+        Converts the :class:`.Credentials` instance to a :class:`dict`
+        without the secrets.
+
+        :returns:
+            :class:`dict`
+        """
+
+        return dict(provider_name=self.provider_name,
+                    provider_type=self.provider_type,
+                    token_type=self.token_type,
+                    expiration_time=self.expiration_time,
+                    expire_in=self.expire_in,
+                    valid=self.valid)
+
+
+    def serialize(self, compact=False):
         """
         Converts the credentials to a percent encoded string to be stored for later use.
 
+        :param bool compact:
+            If ``True``, the credentials will be encoded in a versioned binary
+            format with length prefixed fields encoded as base64url, which is
+            shorter and faster to deserialize. :meth:`.deserialize` accepts
+            both formats.
+
         :returns:
             :class:`string`
         """
@@ -814,17 +1683,8 @@ class Credentials(ReprMixin):
         # Get the provider type specific items.
         rest = self.provider_type_class().to_tuple(self)
 
-        # Provider ID and provider type ID are always the first two items.
-        result = (self.provider_id, self.provider_type_id) + rest
-
-        # Make sure that all items are strings.
-        stringified = [str(i) for i in result]
-
-        # Concatenate by newline.
-        concatenated = '\n'.join(stringified)
-
-        # Percent encode.
-        return parse.quote(concatenated, '')
+        return _serialize(self.provider_id, self.provider_type_id, rest,
+                          compact)
 
 
     @classmethod
@@ -834,7 +1694,8 @@ class Credentials(ReprMixin):
         You can also pass it a :class:`.Credentials` instance.
 
         :param dict config:
-            The same :doc:`config` used in the :func:`.login` to get the credentials.
+            The same :doc:`config` used in the :func:`.login` to get the credentials
+            or the :class:`.ProviderRegistry` compiled from it.
         :param str credentials:
             :class:`string` The serialized credentials or :class:`.Credentials` instance.
 
@@ -846,35 +1707,41 @@ class Credentials(ReprMixin):
         if isinstance(credentials, Credentials):
             return credentials
 
-        decoded = parse.unquote(credentials)
+        registry = None
+        if isinstance(config, ProviderRegistry):
+            registry, config = config, config.config
 
-        split = decoded.split('\n')
+        provider_id, provider_type_id, items = _deserialize(credentials)
 
-        # We need the provider ID to move forward.
-        if split[0] is None:
-            raise CredentialsError('To deserialize credentials you need to specify a unique ' + \
-                                   'integer under the "id" key in the config for each provider!')
-
-        provider_id = int(split[0])
-
-        # Get provider config by short name.
-        provider_name = id_to_name(config, provider_id)
-        cfg = config.get(provider_name)
+        if registry is not None:
+            provider_name = registry.name_by_id(provider_id)
+            cfg = config.get(provider_name)
+            ProviderClass = registry.provider_class(provider_name)
+        else:
+            # Get provider config by short name.
+            provider_name = id_to_name(config, provider_id)
+            cfg = config.get(provider_name)
 
-        # Get the provider class.
-        ProviderClass = resolve_provider_class(cfg.get('class_'))
+            # Get the provider class.
+            ProviderClass = resolve_provider_class(cfg.get('class_'))
 
         deserialized = Credentials(config)
 
         deserialized.provider_id = provider_id
         deserialized.provider_type = ProviderClass.get_type()
-        deserialized.provider_type_id = split[1]
+        deserialized.provider_type_id = provider_type_id
         deserialized.provider_class = ProviderClass
         deserialized.provider_name = provider_name
         deserialized.provider_class = ProviderClass
 
         # Add provider type specific properties.
-        return ProviderClass.reconstruct(split[2:], deserialized, cfg)
+        return ProviderClass.reconstruct(items, deserialized, cfg)
+
+
+# Encoders of the objects of the login result.
+jsoncodec.register_encoder(User, User.to_dict)
+jsoncodec.register_encoder(Credentials, Credentials.to_dict)
+jsoncodec.register_encoder(exceptions.BaseError, exceptions.BaseError.to_dict)
 
 
 class LoginResult(ReprMixin):
@@ -941,8 +1808,9 @@ class LoginResult(ReprMixin):
 
         }})();
 
-        """.format(result=self.to_json(indent),
-                   custom=json.dumps(custom),
+        """.format(result=jsoncodec.escape_script(self.to_json(indent)),
+                   custom=jsoncodec.escape_script(
+                       self._json_codec.dumps(custom)),
                    custom_callback=custom_callback,
                    stay_open='// ' if stay_open else '')
 
@@ -1003,63 +1871,317 @@ class LoginResult(ReprMixin):
         return self.provider.user if self.provider else None
 
 
+    @property
+    def _json_codec(self):
+        settings = self.provider.settings if self.provider else None
+        return jsoncodec.get_codec(getattr(settings, 'json_codec', None))
+
+
     def to_dict(self):
         return dict(provider=self.provider, user=self.user, error=self.error)
 
 
     def to_json(self, indent=4):
-        return json.dumps(self, default=lambda obj: obj.to_dict() if hasattr(obj, 'to_dict') else '', indent=indent)
+        # Encode the known objects explicitly,
+        # the default callback is only a fallback for nested objects.
+        encode = jsoncodec.encode
+        data = dict(provider=encode(self.provider) if self.provider else None,
+                    user=encode(self.user) if self.user else None,
+                    error=encode(self.error) if self.error else None)
+        return self._json_codec.dumps(data, indent=indent)
 
 
 class Response(ReprMixin):
     """
-    Wraps :class:`httplib.HTTPResponse` and adds
-    :attr:`.content` and :attr:`.data` attributes.
+    Wraps the response returned by a :doc:`transport </reference/transports>`
+    and adds :attr:`.content` and :attr:`.data` attributes.
+
+    The :attr:`.content` and :attr:`.data` attributes read the whole body
+    into memory. Use the :meth:`.iter_content`, :meth:`.iter_lines`,
+    :meth:`.readinto` or :meth:`.save` methods to process large bodies
+    like media downloads in chunks instead.
+
+    ::
+
+        response = authomatic.access(credentials, photo_url)
+        response.save('photo.jpg')
     """
 
-    def __init__(self, httplib_response, content_parser=None):
+    #: Default size of the chunks in bytes used by the streaming methods.
+    CHUNK_SIZE = 64 * 1024
+
+    #: :mod:`zlib` window bits of the supported content encodings.
+    CONTENT_ENCODINGS = {
+        'gzip': 16 + zlib.MAX_WBITS,
+        'x-gzip': 16 + zlib.MAX_WBITS,
+        'deflate': zlib.MAX_WBITS,
+    }
+
+    #: Lowercase names of the headers which describe the compressed body
+    #: and are hidden once the body is decompressed.
+    ENCODING_HEADERS = frozenset(['content-encoding', 'content-length',
+                                  'transfer-encoding'])
+
+    def __init__(self, httplib_response, content_parser=None,
+                 content_parsers=None):
         """
         :param httplib_response:
-            The wrapped :class:`httplib.HTTPResponse` instance.
+            The wrapped :class:`httplib.HTTPResponse` instance or any object
+            with the same interface returned by a :class:`.BaseTransport`.
 
         :param function content_parser:
             Callable which accepts :attr:`.content` as argument,
             parses it and returns the parsed data as :class:`dict`.
+            If ``None``, the parser will be chosen by the ``Content-Type``
+            header with :func:`.get_content_parser`, and if there is none,
+            :func:`.json_qs_parser` will guess the format.
+
+        :param dict content_parsers:
+            Parsers by media type which take precedence over
+            the :data:`.CONTENT_PARSERS`.
         """
 
         self.httplib_response = httplib_response
-        self.content_parser = content_parser or json_qs_parser
+
+        # A parser chosen by the content type falls back to guessing
+        # if the content doesn't match.
+        self._fallback = None
+        if content_parser is None:
+            content_parser = get_content_parser(
+                httplib_response.getheader('Content-Type'), content_parsers)
+            if content_parser is None:
+                content_parser = json_qs_parser
+            else:
+                self._fallback = json_qs_parser
+
+        self.content_parser = content_parser
         self._data = None
         self._content = None
 
         #: Same as :attr:`httplib.HTTPResponse.msg`.
-        self.msg = httplib_response.msg
+        self.msg = getattr(httplib_response, 'msg', None)
         #: Same as :attr:`httplib.HTTPResponse.version`.
-        self.version = httplib_response.version
+        self.version = getattr(httplib_response, 'version', None)
         #: Same as :attr:`httplib.HTTPResponse.status`.
         self.status = httplib_response.status
         #: Same as :attr:`httplib.HTTPResponse.reason`.
         self.reason = httplib_response.reason
 
+        #: Number of bytes of the body received so far, before
+        #: decompression.
+        self.raw_size = 0
+
+        #: ``True`` if the response is a fresh response from the
+        #: :doc:`cache </reference/cache>` and no request has been made.
+        self.from_cache = False
+
+        self._content_encoding = (httplib_response.getheader(
+            'Content-Encoding') or '').strip().lower()
+        self._decoder = None
+        self._decoded = b''
+        self._raw_exhausted = False
+
+        wbits = self.CONTENT_ENCODINGS.get(self._content_encoding)
+        if wbits:
+            self._decoder = zlib.decompressobj(wbits)
+
+
+    def _read_raw(self, amt=None):
+        """Reads the body as received from the provider."""
+
+        data = self.httplib_response.read(amt)
+        self.raw_size += len(data)
+        return data
+
+
+    def _decompress(self, data):
+        """Decompresses a chunk of the body."""
+
+        try:
+            return self._decoder.decompress(data)
+        except zlib.error:
+            if self._content_encoding == 'deflate' and not self._decoded \
+                    and self.raw_size == len(data):
+                # Some servers send raw deflate data without zlib header.
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+                return self._decoder.decompress(data)
+            raise
+
 
     def read(self, amt=None):
         """
-        Same as :meth:`httplib.HTTPResponse.read`.
+        Same as :meth:`httplib.HTTPResponse.read` but decompresses the
+        ``gzip`` and ``deflate`` content encodings.
 
         :param amt:
         """
 
-        return self.httplib_response.read(amt)
+        if self._decoder is None:
+            return self._read_raw(amt)
+
+        if amt is None:
+            data = self._decoded
+            if not self._raw_exhausted:
+                data += self._decompress(self._read_raw())
+                data += self._decoder.flush()
+                self._raw_exhausted = True
+            self._decoded = b''
+            return data
+
+        while len(self._decoded) < amt and not self._raw_exhausted:
+            raw = self._read_raw(max(amt, self.CHUNK_SIZE))
+            if raw:
+                self._decoded += self._decompress(raw)
+            else:
+                self._decoded += self._decoder.flush()
+                self._raw_exhausted = True
+
+        data, self._decoded = self._decoded[:amt], self._decoded[amt:]
+        return data
+
+
+    def readinto(self, b):
+        """
+        Reads the body into a pre-allocated writable buffer.
+
+        :param b:
+            A writable buffer like :class:`bytearray` or :class:`memoryview`.
+
+        :returns:
+            Number of bytes read, ``0`` at the end of the body.
+        """
+
+        readinto = getattr(self.httplib_response, 'readinto', None)
+        if readinto and self._decoder is None:
+            size = readinto(b)
+            self.raw_size += size
+            return size
+
+        # Python 2 httplib responses don't have the readinto() method.
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+    def iter_content(self, chunk_size=None):
+        """
+        Iterates over the body in chunks without reading all of it into
+        memory.
+
+        If the :attr:`.content` has already been read, it is iterated over
+        instead.
+
+        :param int chunk_size:
+            Maximum size of the chunks in bytes. If ``None``,
+            :attr:`.CHUNK_SIZE` will be used.
+
+        :returns:
+            A generator of :class:`bytes` chunks.
+        """
+
+        chunk_size = chunk_size or self.CHUNK_SIZE
+
+        if self._content is not None:
+            content = self._content
+            if not isinstance(content, six.binary_type):
+                content = content.encode('utf-8')
+            for i in range(0, len(content), chunk_size):
+                yield content[i:i + chunk_size]
+            return
+
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+    def iter_lines(self, chunk_size=None, keepends=False):
+        """
+        Iterates over the lines of the body without reading all of it into
+        memory, e.g. to parse newline delimited JSON exports.
+
+        :param int chunk_size:
+            Size of the chunks in bytes read from the body.
+
+        :param bool keepends:
+            If ``True``, the line breaks will be kept.
+
+        :returns:
+            A generator of :class:`bytes` lines.
+        """
+
+        pending = b''
+        for chunk in self.iter_content(chunk_size):
+            lines = (pending + chunk).splitlines(True)
+            # The last line may continue in the next chunk.
+            pending = b'' if lines[-1].endswith(b'\n') else lines.pop()
+            for line in lines:
+                yield line if keepends else line.rstrip(b'\r\n')
+
+        if pending:
+            yield pending
+
+
+    def save(self, destination, chunk_size=None):
+        """
+        Copies the body to a file without reading all of it into memory.
+
+        :param destination:
+            Path of the file or a writable file-like object.
+
+        :param int chunk_size:
+            Size of the buffer in bytes. If ``None``, :attr:`.CHUNK_SIZE`
+            will be used.
+
+        :returns:
+            Number of bytes written.
+        """
+
+        if isinstance(destination, six.string_types):
+            with open(destination, 'wb') as f:
+                return self.save(f, chunk_size)
+
+        if self._content is not None:
+            written = 0
+            for chunk in self.iter_content(chunk_size):
+                destination.write(chunk)
+                written += len(chunk)
+            return written
+
+        buffer_ = bytearray(chunk_size or self.CHUNK_SIZE)
+        view = memoryview(buffer_)
+        written = 0
+        while True:
+            size = self.readinto(view)
+            if not size:
+                return written
+            destination.write(view[:size])
+            written += size
+
+
+    def close(self):
+        """
+        Closes the response. Call it if you stop reading the body before
+        its end.
+        """
+
+        self.httplib_response.close()
 
 
     def getheader(self, name, default=None):
         """
-        Same as :meth:`httplib.HTTPResponse.getheader`.
+        Same as :meth:`httplib.HTTPResponse.getheader` but returns
+        the :data:`default` for the :attr:`.ENCODING_HEADERS` if the body is
+        decompressed.
 
         :param name:
         :param default:
         """
 
+        if self._decoder is not None and \
+                name.lower() in self.ENCODING_HEADERS:
+            return default
         return self.httplib_response.getheader(name, default)
 
 
@@ -1072,9 +2194,15 @@ class Response(ReprMixin):
 
     def getheaders(self):
         """
-        Same as :meth:`httplib.HTTPResponse.getheaders`.
+        Same as :meth:`httplib.HTTPResponse.getheaders` but without
+        the :attr:`.ENCODING_HEADERS` if the body is decompressed, so that
+        the headers can be forwarded with the decompressed body.
         """
-        return self.httplib_response.getheaders()
+        headers = self.httplib_response.getheaders()
+        if self._decoder is not None:
+            headers = [(k, v) for k, v in headers
+                       if k.lower() not in self.ENCODING_HEADERS]
+        return headers
 
 
     def is_binary_string(self, content):
@@ -1093,8 +2221,8 @@ class Response(ReprMixin):
         The whole response content.
         """
 
-        if not self._content:
-            content = self.httplib_response.read()
+        if self._content is None:
+            content = self.read()
             if self.is_binary_string(content):
                 self._content = content
             else:
@@ -1109,7 +2237,12 @@ class Response(ReprMixin):
         """
 
         if not self._data:
-            self._data = self.content_parser(self.content)
+            try:
+                self._data = self.content_parser(self.content)
+            except (ValueError, ElementTree.ParseError):
+                if self._fallback is None:
+                    raise
+                self._data = self._fallback(self.content)
         return self._data
 
 
@@ -1190,19 +2323,200 @@ class RequestElements(tuple):
 
         return self.url + '?' + self.query_string
 
-    def to_json(self):
-        return json.dumps(dict(url=self.url,
-                          method=self.method,
-                          params=self.params,
-                          headers=self.headers,
-                          body=self.body))
+    def to_json(self, json_codec=None):
+        """
+        Serializes the request elements to JSON.
+
+        :param json_codec:
+            A :doc:`JSON codec </reference/jsoncodec>` or ``None`` for the
+            default one.
+        """
+
+        return jsoncodec.get_codec(json_codec).dumps(dict(url=self.url,
+                                                          method=self.method,
+                                                          params=self.params,
+                                                          headers=self.headers,
+                                                          body=self.body))
+
+
+class RedirectCache(object):
+    """
+    A thread-safe bounded LRU cache of permanent ``301`` and ``308``
+    redirects shared by all providers of an :class:`.Authomatic` instance,
+    so that requests to moved endpoints go straight to their new location.
+
+    Only the URL without the query string is remembered and only if the
+    redirect didn't change the query string.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        :param int maxsize:
+            Maximum number of remembered redirects.
+        """
+
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._redirects = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._redirects)
+
+    def resolve(self, url):
+        """
+        Returns the new location of the :data:`url` if it has been
+        permanently redirected, otherwise the :data:`url`.
+        """
+
+        base, sep, query = url.partition('?')
+
+        with self._lock:
+            target = self._redirects.pop(base, None)
+            if target is None:
+                return url
+            # Mark as recently used.
+            self._redirects[base] = target
+
+        return target + sep + query
+
+    def add(self, url, location):
+        """
+        Remembers a permanent redirect.
+
+        :param str url:
+            The redirected URL.
+
+        :param str location:
+            The absolute URL it has been redirected to.
+        """
+
+        base, _, query = url.partition('?')
+        target, _, target_query = location.partition('?')
+
+        if base == target or query != target_query:
+            return
+
+        with self._lock:
+            self._redirects.pop(base, None)
+            self._redirects[base] = target
+            while len(self._redirects) > self.maxsize:
+                self._redirects.popitem(last=False)
+
+    def clear(self):
+        """
+        Forgets all redirects.
+        """
+
+        with self._lock:
+            self._redirects.clear()
+
+
+class _Flight(object):
+    """A call in progress in a :class:`.SingleFlight`."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls with the same key into a single call.
+
+    The first caller of :meth:`.do` with a key, the *leader*, runs the
+    function, and callers with the same key which come while it is running,
+    the *followers*, wait for its result or exception instead of running the
+    function again.
+
+    Pass an instance to the ``single_flight`` argument of
+    :class:`.Authomatic` to coalesce identical concurrent ``GET`` requests
+    to **protected resources**.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = dict(calls=0, coalesced=0)
+
+    def __len__(self):
+        return len(self._flights)
+
+    @property
+    def stats(self):
+        """
+        A :class:`dict` with the number of ``calls`` and of ``coalesced``
+        calls which waited for a leader.
+        """
+
+        with self._lock:
+            return dict(self._stats)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Calls the function unless a call with the same key is in progress.
+
+        :param key:
+            A hashable key of the call.
+
+        :param callable func:
+            The function to call with the rest of the arguments.
+
+        :raises Exception:
+            The exception raised by the function of the leader.
+
+        :returns:
+            A ``(result, coalesced)`` tuple where ``coalesced`` is ``True`` if
+            the result comes from the call of another thread. The result is
+            the same object for all callers, don't modify it.
+        """
+
+        with self._lock:
+            self._stats['calls'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                six.reraise(*flight.error)
+            return flight.result, True
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except BaseException:
+            flight.error = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+        return flight.result, False
+
+
+# Coalesces concurrent refreshes of the same refresh token in the process.
+_refresh_flights = SingleFlight()
+
+#: Number of seconds for which a refresh lock record of tokens without
+#: expiration is considered new.
+REFRESH_RECORD_MAX_AGE = 60
 
 
 class Authomatic(object):
     def __init__(self, config, secret, session_max_age=600, secure_cookie=False,
                  session=None, session_save_method=None, report_errors=True,
                  debug=False, logging_level=logging.INFO, prefix='authomatic',
-                 logger=None):
+                 logger=None, connection_pool=None, transport=None,
+                 async_transport=None, executor=None,
+                 max_workers=DEFAULT_MAX_WORKERS, redirect_cache=None,
+                 cache=None, ssl_context=None, retry_policy=None,
+                 rate_limits=None, single_flight=None, json_codec=None,
+                 refresh_lock=None):
         """
         Encapsulates all the functionality of this package.
         
@@ -1246,9 +2560,88 @@ class Authomatic(object):
 
         :param logger:
             A :class:`logging.logger` instance.
+
+        :param connection_pool:
+            A :class:`.ConnectionPool` instance shared by all providers
+            to keep connections to the **providers** alive.
+            If ``None``, a pool with default settings will be created.
+            Used only by the default :class:`.HTTPClientTransport`.
+            The pool keeps its own :attr:`.ConnectionPool.ssl_context`, so
+            don't pass a different :data:`ssl_context` together with it.
+
+        :param transport:
+            A :class:`.BaseTransport` instance through which all the
+            requests to **providers** will be made.
+            If ``None``, the :class:`.HTTPClientTransport` will be used.
+            The transport keeps its own TLS settings, so if you pass an
+            :data:`ssl_context` too, the transport must have the same
+            ``ssl_context``, e.g. ``HTTP2Transport(ssl_context=context)``.
+
+        :param async_transport:
+            Transport used by the coroutine methods like
+            :meth:`.access_async`.
+            If ``None``, an :class:`.aio.StreamsTransport` will be created
+            on first use.
+
+        :param executor:
+            A :class:`concurrent.futures.Executor` which runs the ``async_*``
+            methods like :meth:`.async_access`.
+            If ``None``, a :class:`concurrent.futures.ThreadPoolExecutor`
+            will be created.
+
+        :param int max_workers:
+            Maximum number of threads of the executor created if
+            :data:`executor` is ``None``.
+
+        :param redirect_cache:
+            A :class:`.RedirectCache` instance shared by all providers.
+            If ``None``, a cache with default settings will be created.
+
+        :param cache:
+            A :doc:`cache backend </reference/cache>` like
+            :class:`.MemoryCache` to cache ``GET`` requests to
+            **protected resources**.
+            If ``None``, no responses will be cached.
+
+        :param ssl_context:
+            :class:`ssl.SSLContext` shared by all ``https`` connections.
+            Build it once with your CA bundle, TLS versions or client
+            certificates. If ``None``, the context of the
+            :data:`connection_pool` will be used.
+            A :class:`.ConfigError` is raised if the :data:`connection_pool`
+            or the :data:`transport` uses a different context.
+
+        :param retry_policy:
+            A :class:`.RetryPolicy` of requests to all **providers**.
+            If ``None``, failed requests won't be retried.
+
+        :param rate_limits:
+            A :class:`.RateLimitTracker` which keeps the quotas reported by
+            the **providers**. If ``None``, a tracker which doesn't
+            delay or reject any requests will be created.
+
+        :param single_flight:
+            A :class:`.SingleFlight` instance to coalesce concurrent
+            ``GET`` requests to the same **protected resource** with the same
+            credentials into a single request. Requests which differ only in
+            their headers are coalesced too.
+            If ``None``, every call makes its own request.
+
+        :param json_codec:
+            A :doc:`JSON codec </reference/jsoncodec>` instance or name used
+            to serialize the *login result* and to parse and serialize the
+            JSON of :meth:`.request_elements` and :meth:`.backend`.
+            If ``None``, the fastest installed codec will be used.
+
+        :param refresh_lock:
+            A :doc:`lock backend </reference/locks>` which serializes
+            refreshes of the same credentials across processes.
+            If ``True``, a :class:`.FileLockBackend` will be used.
+            If ``None``, refreshes are coalesced only within the process.
         """
         
         self.config = config
+        self.registry = ProviderRegistry(config)
         self.secret = secret
         self.session_max_age = session_max_age
         self.secure_cookie = secure_cookie
@@ -1259,6 +2652,35 @@ class Authomatic(object):
         self.logging_level = logging_level
         self.prefix = prefix
         self._logger = logger or logging.getLogger(str(id(self)))
+
+        if ssl_context is not None and connection_pool is not None and \
+                connection_pool.ssl_context is not ssl_context:
+            raise ConfigError('The ssl_context would be ignored, because '
+                              'the connection_pool uses its own! Pass the '
+                              'ssl_context to the connection_pool instead.')
+
+        if ssl_context is not None and transport is not None and \
+                getattr(transport, 'ssl_context', None) is not ssl_context:
+            raise ConfigError('The ssl_context would be ignored, because '
+                              'the transport uses its own! Pass the '
+                              'ssl_context to the transport instead.')
+
+        self.connection_pool = connection_pool or \
+            ConnectionPool(ssl_context=ssl_context)
+        self.ssl_context = ssl_context or self.connection_pool.ssl_context
+        self.transport = transport or HTTPClientTransport(self.connection_pool)
+        self.async_transport = async_transport
+        self.executor = executor or futures.ThreadPoolExecutor(max_workers)
+        self.redirect_cache = RedirectCache() if redirect_cache is None \
+            else redirect_cache
+        self.cache = cache
+        self.retry_policy = retry_policy
+        self.rate_limits = RateLimitTracker(enforce=False) \
+            if rate_limits is None else rate_limits
+        self.single_flight = single_flight
+        self.json_codec = jsoncodec.get_codec(json_codec)
+        self.refresh_lock = locks.FileLockBackend() if refresh_lock is True \
+            else refresh_lock
         
         # Set logging level.
         if logger is None:
@@ -1315,11 +2737,7 @@ class Authomatic(object):
                 session_saver = session.save
     
             # Resolve provider class.
-            class_ = provider_settings.get('class_')
-            if not class_:
-                raise ConfigError('The "class_" key not specified in the config'
-                                  ' for provider {0}!'.format(provider_name))
-            ProviderClass = resolve_provider_class(class_)
+            ProviderClass = self.registry.provider_class(provider_name)
 
             # FIXME: Find a nicer solution
             ProviderClass._logger = self._logger
@@ -1339,6 +2757,58 @@ class Authomatic(object):
         else:
             # Act like backend.
             self.backend(adapter)
+    
+    
+    def warmup(self, timeout=5):
+        """
+        Resolves and opens connections to the hosts of the
+        ``access_token_url`` and ``user_info_url`` of all providers in the
+        :doc:`config`, so that the first logins don't have to wait for the
+        DNS lookup, TCP and TLS handshakes.
+        
+        Call it once when your application starts. The connections are
+        opened concurrently by the :attr:`.executor` and kept in the
+        :attr:`.connection_pool` until they are used or evicted. See the
+        ``preconnects`` and ``warm_hits`` keys of the
+        :attr:`.ConnectionPool.stats` to find out how many of them were
+        actually used.
+        
+        .. note::
+        
+            The OAuth 1.0a and OAuth 2.0 providers also open a connection to
+            the ``access_token_url`` in the background when they redirect the
+            **user** to the **provider**.
+        
+        :param float timeout:
+            Connect timeout in seconds.
+        
+        :returns:
+            :class:`list` of URLs of the hosts to which a new connection
+            has been opened.
+        """
+        
+        urls = {}
+        for ProviderClass in self.registry.classes.values():
+            for name in ('access_token_url', 'user_info_url'):
+                url = getattr(ProviderClass, name, None)
+                if isinstance(url, six.string_types) and url:
+                    scheme, host = parse.urlsplit(url)[:2]
+                    urls.setdefault((scheme, host), url)
+        
+        futures_ = dict((self.executor.submit(self.transport.preconnect,
+                                              url, timeout), url)
+                        for url in urls.values())
+        
+        warmed = []
+        for future in futures.as_completed(futures_):
+            url = futures_[future]
+            try:
+                if future.result():
+                    warmed.append(url)
+            except Exception as e:
+                self._logger.warning(u'Could not warm up connection to {0}: {1}'
+                                     .format(url, e))
+        return warmed
 
  
     def credentials(self, credentials):
@@ -1352,10 +2822,175 @@ class Authomatic(object):
             :class:`.Credentials`
         """
     
-        return Credentials.deserialize(self.config, credentials)
+        credentials = Credentials.deserialize(self.registry, credentials)
+        if credentials._settings is None:
+            credentials._settings = self
+        return credentials
+    
+    
+    def deserialize_many(self, iterable, output='credentials'):
+        """
+        Deserializes many credentials, e.g. rows of a database, in a
+        generator.
+
+        The provider of each ``id`` found in the serialized credentials is
+        looked up only once.
+
+        ::
+
+            for record in authomatic.deserialize_many(rows, output='tuple'):
+                refresh_if_needed(record.provider_name, record.token)
+
+        :param iterable:
+            Credentials serialized with :meth:`.Credentials.serialize` in
+            any format.
+
+        :param str output:
+            ``'credentials'`` for :class:`.Credentials` instances,
+            ``'tuple'`` for :class:`.CredentialsRecord` named tuples or
+            ``'dict'`` for :class:`dict` instances with the fields of
+            :class:`.CredentialsRecord`. The tuples and dicts don't reference
+            the :doc:`config` and are cheaper to create.
+
+        :raises ConfigError:
+            If the ``output`` is unknown.
+
+        :returns:
+            A generator.
+        """
+
+        if output not in ('credentials', 'tuple', 'dict'):
+            raise ConfigError('Unknown output "{0}"!'.format(output))
+
+        # Validate the output now rather than on the first iteration.
+        return self._deserialize_many(iterable, output)
+
+
+    def _deserialize_many(self, iterable, output):
+        providers = {}
+        fields = CredentialsRecord._fields
+
+        for serialized in iterable:
+            if isinstance(serialized, Credentials):
+                credentials = serialized
+                provider_name = credentials.provider_name
+            else:
+                provider_id, provider_type_id, items = \
+                    _deserialize(serialized)
+
+                provider = providers.get(provider_id)
+                if provider is None:
+                    provider_name = self.registry.name_by_id(provider_id)
+                    ProviderClass = self.registry.provider_class(
+                        provider_name)
+                    provider = providers[provider_id] = (
+                        provider_name,
+                        self.config.get(provider_name),
+                        ProviderClass,
+                        ProviderClass.get_type(),
+                    )
+                provider_name, cfg, ProviderClass, provider_type = provider
+
+                if output == 'credentials':
+                    credentials = Credentials(self.config, settings=self)
+                else:
+                    # The record needs only what reconstruct() sets.
+                    credentials = Credentials.__new__(Credentials)
+                    credentials.__dict__.update(_RECORD_DEFAULTS)
+
+                credentials.provider_id = provider_id
+                credentials.provider_type = provider_type
+                credentials.provider_type_id = provider_type_id
+                credentials.provider_class = ProviderClass
+                credentials.provider_name = provider_name
+                credentials = ProviderClass.reconstruct(items, credentials,
+                                                        cfg)
+
+            if output == 'credentials':
+                yield credentials
+                continue
+
+            record = CredentialsRecord(provider_name,
+                                       credentials.provider_id,
+                                       credentials.provider_type_id,
+                                       credentials.token,
+                                       credentials.token_type,
+                                       credentials.refresh_token,
+                                       credentials.token_secret,
+                                       credentials.expiration_time)
+            yield record if output == 'tuple' else dict(zip(fields, record))
+
+
+    def serialize_many(self, iterable, compact=False):
+        """
+        Serializes many credentials in a generator.
+
+        The provider of each ``provider_name`` is looked up only once.
+
+        :param iterable:
+            :class:`.Credentials` instances, :class:`.CredentialsRecord`
+            tuples or :class:`dict` instances with the same fields, e.g. as
+            returned by :meth:`.deserialize_many`.
+
+        :param bool compact:
+            Whether to use the compact format, see
+            :meth:`.Credentials.serialize`.
+
+        :returns:
+            A generator of :class:`str`.
+        """
+
+        type_classes = {}
+
+        for credentials in iterable:
+            if isinstance(credentials, dict):
+                credentials = CredentialsRecord(**credentials)
+
+            provider_name = credentials.provider_name
+            type_class = type_classes.get(provider_name)
+            if type_class is None:
+                if isinstance(credentials, Credentials):
+                    type_class = credentials.provider_type_class()
+                else:
+                    type_class = resolve_provider_class(
+                        self.registry.provider_class(provider_name).get_type())
+                type_classes[provider_name] = type_class
+
+            if credentials.provider_id is None:
+                raise ConfigError('To serialize credentials you need to '
+                                  'specify a unique integer under the "id" '
+                                  'key in the config for each provider!')
+
+            yield _serialize(credentials.provider_id,
+                             credentials.provider_type_id,
+                             type_class.to_tuple(credentials), compact)
+
+
+    def rate_limit(self, credentials):
+        """
+        Returns the current :doc:`rate limit </reference/ratelimit>` budgets
+        of the credentials as reported by the last responses of the
+        **provider**.
+    
+        :param credentials:
+            Credentials serialized with :meth:`.Credentials.serialize` or :class:`.Credentials` instance.
+    
+        :returns:
+            A :class:`dict` of :class:`.RateLimit` instances of the access
+            token under the ``'token'`` key and of the consumer under
+            the ``'app'`` key.
+        """
     
+        credentials = self.credentials(credentials)
+        provider_name = credentials.provider_name
+        consumer_key = self.registry.settings_of(provider_name).get(
+            'consumer_key')
+        return self.rate_limits.lookup(provider_name, credentials,
+                                       consumer_key)
     
-    def access(self, credentials, url, params=None, method='GET', headers=None, body='', max_redirects=5, content_parser=None):
+    
+    def access(self, credentials, url, params=None, method='GET', headers=None, body='', max_redirects=5,
+               content_parser=None, timeout=None, deadline=None):
         """
         Accesses **protected resource** on behalf of the **user**.
     
@@ -1380,12 +3015,27 @@ class Authomatic(object):
         :param function content_parser:
             A function to be used to parse the :attr:`.Response.data` from :attr:`.Response.content`.
     
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple.
+            If ``None``, the ``timeout`` from :doc:`config` will be used.
+    
+        :param float deadline:
+            Total number of seconds until the response headers must be
+            received, including all redirects.
+            If ``None``, the ``deadline`` from :doc:`config` will be used.
+    
+        :raises .FetchTimeoutError:
+            If the timeout or the deadline has been exceeded.
+    
+        :raises .RateLimitError:
+            If the :attr:`.rate_limits` tracker rejects the request.
+    
         :returns:
             :class:`.Response`
         """
     
         # Deserialize credentials.
-        credentials = Credentials.deserialize(self.config, credentials)
+        credentials = self.credentials(credentials)
     
         # Resolve provider class.
         ProviderClass = credentials.provider_class
@@ -1401,22 +3051,234 @@ class Authomatic(object):
                                headers=headers,
                                body=body,
                                max_redirects=max_redirects,
-                               content_parser=content_parser)
+                               content_parser=content_parser,
+                               timeout=timeout,
+                               deadline=deadline)
     
     
-    def async_access(self, *args, **kwargs):
+    def paginate(self, credentials, url, params=None, paginator=None,
+                 prefetch=1, max_pages=None, **kwargs):
         """
-        Same as :meth:`.Authomatic.access` but runs asynchronously in a separate thread.
+        Returns a generator of the items of all pages of a **protected
+        resource**. See :doc:`/reference/pagination`.
     
-        .. warning::
-
-            |async|
+        :param credentials:
+            The **user's** :class:`.Credentials` (serialized or normal).
+    
+        :param str url:
+            The URL of the first page.
+    
+        :param dict params:
+            The params of the first page.
+    
+        :param paginator:
+            A :class:`.BasePaginator` instance. If ``None``, the
+            ``paginator`` of the provider class will be used.
+    
+        :param int prefetch:
+            Maximum number of pages which are fetched in the background or
+            wait to be consumed. If ``0``, the pages are fetched only when
+            needed.
+    
+        :param int max_pages:
+            Maximum number of pages to fetch or ``None`` for all.
+    
+        The rest of the keyword arguments is passed to :meth:`.access`.
+    
+        :returns:
+            A generator of items.
+        """
+    
+        credentials = self.credentials(credentials)
+        provider = credentials.provider_class(
+            self, adapter=None, provider_name=credentials.provider_name)
+        provider.credentials = credentials
+    
+        return provider.paginate(url, params, paginator, prefetch, max_pages,
+                                 **kwargs)
+    
+    
+    def async_access(self, *args, **kwargs):
+        """
+        Same as :meth:`.Authomatic.access` but runs asynchronously in
+        the :attr:`.executor`.
     
         :returns:
-            :class:`.Future` instance representing the separate thread.
+            :class:`.Future` instance representing the activity.
         """
     
-        return Future(self.access, *args, **kwargs)
+        return Future.submit(self.executor, self.access, *args, **kwargs)
+    
+    
+    #: Names of the arguments of :meth:`.access` in order, used to convert
+    #: the items passed to :meth:`.access_many`.
+    _ACCESS_ARGS = ('credentials', 'url', 'params', 'method', 'headers',
+                    'body', 'max_redirects', 'content_parser', 'timeout',
+                    'deadline')
+    
+    
+    def access_many(self, requests, concurrency=None, per_host=None):
+        """
+        Accesses many **protected resources** concurrently in the
+        :attr:`.executor`.
+        
+        Requests with the same credentials value which are in flight at once
+        share one deserialized :class:`.Credentials` instance, so it is
+        cheap to access many resources on behalf of a single **user** as
+        well as a single resource on behalf of many **users**. The
+        credentials are forgotten as soon as their last request completes
+        and each request gets its own provider instance.
+        
+        The :data:`requests` are consumed lazily, so it can be a generator
+        of any length.
+        
+        ::
+        
+            requests = [(credentials, url) for url in urls]
+            for index, future in authomatic.access_many(requests,
+                                                        per_host=4):
+                try:
+                    response = future.result()
+                except FetchError as e:
+                    print('{0} failed: {1}'.format(urls[index], e))
+        
+        :param requests:
+            An iterable of requests. Each one is either a :class:`tuple` of
+            the positional arguments of :meth:`.access`, e.g.
+            ``(credentials, url, params, method)``, or a :class:`dict` of its
+            keyword arguments.
+        
+        :param int concurrency:
+            Maximum number of requests in flight at once.
+            If ``None``, the ``max_workers`` of the :attr:`.executor` will be
+            used.
+        
+        :param int per_host:
+            Maximum number of requests to a single host in flight at once.
+            If ``None``, only the :data:`concurrency` applies.
+        
+        :returns:
+            A generator which yields ``(index, future)`` tuples in the order
+            in which the requests complete, where ``index`` is the position
+            of the request in :data:`requests` and ``future`` is a done
+            :class:`.Future` whose result is a :class:`.Response`.
+        """
+        
+        if concurrency is None:
+            concurrency = getattr(self.executor, '_max_workers',
+                                  DEFAULT_MAX_WORKERS)
+        
+        requests = enumerate(requests)
+        exhausted = False
+        # Requests waiting for their host to have a free slot.
+        waiting = collections.deque()
+        in_flight = {}
+        per_host_count = collections.defaultdict(int)
+        # The credentials value, the deserialized credentials and the number
+        # of requests in flight keyed by credentials value.
+        shared = {}
+        
+        def prepare(index, request):
+            if isinstance(request, dict):
+                kwargs = dict(request)
+            else:
+                kwargs = dict(zip(self._ACCESS_ARGS, request))
+            host = parse.urlsplit(kwargs.get('url', '')).netloc.lower()
+            return index, host, kwargs
+        
+        def submit(index, host, kwargs):
+            credentials = kwargs.pop('credentials', None)
+            key = credentials if isinstance(credentials, six.string_types) \
+                else id(credentials)
+            
+            future = Future()
+            try:
+                if key in shared:
+                    value, deserialized, count = shared[key]
+                else:
+                    # Keep the value alive so that its id() is not reused.
+                    value, deserialized, count = \
+                        credentials, self.credentials(credentials), 0
+                # Providers are not thread-safe, so each request gets its own.
+                provider = deserialized.provider_class(
+                    self, adapter=None,
+                    provider_name=deserialized.provider_name)
+                provider.credentials = deserialized
+                future = Future.submit(self.executor, provider.access,
+                                       **kwargs)
+                shared[key] = (value, deserialized, count + 1)
+            except Exception as e:
+                future.set_running_or_notify_cancel()
+                future.set_exception(e)
+                key = None
+            
+            in_flight[future] = (index, host, key)
+            per_host_count[host] += 1
+        
+        def release(key):
+            value, deserialized, count = shared[key]
+            if count > 1:
+                shared[key] = (value, deserialized, count - 1)
+            else:
+                del shared[key]
+        
+        while True:
+            # Submit waiting requests whose host has a free slot.
+            for _ in range(len(waiting)):
+                if len(in_flight) >= concurrency:
+                    break
+                item = waiting.popleft()
+                if per_host and per_host_count[item[1]] >= per_host:
+                    waiting.append(item)
+                else:
+                    submit(*item)
+            
+            # Pull new requests while there is a free slot, but don't read
+            # ahead more than one batch of requests blocked by their host.
+            while not exhausted and len(in_flight) < concurrency and \
+                    len(waiting) < concurrency:
+                try:
+                    item = prepare(*next(requests))
+                except StopIteration:
+                    exhausted = True
+                    break
+                if per_host and per_host_count[item[1]] >= per_host:
+                    waiting.append(item)
+                else:
+                    submit(*item)
+            
+            if not in_flight:
+                return
+            
+            done, _ = futures.wait(list(in_flight),
+                                   return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                index, host, key = in_flight.pop(future)
+                per_host_count[host] -= 1
+                if key is not None:
+                    release(key)
+                yield index, future
+    
+    
+    def access_async(self, credentials, url, params=None, method='GET',
+                     headers=None, body='', max_redirects=5,
+                     content_parser=None, timeout=None, deadline=None):
+        """
+        Same as :meth:`.Authomatic.access` but returns a coroutine to be
+        awaited in an :mod:`asyncio` event loop.
+        
+        .. warning::
+        
+            Requires Python 3.5 or newer.
+        
+        :returns:
+            Coroutine which returns :class:`.Response`.
+        """
+        
+        from authomatic import aio
+        return aio.access(self, credentials, url, params, method, headers,
+                          body, max_redirects, content_parser, timeout,
+                          deadline)
     
     
     def request_elements(self, credentials=None, url=None, method='GET', params=None,
@@ -1490,7 +3352,7 @@ class Authomatic(object):
     
         # Parse values from JSON
         if json_input:
-            parsed_input = json.loads(json_input)
+            parsed_input = self.json_codec.loads(json_input)
     
             credentials = parsed_input.get('credentials', credentials)
             url = parsed_input.get('url', url)
@@ -1504,7 +3366,7 @@ class Authomatic(object):
                                         'and URL either as keyword arguments or in the JSON object!')
     
         # Get the provider class
-        credentials = Credentials.deserialize(self.config, credentials)
+        credentials = self.credentials(credentials)
         ProviderClass = credentials.provider_class
     
         # Create request elements
@@ -1517,7 +3379,7 @@ class Authomatic(object):
                                                                  body=body)
     
         if return_json:
-            return request_elements.to_json()
+            return request_elements.to_json(self.json_codec)
     
         else:
             return request_elements
@@ -1616,12 +3478,12 @@ class Authomatic(object):
     
     
         params = adapter.params.get('params')
-        params = json.loads(params) if params else {}
+        params = self.json_codec.loads(params) if params else {}
     
         headers = adapter.params.get('headers')
-        headers = json.loads(headers) if headers else {}
+        headers = self.json_codec.loads(headers) if headers else {}
     
-        ProviderClass = Credentials.deserialize(self.config, credentials).provider_class
+        ProviderClass = Credentials.deserialize(self.registry, credentials).provider_class
     
         if request_type == 'auto':
             # If there is a "callback" param, it's a JSONP request.
@@ -79,6 +79,30 @@ class FetchError(BaseError):
     pass
 
 
+class FetchTimeoutError(FetchError):
+    pass
+
+
+class RateLimitError(FetchError):
+    """
+    Raised when a request would exceed the quota of the **provider**.
+    """
+    
+    def __init__(self, message, original_message='', url='', status=None,
+                 reset=None):
+        super(RateLimitError, self).__init__(message, original_message, url,
+                                             status)
+        
+        #: UNIX timestamp when the quota will be restored or ``None``.
+        self.reset = reset
+
+
+class LockError(BaseError):
+    """
+    Raised when a refresh lock can't be acquired in time.
+    """
+
+
 class RequestElementsError(BaseError):
     pass
 
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+JSON Codecs
+-----------
+
+Authomatic parses JSON responses of **providers** and serializes the
+:class:`.LoginResult` and :class:`.RequestElements` to JSON with a codec
+which uses the fastest installed JSON library, |orjson|_ or |ujson|_, and
+falls back to the standard :mod:`json` module.
+
+Responses are always parsed with the auto-detected codec. The codec used by
+an :class:`.Authomatic` instance for the *login result*,
+:meth:`.Authomatic.request_elements` and :meth:`.Authomatic.backend` can be
+set with its ``json_codec`` argument, either a codec instance or one of the
+names ``'orjson'``, ``'ujson'`` and ``'json'``:
+
+::
+
+    from authomatic import Authomatic
+
+    authomatic = Authomatic(CONFIG, 'secret', json_codec='json')
+
+The codecs produce the same JSON up to insignificant whitespace and the
+escaping of non-ASCII characters. Indentation which a library doesn't
+support is delegated to the :mod:`json` module, except for |orjson|_ whose
+output is re-indented.
+
+Objects which the libraries can't serialize are converted by the encoder
+registered for their class with :func:`.register_encoder`. The
+:class:`.User`, :class:`.Credentials`, the **providers** and the exceptions
+have their own encoders.
+
+JSON embedded in an inline ``<script>`` must be passed through
+:func:`.escape_script`.
+
+.. autosummary::
+    :nosignatures:
+
+    JSONCodec
+    OrjsonCodec
+    UjsonCodec
+    get_codec
+    register_encoder
+    escape_script
+
+"""
+
+import json
+import re
+
+from authomatic import six
+from authomatic.exceptions import ConfigError
+
+
+__all__ = ['JSONCodec', 'OrjsonCodec', 'UjsonCodec', 'get_codec', 'loads',
+           'dumps', 'encode', 'register_encoder', 'escape_script']
+
+
+# Encoders by the classes they were registered for.
+_encoders = {}
+# Encoders by the classes of the encoded objects, including subclasses.
+_encoders_by_type = {}
+
+_INDENT_RE = re.compile(r'^(?:  )+', re.MULTILINE)
+_SCRIPT_UNSAFE_RE = re.compile(u'[\u2028\u2029]|</')
+_SCRIPT_ESCAPES = {
+    u'\u2028': u'\\u2028',
+    u'\u2029': u'\\u2029',
+    u'</': u'<\\/',
+}
+
+
+def register_encoder(cls, encoder):
+    """
+    Registers the encoder of instances of a class and its subclasses.
+
+    :param type cls:
+        The class.
+
+    :param callable encoder:
+        Called with an instance, returns a JSON serializable object.
+    """
+
+    _encoders[cls] = encoder
+    _encoders_by_type.clear()
+
+
+def _to_dict(obj):
+    """Encodes objects of classes without a registered encoder."""
+
+    to_dict = getattr(obj, 'to_dict', None)
+    return to_dict() if to_dict is not None else ''
+
+
+def _find_encoder(cls):
+    for base in getattr(cls, '__mro__', (cls,)):
+        encoder = _encoders.get(base)
+        if encoder is not None:
+            return encoder
+    return _to_dict
+
+
+def encode(obj):
+    """
+    Encodes objects which the JSON libraries can't serialize.
+
+    The encoder is looked up by the class of the object, see
+    :func:`.register_encoder`. Objects of other classes with
+    a ``to_dict()`` method are converted to :class:`dict`, the rest to
+    an empty string.
+    """
+
+    cls = type(obj)
+    encoder = _encoders_by_type.get(cls)
+    if encoder is None:
+        encoder = _encoders_by_type[cls] = _find_encoder(cls)
+    return encoder(obj)
+
+
+def escape_script(s):
+    """
+    Escapes JSON to be embedded in an inline ``<script>``.
+
+    The ``U+2028`` and ``U+2029`` characters, which end a JavaScript string
+    literal in older browsers, and ``</``, which could end the script, are
+    replaced by equivalent JSON escapes.
+
+    :param str s:
+        JSON.
+
+    :returns:
+        :class:`str`
+    """
+
+    return _SCRIPT_UNSAFE_RE.sub(lambda m: _SCRIPT_ESCAPES[m.group()], s)
+
+
+class JSONCodec(object):
+    """
+    Codec based on the standard :mod:`json` module.
+    """
+
+    #: Name of the codec.
+    name = 'json'
+
+    def loads(self, s):
+        """
+        Parses JSON.
+
+        :param s:
+            :class:`str` or :class:`bytes`.
+
+        :raises ValueError:
+            If the input is not valid JSON.
+        """
+
+        return json.loads(s)
+
+    def dumps(self, obj, indent=None, default=encode):
+        """
+        Serializes an object to JSON.
+
+        :param obj:
+            The object to serialize.
+
+        :param int indent:
+            Number of spaces to indent with. If ``0`` or negative, only
+            newlines are added. If ``None``, the output is compact.
+
+        :param function default:
+            Called with objects which can't be serialized otherwise.
+
+        :returns:
+            :class:`str`
+        """
+
+        return json.dumps(obj, indent=indent, default=default)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec based on |orjson|_.
+
+    Only the indentation of ``2`` spaces is supported natively, other
+    indentation is produced by replacing the leading spaces of the lines.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, s):
+        return self._orjson.loads(s)
+
+    def dumps(self, obj, indent=None, default=encode):
+        option = self._orjson.OPT_NON_STR_KEYS
+        if indent is not None:
+            option |= self._orjson.OPT_INDENT_2
+
+        try:
+            s = self._orjson.dumps(obj, default=default,
+                                   option=option).decode('utf-8')
+        except TypeError:
+            # E.g. integers which don't fit in 64 bits.
+            return super(OrjsonCodec, self).dumps(obj, indent, default)
+
+        if indent is not None and indent != 2:
+            # The strings can't contain newlines, so every line starts with
+            # two spaces per level.
+            width = max(indent, 0)
+            s = _INDENT_RE.sub(
+                lambda m: ' ' * (len(m.group()) // 2 * width), s)
+        return s
+
+
+class UjsonCodec(JSONCodec):
+    """
+    Codec based on |ujson|_ 5.0 or newer.
+
+    Only positive indentation is supported natively.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, s):
+        return self._ujson.loads(s)
+
+    def dumps(self, obj, indent=None, default=encode):
+        if indent is not None and indent <= 0:
+            return super(UjsonCodec, self).dumps(obj, indent, default)
+
+        return self._ujson.dumps(obj, indent=indent or 0, default=default,
+                                 escape_forward_slashes=False)
+
+
+#: Codec classes by name in the order of preference.
+CODECS = (
+    ('orjson', OrjsonCodec),
+    ('ujson', UjsonCodec),
+    ('json', JSONCodec),
+)
+
+_default_codec = None
+
+
+def get_codec(codec=None):
+    """
+    Returns a codec.
+
+    :param codec:
+        A codec instance, which is returned unchanged, a name of a codec or
+        ``None`` for the fastest installed codec.
+
+    :raises ConfigError:
+        If the named codec is unknown or its library is not installed.
+
+    :returns:
+        :class:`.JSONCodec`
+    """
+
+    global _default_codec
+
+    if codec is None:
+        if _default_codec is None:
+            for _, cls in CODECS:
+                try:
+                    _default_codec = cls()
+                    break
+                except ImportError:
+                    pass
+        return _default_codec
+
+    if not isinstance(codec, six.string_types):
+        return codec
+
+    for name, cls in CODECS:
+        if name == codec:
+            try:
+                return cls()
+            except ImportError as e:
+                raise ConfigError('JSON codec "{0}" is not available!'
+                                  .format(codec), original_message=str(e))
+
+    raise ConfigError('Unknown JSON codec "{0}"!'.format(codec))
+
+
+def loads(s):
+    """
+    Parses JSON with the default codec.
+    """
+
+    return get_codec().loads(s)
+
+
+def dumps(obj, indent=None, default=encode):
+    """
+    Serializes an object to JSON with the default codec.
+    """
+
+    return get_codec().dumps(obj, indent, default)
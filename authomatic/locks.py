@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+"""
+Refresh Locks
+-------------
+
+:meth:`.Credentials.refresh` coalesces concurrent refreshes of the same
+refresh token only within a process. When the application runs in several
+processes, e.g. pre-forked ``gunicorn`` workers, every process could still
+refresh the same credentials at the same moment, and **providers** which
+rotate the refresh token would then reject all but the first of them.
+
+An :class:`.Authomatic` instance with a ``refresh_lock`` backend therefore
+holds a lock of the backend around every refresh request. When a process
+gets the lock after another process has refreshed the credentials, it takes
+the new tokens which the other process left in the backend instead of
+refreshing them again:
+
+::
+
+    from authomatic.locks import FileLockBackend, NetworkLockBackend
+
+    # For processes on the same machine, same as refresh_lock=True.
+    authomatic = Authomatic(CONFIG, 'secret',
+                            refresh_lock=FileLockBackend())
+
+    # For processes on several machines.
+    authomatic = Authomatic(CONFIG, 'secret',
+                            refresh_lock=NetworkLockBackend(client))
+
+The ``client`` of the :class:`.NetworkLockBackend` adapts a lock service
+like Redis or etcd, see :class:`.LocalLockClient` for its interface.
+
+.. warning::
+
+    The backends store the new access token, and the new refresh token if
+    the **provider** rotates it, for the ``record_ttl`` seconds. The locking
+    is therefore disabled by default.
+
+.. autosummary::
+    :nosignatures:
+
+    BaseLockBackend
+    FileLockBackend
+    NetworkLockBackend
+    LocalLockClient
+
+"""
+
+import binascii
+import errno
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+import time
+import uuid
+
+from authomatic import jsoncodec, six
+from authomatic.exceptions import ConfigError, LockError
+
+
+__all__ = ['BaseLockBackend', 'FileLockBackend', 'NetworkLockBackend',
+           'LocalLockClient']
+
+# Not available on Windows.
+_O_NOFOLLOW = getattr(os, 'O_NOFOLLOW', 0)
+
+
+def _to_bytes(value):
+    if isinstance(value, six.text_type):
+        return value.encode('utf-8')
+    return value
+
+
+class BaseLockBackend(object):
+    """
+    Abstract base class for all refresh lock backends.
+
+    A backend provides an exclusive lock by a key and keeps a *record* of
+    the last refresh under the lock, so that the next holder of the lock
+    can find out that the credentials have already been refreshed.
+    """
+
+    def acquire(self, key):
+        """
+        Waits until the lock of the :data:`key` is acquired.
+
+        :param str key:
+            Key of the lock.
+
+        :raises LockError:
+            If the lock can't be acquired in time.
+
+        :returns:
+            A handle to pass to the other methods.
+        """
+
+        raise NotImplementedError
+
+    def release(self, handle):
+        """
+        Releases the lock.
+        """
+
+        raise NotImplementedError
+
+    def read(self, handle):
+        """
+        Returns the :class:`dict` record stored by the last :meth:`.write`
+        under the lock or ``None``.
+        """
+
+        raise NotImplementedError
+
+    def write(self, handle, record):
+        """
+        Stores a :class:`dict` record under the lock.
+        """
+
+        raise NotImplementedError
+
+
+class _FileLock(object):
+    """An open lock file."""
+
+    def __init__(self, key, fd):
+        self.key = key
+        self.fd = fd
+
+
+class FileLockBackend(BaseLockBackend):
+    """
+    Locks files with :func:`fcntl.flock` to coordinate processes on the same
+    machine.
+
+    The keys are hashed to a fixed number of lock files, so that the number
+    of files stays bounded. The records are stored in the lock files. The
+    directory must be owned by the current user and accessible only by them,
+    the lock files are opened without following symbolic links. Expired
+    records are removed from the lock files when the lock is acquired and
+    at most every :attr:`.record_ttl` seconds from all lock files.
+
+    .. warning::
+
+        Requires the :mod:`fcntl` module, which is not available on Windows.
+    """
+
+    def __init__(self, directory=None, timeout=30, poll_interval=0.05,
+                 stripes=1024, record_ttl=300):
+        """
+        :param str directory:
+            Directory of the lock files. It is created with the ``0700`` mode
+            if it doesn't exist. If ``None``, a directory of the current user
+            in the system temporary directory will be used.
+
+        :param float timeout:
+            Number of seconds to wait for a lock.
+
+        :param float poll_interval:
+            Number of seconds between attempts to acquire a lock.
+
+        :param int stripes:
+            Number of lock files.
+
+        :param float record_ttl:
+            Number of seconds for which the records are kept.
+
+        :raises ConfigError:
+            If the :mod:`fcntl` module is not available.
+        """
+
+        try:
+            import fcntl
+        except ImportError:
+            raise ConfigError('The FileLockBackend requires the fcntl module!')
+
+        self._fcntl = fcntl
+
+        if directory is None:
+            directory = os.path.join(
+                tempfile.gettempdir(),
+                'authomatic-locks-{0}'.format(os.getuid()))
+
+        self.directory = directory
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.stripes = stripes
+        self.record_ttl = record_ttl
+        self._checked = False
+        self._next_purge = 0
+
+    def _check_directory(self):
+        """Creates the directory or makes sure that only we can access it."""
+
+        try:
+            os.makedirs(self.directory, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        st = os.lstat(self.directory)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or \
+                st.st_mode & 0o077:
+            raise LockError('The lock directory {0} must be a directory owned '
+                            'by the current user with the 0700 mode!'
+                            .format(self.directory))
+
+    def _path(self, key):
+        stripe = binascii.crc32(_to_bytes(key)) % self.stripes
+        return os.path.join(self.directory, '{0}.lock'.format(stripe))
+
+    def _open(self, path):
+        if not self._checked:
+            self._check_directory()
+            self._checked = True
+
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | _O_NOFOLLOW, 0o600)
+        except OSError as e:
+            if e.errno == errno.ELOOP:
+                raise LockError('The lock file {0} is a symbolic link!'
+                                .format(path))
+            raise
+
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode) or st.st_uid != os.getuid() or \
+                st.st_mode & 0o077:
+            os.close(fd)
+            raise LockError('The lock file {0} must be a regular file owned '
+                            'by the current user with the 0600 mode!'
+                            .format(path))
+        return fd
+
+    def _try_lock(self, fd):
+        try:
+            self._fcntl.flock(fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+            return True
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EAGAIN, errno.EACCES):
+                raise
+            return False
+
+    def _read_record(self, fd):
+        """Returns the unexpired record of the file or ``None``."""
+
+        os.lseek(fd, 0, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(fd, 64 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        if not chunks:
+            return None
+
+        try:
+            record = jsoncodec.loads(b''.join(chunks).decode('utf-8'))
+        except ValueError:
+            record = None
+
+        if not isinstance(record, dict) or \
+                not record.get('expires', 0) > time.time():
+            # Don't keep the tokens longer than necessary.
+            os.ftruncate(fd, 0)
+            return None
+        return record
+
+    def acquire(self, key):
+        fd = self._open(self._path(key))
+        deadline = time.time() + self.timeout
+        try:
+            while not self._try_lock(fd):
+                if time.time() >= deadline:
+                    raise LockError('Could not acquire the refresh lock in '
+                                    '{0} seconds!'.format(self.timeout))
+                time.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        return _FileLock(key, fd)
+
+    def release(self, handle):
+        try:
+            self._fcntl.flock(handle.fd, self._fcntl.LOCK_UN)
+        finally:
+            os.close(handle.fd)
+
+        if time.time() >= self._next_purge:
+            self._next_purge = time.time() + self.record_ttl
+            self.purge()
+
+    def purge(self):
+        """
+        Removes the expired records from the lock files which are not
+        locked.
+        """
+
+        for stripe in range(self.stripes):
+            path = os.path.join(self.directory, '{0}.lock'.format(stripe))
+            if not os.path.exists(path):
+                continue
+            fd = self._open(path)
+            try:
+                if self._try_lock(fd):
+                    self._read_record(fd)
+            finally:
+                os.close(fd)
+
+    def read(self, handle):
+        record = self._read_record(handle.fd)
+        # Other keys may share the lock file.
+        if record is not None and record.get('key') == handle.key:
+            return record
+
+    def write(self, handle, record):
+        record = dict(record, key=handle.key,
+                      expires=time.time() + self.record_ttl)
+        data = jsoncodec.dumps(record).encode('utf-8')
+        os.lseek(handle.fd, 0, os.SEEK_SET)
+        os.ftruncate(handle.fd, 0)
+        while data:
+            data = data[os.write(handle.fd, data):]
+
+
+class NetworkLockBackend(BaseLockBackend):
+    """
+    Uses a network lock service to coordinate processes on several machines.
+
+    The service is accessed through a *client* with the interface of
+    the :class:`.LocalLockClient`. The locks expire after :attr:`.ttl`
+    seconds, so that a crashed process doesn't block the others forever.
+    """
+
+    def __init__(self, client, ttl=60, timeout=30, poll_interval=0.05,
+                 prefix='authomatic:refresh:', record_ttl=300):
+        """
+        :param client:
+            The client of the lock service.
+
+        :param float ttl:
+            Number of seconds after which a lock expires. It should be longer
+            than a refresh request may take.
+
+        :param float timeout:
+            Number of seconds to wait for a lock.
+
+        :param float poll_interval:
+            Number of seconds between attempts to acquire a lock.
+
+        :param str prefix:
+            Prefix of the names of the locks and records in the service.
+
+        :param float record_ttl:
+            Number of seconds for which the service keeps the records.
+        """
+
+        self.client = client
+        self.ttl = ttl
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self.record_ttl = record_ttl
+
+    def _name(self, key):
+        return self.prefix + hashlib.sha1(_to_bytes(key)).hexdigest()
+
+    def acquire(self, key):
+        name = self._name(key)
+        # Only the owner of the token may release the lock.
+        token = uuid.uuid4().hex
+        deadline = time.time() + self.timeout
+        while not self.client.acquire(name, token, self.ttl):
+            if time.time() >= deadline:
+                raise LockError('Could not acquire the refresh lock in '
+                                '{0} seconds!'.format(self.timeout))
+            time.sleep(self.poll_interval)
+        return name, token
+
+    def release(self, handle):
+        self.client.release(*handle)
+
+    def read(self, handle):
+        value = self.client.get(handle[0] + ':record')
+        if value is None:
+            return None
+        if isinstance(value, six.binary_type):
+            value = value.decode('utf-8')
+        try:
+            record = jsoncodec.loads(value)
+        except ValueError:
+            return None
+        if isinstance(record, dict):
+            return record
+
+    def write(self, handle, record):
+        self.client.set(handle[0] + ':record', jsoncodec.dumps(record),
+                        self.record_ttl)
+
+
+class LocalLockClient(object):
+    """
+    An in-process client of the :class:`.NetworkLockBackend` which stands in
+    for a lock service in tests and single process deployments.
+
+    Adapt a real lock service by implementing the same four methods.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (token, expiration) tuples by names of the locks.
+        self._locks = {}
+        # (value, expiration) tuples by names of the values.
+        self._values = {}
+
+    def acquire(self, name, token, ttl):
+        """
+        Acquires the lock unless another token holds it.
+
+        :param str name:
+            Name of the lock.
+
+        :param str token:
+            Unique token of the owner.
+
+        :param float ttl:
+            Number of seconds after which the lock expires.
+
+        :returns:
+            ``True`` if the lock has been acquired.
+        """
+
+        now = time.time()
+        with self._lock:
+            owner = self._locks.get(name)
+            if owner is not None and owner[1] > now:
+                return False
+            self._locks[name] = (token, now + ttl)
+            return True
+
+    def release(self, name, token):
+        """
+        Releases the lock if it is still held by the token.
+        """
+
+        with self._lock:
+            owner = self._locks.get(name)
+            if owner is not None and owner[0] == token:
+                del self._locks[name]
+
+    def get(self, name):
+        """
+        Returns the value or ``None`` if it doesn't exist or has expired.
+        """
+
+        with self._lock:
+            value = self._values.get(name)
+            if value is not None and value[1] > time.time():
+                return value[0]
+
+    def set(self, name, value, ttl):
+        """
+        Stores the value for the number of seconds.
+        """
+
+        with self._lock:
+            self._values[name] = (value, time.time() + ttl)
+
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Pagination
+----------
+
+Collections of **protected resources** like repositories, friends or
+files are usually returned in pages. :meth:`.Authomatic.paginate` and
+:meth:`.AuthorizationProvider.paginate` walk through all pages and return
+a generator of the items:
+
+::
+
+    for repo in authomatic.paginate(credentials,
+                                    'https://api.github.com/user/repos'):
+        print(repo['full_name'])
+
+How to find the items in a page and the URL of the next page is decided by
+the ``paginator`` of the provider class:
+
+* :class:`.LinkHeaderPaginator` follows the ``Link: <...>; rel="next"``
+  header, e.g. :class:`.oauth2.GitHub`. This is the default.
+* :class:`.CursorPaginator` follows the ``paging.next`` URL in the body,
+  e.g. :class:`.oauth2.Facebook`.
+* :class:`.PageTokenPaginator` repeats the request with the
+  ``nextPageToken`` from the body, e.g. :class:`.oauth2.Google`.
+
+While the items of a page are being consumed, the next pages are fetched
+in the background by the executor of the :class:`.Authomatic` instance.
+The ``prefetch`` argument limits the number of pages which are fetched or
+wait to be consumed, so that the memory use stays bounded.
+
+.. autosummary::
+    :nosignatures:
+
+    BasePaginator
+    LinkHeaderPaginator
+    CursorPaginator
+    PageTokenPaginator
+
+"""
+
+import collections
+import re
+import threading
+
+from authomatic import core
+from authomatic.exceptions import FetchError
+
+
+__all__ = ['BasePaginator', 'LinkHeaderPaginator', 'CursorPaginator',
+           'PageTokenPaginator', 'parse_link_header', 'paginate']
+
+
+_LINK_RE = re.compile(r'<([^>]*)>\s*((?:;\s*[^,;]+)*)')
+_REL_RE = re.compile(r';\s*rel\s*=\s*"?([^";]+)"?')
+
+
+def parse_link_header(value):
+    """
+    Parses the ``Link`` header.
+
+    :param str value:
+        Value of the header.
+
+    :returns:
+        :class:`dict` of URLs by their ``rel`` values.
+    """
+
+    links = {}
+    for url, params in _LINK_RE.findall(value or ''):
+        match = _REL_RE.search(params)
+        if match:
+            for rel in match.group(1).split():
+                links[rel.lower()] = url
+    return links
+
+
+class BasePaginator(object):
+    """
+    Base class of pagination strategies.
+
+    Paginators are stateless and can be shared by provider classes.
+    """
+
+    def __init__(self, items_key=None):
+        """
+        :param str items_key:
+            Key of the list of items if the page is a JSON object.
+        """
+
+        self.items_key = items_key
+
+    def items(self, response):
+        """
+        Returns the items of a page.
+
+        :param response:
+            :class:`.Response` of the page.
+
+        :returns:
+            :class:`list`
+        """
+
+        data = response.data
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict) and self.items_key:
+            return data.get(self.items_key) or []
+        return []
+
+    def next_request(self, response, url, params):
+        """
+        Returns the URL and params of the next page.
+
+        :param response:
+            :class:`.Response` of the current page.
+
+        :param str url:
+            URL of the current page.
+
+        :param dict params:
+            Params of the current page.
+
+        :returns:
+            A ``(url, params)`` tuple or ``None`` if it is the last page.
+        """
+
+        raise NotImplementedError
+
+
+class LinkHeaderPaginator(BasePaginator):
+    """
+    Follows the ``next`` URL in the ``Link`` header
+    (`RFC 5988 <https://tools.ietf.org/html/rfc5988>`_).
+    """
+
+    def __init__(self, items_key='items'):
+        super(LinkHeaderPaginator, self).__init__(items_key)
+
+    def next_request(self, response, url, params):
+        next_url = parse_link_header(response.getheader('Link')).get('next')
+        if next_url:
+            return next_url, None
+
+
+class CursorPaginator(BasePaginator):
+    """
+    Follows the URL of the next page found in the body.
+    """
+
+    def __init__(self, items_key='data', next_path=('paging', 'next')):
+        """
+        :param str items_key:
+            Key of the list of items.
+
+        :param tuple next_path:
+            Keys of the nested URL of the next page.
+        """
+
+        super(CursorPaginator, self).__init__(items_key)
+        self.next_path = next_path
+
+    def next_request(self, response, url, params):
+        value = response.data
+        for key in self.next_path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        if value:
+            return value, None
+
+
+class PageTokenPaginator(BasePaginator):
+    """
+    Repeats the request with the token of the next page found in the body.
+    """
+
+    def __init__(self, items_key='items', token_key='nextPageToken',
+                 param='pageToken'):
+        """
+        :param str items_key:
+            Key of the list of items.
+
+        :param str token_key:
+            Key of the token of the next page.
+
+        :param str param:
+            Name of the request param of the token.
+        """
+
+        super(PageTokenPaginator, self).__init__(items_key)
+        self.token_key = token_key
+        self.param = param
+
+    def next_request(self, response, url, params):
+        data = response.data
+        token = data.get(self.token_key) if isinstance(data, dict) else None
+        if token:
+            params = dict(params or {})
+            params[self.param] = token
+            return url, params
+
+
+class _Pages(object):
+    """
+    Fetches the pages in the executor, at most ``prefetch`` pages ahead.
+    """
+
+    def __init__(self, provider, paginator, prefetch, max_pages, kwargs):
+        self.provider = provider
+        self.paginator = paginator
+        self.prefetch = prefetch
+        self.max_pages = max_pages
+        self.kwargs = kwargs
+        self.executor = core._get_executor(provider.settings)
+        self._lock = threading.Lock()
+        # Futures of pages which are being fetched or wait to be consumed.
+        self._pending = collections.deque()
+        # Request of a page which didn't fit in the prefetch limit.
+        self._deferred = None
+        self._requested = 0
+        self._closed = False
+
+    def _fetch(self, request):
+        url, params = request
+        response = self.provider.access(url, params, **self.kwargs)
+        if not 200 <= response.status < 300:
+            raise FetchError('Could not fetch page!', url=url,
+                             status=response.status)
+        return (self.paginator.items(response),
+                self.paginator.next_request(response, url, params))
+
+    def _submit(self, request):
+        """Submits a request, must be called with the lock held."""
+
+        if self._closed or (self.max_pages is not None and
+                            self._requested >= self.max_pages):
+            return
+        if len(self._pending) >= self.prefetch:
+            self._deferred = request
+            return
+
+        self._requested += 1
+        self._pending.append(core.Future.submit(self.executor,
+                                                self._fetch_ahead, request))
+
+    def _fetch_ahead(self, request):
+        items, next_request = self._fetch(request)
+        if next_request:
+            with self._lock:
+                self._submit(next_request)
+        return items
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._lock:
+            if not self._pending:
+                raise StopIteration
+            future = self._pending.popleft()
+            if self._deferred:
+                request, self._deferred = self._deferred, None
+                self._submit(request)
+        return future.result()
+
+    next = __next__
+
+    def start(self, request):
+        with self._lock:
+            self._submit(request)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._deferred = None
+            for future in self._pending:
+                future.cancel()
+            self._pending.clear()
+
+
+def paginate(provider, url, params=None, paginator=None, prefetch=1,
+             max_pages=None, **kwargs):
+    """
+    Returns a generator of the items of all pages of a **protected
+    resource**.
+
+    :param provider:
+        An authenticated :class:`.AuthorizationProvider` instance.
+
+    :param str url:
+        URL of the first page.
+
+    :param dict params:
+        Params of the first page.
+
+    :param paginator:
+        A :class:`.BasePaginator` instance. If ``None``, the ``paginator``
+        of the provider class will be used.
+
+    :param int prefetch:
+        Maximum number of pages which are fetched in the background or wait
+        to be consumed. If ``0``, the pages are fetched one by one when
+        needed.
+
+    :param int max_pages:
+        Maximum number of pages to fetch or ``None`` for all.
+
+    The rest of the keyword arguments is passed to
+    :meth:`.AuthorizationProvider.access`.
+
+    :raises FetchError:
+        If a page is not fetched with a ``2xx`` status.
+    """
+
+    paginator = paginator or provider.paginator
+
+    if not prefetch:
+        pages = 0
+        request = (url, params)
+        while request and (max_pages is None or pages < max_pages):
+            pages += 1
+            url, params = request
+            response = provider.access(url, params, **kwargs)
+            if not 200 <= response.status < 300:
+                raise FetchError('Could not fetch page!', url=url,
+                                 status=response.status)
+            for item in paginator.items(response):
+                yield item
+            request = paginator.next_request(response, url, params)
+        return
+
+    pages = _Pages(provider, paginator, prefetch, max_pages, kwargs)
+    pages.start((url, params))
+    try:
+        for items in pages:
+            for item in items:
+                yield item
+    finally:
+        pages.close()
@@ -0,0 +1,756 @@
+# -*- coding: utf-8 -*-
+"""
+Connection Pool
+---------------
+
+Keeps the HTTP connections opened by **providers** alive, so that subsequent
+requests to the same host don't have to pay for a new TCP and TLS handshake.
+
+The pool also caches DNS lookups in a :class:`.DNSCache` and can open
+connections ahead of time with :meth:`.ConnectionPool.preconnect`, see
+:meth:`.Authomatic.warmup`.
+
+All ``https`` connections share one :class:`ssl.SSLContext` and new
+connections resume the TLS sessions of previous connections to the same host
+kept in a :class:`.TLSSessionCache`, which saves a round trip and the
+expensive key exchange of a full handshake.
+
+.. autosummary::
+    :nosignatures:
+
+    ConnectionPool
+    PooledResponse
+    DNSCache
+    TLSSessionCache
+
+"""
+
+import collections
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+
+from authomatic.six.moves import http_client
+
+
+__all__ = ['ConnectionPool', 'PooledResponse', 'DNSCache', 'TLSSessionCache']
+
+
+#: Methods which can be safely sent again over a fresh connection
+#: if a reused keep-alive connection turns out to be dead.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE',
+                                'TRACE'])
+
+
+def _set_timeout(connection, timeout):
+    """
+    Sets the connect and read timeouts of a connection and connects it
+    if it is not connected yet.
+
+    :param connection:
+        :class:`httplib.HTTPConnection`
+
+    :param tuple timeout:
+        ``(connect, read)`` tuple of seconds or ``None`` values.
+    """
+
+    default = socket.getdefaulttimeout()
+    connect, read = timeout or (None, None)
+
+    connection.timeout = default if connect is None else connect
+    if connection.sock is None:
+        connection.connect()
+    connection.sock.settimeout(default if read is None else read)
+
+
+def _is_dropped(connection):
+    """
+    Checks whether an idle connection has been closed by the server.
+
+    An idle keep-alive socket should never be readable. If it is, the server
+    has either closed it or sent something we can't handle.
+
+    :param connection:
+        :class:`httplib.HTTPConnection`
+
+    :returns:
+        ``True`` if the connection can't be reused.
+    """
+
+    sock = connection.sock
+    if sock is None:
+        return True
+
+    try:
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        else:
+            return bool(select.select([sock], [], [], 0)[0])
+    except (ValueError, socket.error):
+        return True
+
+
+class DNSCache(object):
+    """
+    A thread-safe cache of :func:`socket.getaddrinfo` results which
+    expire after a fixed time to live.
+
+    .. note::
+
+        The cache is used by the :class:`.ConnectionPool` only on Python 3.
+    """
+
+    def __init__(self, ttl=60):
+        """
+        :param float ttl:
+            Number of seconds for which a lookup result is reused.
+        """
+
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._results = {}
+        self._stats = dict(hits=0, misses=0)
+
+    @property
+    def stats(self):
+        """
+        A :class:`dict` with the number of lookup ``hits`` and ``misses``.
+        """
+
+        with self._lock:
+            return dict(self._stats)
+
+    def getaddrinfo(self, host, port):
+        """
+        Same as :func:`socket.getaddrinfo` for TCP connections, but cached.
+        """
+
+        key = (host, port)
+        now = time.time()
+
+        with self._lock:
+            result = self._results.get(key)
+            if result and result[0] > now:
+                self._stats['hits'] += 1
+                return result[1]
+            self._stats['misses'] += 1
+
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+        with self._lock:
+            self._results[key] = (now + self.ttl, addresses)
+
+        return addresses
+
+    def invalidate(self, host, port):
+        """
+        Forgets the lookup result of an address.
+        """
+
+        with self._lock:
+            self._results.pop((host, port), None)
+
+    def clear(self):
+        """
+        Forgets all lookup results.
+        """
+
+        with self._lock:
+            self._results.clear()
+
+    def create_connection(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                          source_address=None):
+        """
+        Same as :func:`socket.create_connection` but uses the cached
+        lookup results.
+        """
+
+        host, port = address
+        error = None
+
+        for family, type_, proto, _, sockaddr in self.getaddrinfo(host, port):
+            sock = None
+            try:
+                sock = socket.socket(family, type_, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except socket.error as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+
+        # The host may have moved.
+        self.invalidate(host, port)
+        raise error or socket.error('getaddrinfo returns an empty list')
+
+
+class TLSSessionCache(object):
+    """
+    A thread-safe store of the most recent TLS session of each host,
+    which new connections to the host offer back to the server to
+    resume the session with an abbreviated handshake.
+
+    .. note::
+
+        TLS session resumption requires Python 3.6 or newer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._stats = dict(handshakes=0, resumed=0)
+
+    @property
+    def stats(self):
+        """
+        A :class:`dict` with TLS handshake statistics:
+
+        * ``handshakes``: Number of TLS handshakes.
+        * ``resumed``: Number of handshakes which resumed a session.
+        * ``resumption_ratio``: Ratio of resumed handshakes.
+        """
+
+        with self._lock:
+            stats = dict(self._stats)
+        handshakes = stats['handshakes']
+        stats['resumption_ratio'] = \
+            float(stats['resumed']) / handshakes if handshakes else 0.0
+        return stats
+
+    def get(self, host):
+        """
+        Returns the session of the host or ``None``.
+        """
+
+        with self._lock:
+            return self._sessions.get(host)
+
+    def record(self, host, sock, handshake=False):
+        """
+        Remembers the session of a TLS socket.
+
+        :param str host:
+            Host with an optional port.
+
+        :param sock:
+            :class:`ssl.SSLSocket`
+
+        :param bool handshake:
+            ``True`` if called right after the handshake.
+        """
+
+        session = getattr(sock, 'session', None)
+
+        with self._lock:
+            if handshake:
+                self._stats['handshakes'] += 1
+                if getattr(sock, 'session_reused', False):
+                    self._stats['resumed'] += 1
+            if session is not None:
+                self._sessions[host] = session
+
+    def clear(self):
+        """
+        Forgets all sessions.
+        """
+
+        with self._lock:
+            self._sessions.clear()
+
+
+class _HTTPSConnection(http_client.HTTPSConnection):
+    """
+    :class:`httplib.HTTPSConnection` which resumes TLS sessions.
+    """
+
+    def __init__(self, host, context, tls_sessions):
+        http_client.HTTPSConnection.__init__(self, host, context=context)
+        self._authomatic_context = context
+        self._tls_sessions = tls_sessions
+
+    def connect(self):
+        http_client.HTTPConnection.connect(self)
+
+        server_hostname = getattr(self, '_tunnel_host', None) or self.host
+        key = '{0}:{1}'.format(self.host, self.port)
+
+        self.sock = self._authomatic_context.wrap_socket(
+            self.sock,
+            server_hostname=server_hostname,
+            session=self._tls_sessions.get(key))
+        self._tls_sessions.record(key, self.sock, handshake=True)
+
+
+class PooledResponse(object):
+    """
+    Wraps :class:`httplib.HTTPResponse` and returns its connection to the
+    :class:`.ConnectionPool` as soon as the body has been read to the end.
+
+    If the response is closed or garbage collected before that, the
+    connection is discarded, so that it doesn't keep its place in the pool.
+    """
+
+    def __init__(self, response, pool, key, connection):
+        """
+        :param response:
+            The wrapped :class:`httplib.HTTPResponse` instance.
+
+        :param pool:
+            The :class:`.ConnectionPool` the connection belongs to.
+
+        :param tuple key:
+            ``(scheme, host)`` pool key of the connection.
+
+        :param connection:
+            The :class:`httplib.HTTPConnection` the response was read from.
+        """
+
+        self._response = response
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+
+        #: Same as :attr:`httplib.HTTPResponse.msg`.
+        self.msg = response.msg
+        #: Same as :attr:`httplib.HTTPResponse.version`.
+        self.version = response.version
+        #: Same as :attr:`httplib.HTTPResponse.status`.
+        self.status = response.status
+        #: Same as :attr:`httplib.HTTPResponse.reason`.
+        self.reason = response.reason
+
+        if response.isclosed():
+            self._release()
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __del__(self):
+        # The attributes may be missing if __init__ failed.
+        connection = self.__dict__.get('_connection')
+        if connection is not None:
+            self._connection = None
+            self._pool.discard(self._key, connection)
+
+    def _release(self):
+        """Returns the connection to the pool."""
+
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.put(self._key, connection)
+
+    def read(self, amt=None):
+        """
+        Same as :meth:`httplib.HTTPResponse.read`.
+        """
+
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def readinto(self, b):
+        """
+        Same as :meth:`httplib.HTTPResponse.readinto`.
+        """
+
+        if hasattr(self._response, 'readinto'):
+            size = self._response.readinto(b)
+        else:
+            # Python 2
+            data = self._response.read(len(b))
+            size = len(data)
+            b[:size] = data
+
+        if self._response.isclosed():
+            self._release()
+        return size
+
+    def isclosed(self):
+        """
+        Same as :meth:`httplib.HTTPResponse.isclosed`.
+        """
+
+        return self._response.isclosed()
+
+    def close(self):
+        """
+        Closes the response. If the body has not been read to the end,
+        the connection can't be reused and is discarded.
+        """
+
+        if self._connection is not None and not self._response.isclosed():
+            connection, self._connection = self._connection, None
+            self._pool.discard(self._key, connection)
+        self._response.close()
+        self._release()
+
+    def getheader(self, name, default=None):
+        """
+        Same as :meth:`httplib.HTTPResponse.getheader`.
+        """
+
+        return self._response.getheader(name, default)
+
+    def getheaders(self):
+        """
+        Same as :meth:`httplib.HTTPResponse.getheaders`.
+        """
+
+        return self._response.getheaders()
+
+
+class ConnectionPool(object):
+    """
+    A thread-safe pool of keep-alive :class:`httplib.HTTPConnection` and
+    :class:`httplib.HTTPSConnection` instances keyed by scheme and host.
+
+    One pool is shared by all providers of an :class:`.Authomatic` instance.
+    The pool notices when the process has been forked and drops all
+    connections inherited from the parent, so it is safe to use in
+    pre-fork servers.
+    """
+
+    def __init__(self, maxsize=10, block=False, idle_timeout=60,
+                 dns_cache=None, ssl_context=None):
+        """
+        :param int maxsize:
+            Maximum number of connections per host. If :data:`block` is
+            ``False``, more connections can be opened under load, but only
+            :data:`maxsize` of them will be kept for reuse.
+
+        :param bool block:
+            If ``True``, no more than :data:`maxsize` connections per host
+            will ever be open at once and further requests will wait until
+            a connection is returned to the pool.
+
+        :param float idle_timeout:
+            Number of seconds after which an unused connection is evicted.
+            Keep it below the keep-alive timeout of the **providers**.
+
+        :param dns_cache:
+            A :class:`.DNSCache` instance.
+            If ``None``, a cache with default settings will be created.
+
+        :param ssl_context:
+            :class:`ssl.SSLContext` shared by all ``https`` connections.
+            If ``None``, :func:`ssl.create_default_context` will be used.
+        """
+
+        self.maxsize = maxsize
+        self.block = block
+        self.idle_timeout = idle_timeout
+        self.dns_cache = dns_cache or DNSCache()
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        #: :class:`.TLSSessionCache` of the ``https`` connections.
+        self.tls_sessions = TLSSessionCache()
+        self._reset()
+
+    def _reset(self):
+        """Forgets all connections and statistics."""
+
+        self._pid = os.getpid()
+        # Reentrant, because PooledResponse.__del__ may run in a thread
+        # which already holds the lock.
+        self._cond = threading.Condition(threading.RLock())
+        self._idle = collections.defaultdict(collections.deque)
+        self._in_use = collections.defaultdict(int)
+        self._stats = dict(hits=0, misses=0, evictions=0, discards=0,
+                           preconnects=0, warm_hits=0)
+        # Preconnected connections which have not been used yet.
+        self._warm = set()
+
+    def _check_pid(self):
+        """
+        Drops connections inherited from a parent process.
+
+        The sockets are shared with the parent, so we don't close them,
+        we just forget about them.
+        """
+
+        if self._pid != os.getpid():
+            self._reset()
+
+    @property
+    def stats(self):
+        """
+        A :class:`dict` with pool statistics:
+
+        * ``hits``: Number of requests which reused a pooled connection.
+        * ``misses``: Number of requests which opened a new connection.
+        * ``evictions``: Number of idle connections closed after
+          :attr:`.idle_timeout`.
+        * ``discards``: Number of connections closed because they were
+          broken, closed by the server or the pool was full.
+        * ``idle``: Number of connections currently available for reuse.
+        * ``preconnects``: Number of connections opened by
+          :meth:`.preconnect`.
+        * ``warm_hits``: Number of requests which used a connection opened
+          by :meth:`.preconnect`.
+        """
+
+        with self._cond:
+            self._check_pid()
+            stats = dict(self._stats)
+            stats['idle'] = sum(len(i) for i in self._idle.values())
+            return stats
+
+    def _new_connection(self, scheme, host):
+        """
+        Creates a new, not yet connected connection.
+
+        :param str scheme:
+            ``'http'`` or ``'https'``.
+
+        :param str host:
+            Host with an optional port.
+
+        :returns:
+            :class:`httplib.HTTPConnection`
+        """
+
+        if scheme == 'https':
+            if hasattr(ssl, 'SSLSession'):
+                connection = _HTTPSConnection(host, self.ssl_context,
+                                              self.tls_sessions)
+            else:
+                connection = http_client.HTTPSConnection(
+                    host, context=self.ssl_context)
+        else:
+            connection = http_client.HTTPConnection(host)
+
+        if hasattr(connection, '_create_connection'):
+            # Python 3 only.
+            connection._create_connection = self.dns_cache.create_connection
+
+        return connection
+
+    def _evict(self, now):
+        """Closes connections which have been idle for too long."""
+
+        for idle in self._idle.values():
+            while idle and now - idle[0][1] > self.idle_timeout:
+                connection = idle.popleft()[0]
+                connection.close()
+                self._warm.discard(connection)
+                self._stats['evictions'] += 1
+
+    def get(self, scheme, host):
+        """
+        Returns a connection for the host.
+
+        :param str scheme:
+            ``'http'`` or ``'https'``.
+
+        :param str host:
+            Host with an optional port.
+
+        :returns:
+            A ``(connection, reused)`` tuple.
+        """
+
+        key = (scheme.lower(), host)
+
+        with self._cond:
+            self._check_pid()
+            self._evict(time.time())
+            idle = self._idle[key]
+
+            while True:
+                while idle:
+                    connection = idle.pop()[0]
+                    warm = connection in self._warm
+                    self._warm.discard(connection)
+                    if _is_dropped(connection):
+                        connection.close()
+                        self._stats['discards'] += 1
+                    else:
+                        self._stats['hits'] += 1
+                        if warm:
+                            self._stats['warm_hits'] += 1
+                        self._in_use[key] += 1
+                        return connection, True
+
+                if not self.block or self._in_use[key] < self.maxsize:
+                    break
+
+                self._cond.wait()
+
+            self._stats['misses'] += 1
+            self._in_use[key] += 1
+
+        return self._new_connection(*key), False
+
+    def preconnect(self, scheme, host, timeout=None):
+        """
+        Opens a connection to the host ahead of time and adds it to the
+        idle connections, unless there already is one.
+
+        :param str scheme:
+            ``'http'`` or ``'https'``.
+
+        :param str host:
+            Host with an optional port.
+
+        :param float timeout:
+            Connect timeout in seconds.
+
+        :returns:
+            ``True`` if a new connection has been opened.
+        """
+
+        key = (scheme.lower(), host)
+
+        with self._cond:
+            self._check_pid()
+            if self._idle[key]:
+                return False
+
+        connection = self._new_connection(*key)
+        _set_timeout(connection, (timeout, None))
+
+        with self._cond:
+            idle = self._idle[key]
+            if len(idle) >= self.maxsize:
+                connection.close()
+                return False
+            idle.append((connection, time.time()))
+            self._warm.add(connection)
+            self._stats['preconnects'] += 1
+            self._cond.notify()
+
+        return True
+
+    def put(self, key, connection):
+        """
+        Returns a connection to the pool.
+
+        :param tuple key:
+            ``(scheme, host)`` tuple.
+
+        :param connection:
+            :class:`httplib.HTTPConnection`
+        """
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+
+            self._in_use[key] -= 1
+            idle = self._idle[key]
+
+            if connection.sock is None or len(idle) >= self.maxsize:
+                # Closed by the server or one too many.
+                connection.close()
+                self._stats['discards'] += 1
+            else:
+                idle.append((connection, time.time()))
+
+            self._cond.notify()
+
+    def discard(self, key, connection):
+        """
+        Closes a connection which can't be reused.
+
+        :param tuple key:
+            ``(scheme, host)`` tuple.
+
+        :param connection:
+            :class:`httplib.HTTPConnection`
+        """
+
+        connection.close()
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+
+            self._in_use[key] -= 1
+            self._stats['discards'] += 1
+            self._cond.notify()
+
+    def clear(self):
+        """
+        Closes all idle connections.
+        """
+
+        with self._cond:
+            self._check_pid()
+            for idle in self._idle.values():
+                while idle:
+                    idle.pop()[0].close()
+            self._idle.clear()
+            self._warm.clear()
+
+    def request(self, scheme, host, method, path, body=None, headers=None,
+                timeout=None):
+        """
+        Sends a request over a pooled connection.
+
+        If a reused connection turns out to be dead and the request is
+        idempotent, it is sent once more over a fresh connection.
+
+        :param str scheme:
+            ``'http'`` or ``'https'``.
+
+        :param str host:
+            Host with an optional port.
+
+        :param str method:
+            HTTP method of the request.
+
+        :param str path:
+            Request path including query string.
+
+        :param str body:
+            Body of the request.
+
+        :param dict headers:
+            HTTP headers of the request.
+
+        :param tuple timeout:
+            ``(connect, read)`` tuple of seconds or ``None`` values.
+
+        :returns:
+            :class:`.PooledResponse`
+        """
+
+        key = (scheme.lower(), host)
+
+        while True:
+            connection, reused = self.get(*key)
+            try:
+                _set_timeout(connection, timeout)
+                connection.request(method, path, body, headers or {})
+                sock = connection.sock
+                response = connection.getresponse()
+            except socket.timeout:
+                self.discard(key, connection)
+                raise
+            except (socket.error, http_client.HTTPException):
+                self.discard(key, connection)
+                if reused and method in IDEMPOTENT_METHODS:
+                    continue
+                raise
+            except BaseException:
+                # E.g. an invalid header value, the connection must not
+                # keep its slot.
+                self.discard(key, connection)
+                raise
+
+            if isinstance(connection, _HTTPSConnection):
+                # With TLS 1.3 the session ticket arrives after the
+                # handshake, so we remember the session once again.
+                self.tls_sessions.record(
+                    '{0}:{1}'.format(connection.host, connection.port), sock)
+
+            return PooledResponse(response, self, key, connection)
@@ -21,28 +21,107 @@ Abstract base classes for implementation of protocol specific providers.
 
 import abc
 import authomatic.core
-import base64
+from authomatic import cache, jsoncodec, pagination, ratelimit
 import hashlib
 import logging
 import random
+import socket
 import sys
+import time
 import traceback
 import uuid
 
 from authomatic.core import Session
+from authomatic.transports import (BufferedResponse, HTTPClientTransport,
+                                   split_timeout)
 from authomatic.exceptions import (
     ConfigError,
     FetchError,
+    FetchTimeoutError,
     CredentialsError,
 )
 from authomatic import six
 from authomatic.six.moves import urllib_parse as parse
-from authomatic.six.moves import http_client
 
 
 __all__ = ['BaseProvider', 'AuthorizationProvider', 'AuthenticationProvider', 'login_decorator']
 
 
+# Used when the provider is not instantiated by an Authomatic instance.
+_default_transport = HTTPClientTransport()
+_default_redirect_cache = authomatic.core.RedirectCache()
+
+#: Redirect status codes.
+REDIRECT_STATUSES = (300, 301, 302, 303, 307, 308)
+
+#: Redirect status codes which tell that the resource has moved for good.
+PERMANENT_REDIRECT_STATUSES = (301, 308)
+
+#: Headers which are not forwarded when redirected to another origin.
+CREDENTIAL_HEADERS = ('authorization', 'cookie')
+
+#: Ports of URLs without explicit port by scheme.
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_timeout(error):
+    """
+    Checks whether an error raised by a transport is a timeout.
+
+    Besides :class:`socket.timeout` recognizes the timeout errors of
+    |urllib3|_, |httpx|_ and :mod:`asyncio` by their name so that we don't
+    need to import them.
+    """
+
+    return isinstance(error, socket.timeout) or \
+        any('Timeout' in c.__name__ for c in type(error).__mro__)
+
+
+def _fetch_error(error, url):
+    """
+    Converts an error raised by a transport to a :class:`.FetchError`.
+    """
+
+    if _is_timeout(error):
+        return FetchTimeoutError('Request timed out!',
+                                 original_message=str(error),
+                                 url=url)
+    return FetchError('Could not connect!',
+                      original_message=str(error),
+                      url=url)
+
+
+def _origin(url):
+    """
+    Returns the ``(scheme, host, port)`` tuple of a URL.
+    """
+
+    split = parse.urlsplit(url)
+    scheme = split.scheme.lower()
+    return scheme, split.hostname, split.port or DEFAULT_PORTS.get(scheme)
+
+
+def _request_timeout(timeout, remaining):
+    """
+    Caps the timeout of a single request by the remaining deadline budget.
+
+    :param timeout:
+        ``None``, number of seconds or a ``(connect, read)`` tuple.
+
+    :param float remaining:
+        Remaining seconds of the deadline or ``None``.
+
+    :returns:
+        A ``(connect, read)`` tuple.
+    """
+
+    connect, read = split_timeout(timeout)
+    if remaining is not None:
+        connect = remaining if connect is None else min(connect, remaining)
+        read = remaining if read is None else min(read, remaining)
+    return connect, read
+
+
 def _error_traceback_html(exc_info, traceback):
     """
     Generates error traceback HTML.
@@ -129,6 +208,10 @@ class BaseProvider(object):
 
     supported_user_attributes = authomatic.core.SupportedUserAttributes()
     
+    #: Parsers of responses by media type which take precedence over
+    #: the :data:`.core.CONTENT_PARSERS`.
+    content_parsers = {}
+    
     def __init__(self, settings, adapter, provider_name, session=None, session_saver=None, callback=None, js_callback=None,
                  prefix='authomatic', **kwargs):
         
@@ -142,6 +225,14 @@ class BaseProvider(object):
         #: :class:`str` The provider name as specified in the :doc:`config`.
         self.name = provider_name
         
+        # Settings from the config merged with the __defaults__.
+        registry = getattr(settings, 'registry', None)
+        if registry is not None:
+            self._config = registry.settings_of(provider_name)
+        else:
+            self._config = authomatic.core.ProviderRegistry.merge_settings(
+                settings.config, provider_name)
+        
         #: :class:`callable` An optional callback called when the login procedure
         #: is finished with :class:`.core.LoginResult` passed as argument.
         self.callback = callback
@@ -155,6 +246,52 @@ class BaseProvider(object):
         #: :class:`bool` If ``True``, the :attr:`.BaseProvider.user_authorization_url` will be displayed
         #: in a *popup mode*, if the **provider** supports it.
         self.popup = self._kwarg(kwargs, 'popup')
+        
+        #: Default timeout of the requests made by :meth:`._fetch`,
+        #: either number of seconds or a ``(connect, read)`` tuple.
+        self.timeout = self._kwarg(kwargs, 'timeout')
+        
+        #: Default total number of seconds one :meth:`._fetch` call may
+        #: take including redirects.
+        self.deadline = self._kwarg(kwargs, 'deadline')
+        
+        #: Value of the ``Accept-Encoding`` header of the requests made by
+        #: :meth:`._fetch`. The ``gzip`` and ``deflate`` encoded responses
+        #: are decompressed transparently by the :class:`.Response`.
+        self.accept_encoding = self._kwarg(kwargs, 'accept_encoding',
+                                           'gzip, deflate')
+        
+        content_parsers = self._kwarg(kwargs, 'content_parsers')
+        if content_parsers:
+            self.content_parsers = dict(self.content_parsers)
+            self.content_parsers.update(content_parsers)
+        
+        #: :class:`.RateLimitTracker` shared by all providers.
+        self.rate_limits = getattr(settings, 'rate_limits', None)
+        
+        #: :class:`.SingleFlight` which coalesces identical ``GET`` requests
+        #: to **protected resources** or ``None``.
+        self.single_flight = getattr(settings, 'single_flight', None)
+        
+        #: :class:`.RetryPolicy` of the requests made by :meth:`._fetch`
+        #: or ``None`` if they should not be retried.
+        self.retry_policy = self._kwarg(kwargs, 'retry_policy') or \
+                            getattr(settings, 'retry_policy', None)
+        
+        #: :class:`.BaseTransport` used by :meth:`._fetch`, shared by all
+        #: providers of an :class:`.Authomatic` instance.
+        self.transport = getattr(settings, 'transport', None) or \
+                         _default_transport
+        
+        #: :class:`.RedirectCache` used by :meth:`._fetch`, shared by all
+        #: providers of an :class:`.Authomatic` instance.
+        self.redirect_cache = getattr(settings, 'redirect_cache', None)
+        if self.redirect_cache is None:
+            self.redirect_cache = _default_redirect_cache
+        
+        #: :class:`.BaseCache` used by :meth:`._fetch` to cache ``GET``
+        #: requests to **protected resources** or ``None``.
+        self.cache = getattr(settings, 'cache', None)
     
     
     @property
@@ -244,7 +381,19 @@ class BaseProvider(object):
     
     @property
     def type_id(self):
-        pass
+        registry = getattr(self.settings, 'registry', None)
+        if registry is not None:
+            type_id = registry.type_ids.get(self.__class__)
+            if type_id is not None:
+                return type_id
+        return self.get_type_id()
+    
+    
+    @classmethod
+    def get_type_id(cls):
+        """
+        Returns the :attr:`.type_id` of the provider class.
+        """
     
     
     def _kwarg(self, kwargs, kwname, default=None):
@@ -266,10 +415,7 @@ class BaseProvider(object):
             Name of the desired keyword argument.
         """
         
-        return kwargs.get(kwname) or \
-               self.settings.config.get(self.name, {}).get(kwname) or \
-               self.settings.config.get('__defaults__', {}).get(kwname) or \
-               default
+        return kwargs.get(kwname) or self._config.get(kwname) or default
     
     
     def _session_key(self, key):
@@ -333,9 +479,11 @@ class BaseProvider(object):
         logger.log(level, ': '.join(('authomatic', cls.__name__, msg)))
 
     
-    def _fetch(self, url, method='GET', params=None, headers=None, body='', max_redirects=5, content_parser=None):
+    def _prepare_request(self, url, method='GET', params=None, headers=None, body=''):
         """
-        Fetches a URL.
+        Applies the default access params and headers to a request and
+        moves the query string to the body of ``POST``, ``PUT`` and
+        ``PATCH`` requests without body.
         
         :param str url:
             The URL to fetch.
@@ -351,12 +499,10 @@ class BaseProvider(object):
             
         :param str body:
             Body of ``POST``, ``PUT`` and ``PATCH`` requests.
-            
-        :param int max_redirects:
-            Number of maximum HTTP redirects to follow.
-            
-        :param function content_parser:
-            A callable to be used to parse the :attr:`.Response.data` from :attr:`.Response.content`.
+        
+        :returns:
+            A ``(url, body, headers)`` tuple where the URL contains the
+            query string.
         """
         params = params or {}
         params.update(self.access_params)
@@ -364,6 +510,10 @@ class BaseProvider(object):
         headers = headers or {}
         headers.update(self.access_headers)
         
+        if self.accept_encoding and \
+                'accept-encoding' not in (k.lower() for k in headers):
+            headers['Accept-Encoding'] = self.accept_encoding
+        
         scheme, host, path, query, fragment = parse.urlsplit(url)
         query = parse.urlencode(params)
         
@@ -374,6 +524,8 @@ class BaseProvider(object):
                 query = ''
                 headers.update({'Content-Type': 'application/x-www-form-urlencoded'})
         request_path = parse.urlunsplit(('', '', path or '', query or '', ''))
+        request_url = parse.urlunsplit((scheme, host, path or '', query or '',
+                                        ''))
         
         self._log(logging.DEBUG, u' \u251C\u2500 host: {0}'.format(host))
         self._log(logging.DEBUG, u' \u251C\u2500 path: {0}'.format(request_path))
@@ -382,53 +534,322 @@ class BaseProvider(object):
         self._log(logging.DEBUG, u' \u251C\u2500 params: {0}'.format(params))
         self._log(logging.DEBUG, u' \u2514\u2500 headers: {0}'.format(headers))
         
-        # Connect
-        if scheme.lower() == 'https':
-            connection = http_client.HTTPSConnection(host)
-        else:
-            connection = http_client.HTTPConnection(host)
+        return request_url, body, headers
+    
+    
+    def _preconnect(self, url):
+        """
+        Opens a connection to the host of the :data:`url` in the background
+        if the :attr:`.transport` supports it.
+        
+        :param str url:
+            Any URL of the host.
+        """
+        
+        if not url:
+            return
+        
+        connect_timeout = split_timeout(self.timeout)[0]
+        authomatic.core._get_executor(self.settings).submit(
+            self.transport.preconnect, url, connect_timeout)
+    
+    
+    def _send(self, method, url, body, headers, timeout, expires, retry=None):
+        """
+        Sends a single request through the :attr:`.transport` and retries it
+        according to the :attr:`.retry_policy`.
+        
+        :param str method:
+            HTTP method of the request.
             
-        try:
-            connection.request(method, request_path, body, headers)
-        except Exception as e:
-            raise FetchError('Could not connect!',
-                             original_message=e.message,
-                             url=request_path)
+        :param str url:
+            Absolute URL of the request including the query string.
+            
+        :param str body:
+            Body of the request.
+            
+        :param dict headers:
+            HTTP headers of the request.
+            
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple.
+            
+        :param float expires:
+            Timestamp of the deadline or ``None``.
+            
+        :param bool retry:
+            See :meth:`.RetryPolicy.allows`.
         
-        response = connection.getresponse()
-        location = response.getheader('Location')
+        :returns:
+            The response returned by the :attr:`.transport`.
+        """
         
-        if response.status in (300, 301, 302, 303, 307) and location:
-            if location == url:
-                raise FetchError('Url redirects to itself!',
-                                 url=location,
-                                 status=response.status)
-                
-            elif max_redirects > 0:
-                remaining_redirects = max_redirects - 1
-                
-                self._log(logging.DEBUG, u'Redirecting to {0}'.format(url))
-                self._log(logging.DEBUG, u'Remaining redirects: {0}'
-                          .format(remaining_redirects))
-                
-                # Call this method again.
-                response = self._fetch(url=location,
-                                      params=params,
-                                      method=method,
-                                      headers=headers,
-                                      max_redirects=remaining_redirects)
-                
-            else:
+        policy = self.retry_policy
+        retriable = policy is not None and policy.allows(method, retry)
+        if retriable:
+            policy.start()
+        
+        attempt = 0
+        while True:
+            remaining = None if expires is None else expires - time.time()
+            if remaining is not None and remaining <= 0:
+                raise FetchTimeoutError('Deadline exceeded!', url=url)
+            
+            response = error = None
+            try:
+                response = self.transport.request(
+                    method, url, body, headers,
+                    timeout=_request_timeout(timeout, remaining))
+            except Exception as e:
+                error = e
+            
+            if retriable and attempt < policy.total and \
+                    policy.is_retryable(response, error):
+                delay = policy.delay(attempt, response)
+                if delay is not None and \
+                        (remaining is None or delay < remaining) and \
+                        policy.acquire():
+                    if response is not None:
+                        # Read the body to release the connection.
+                        response.read()
+                    
+                    self._log(logging.INFO, u'Retrying {0} in {1:.2f} seconds.'
+                              .format(url, delay))
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+            
+            if error is not None:
+                raise _fetch_error(error, url)
+            
+            return response
+    
+    
+    def _fetch(self, url, method='GET', params=None, headers=None, body='', max_redirects=5, content_parser=None,
+               timeout=None, deadline=None, retry=None, rate_limit=False):
+        """
+        Fetches a URL.
+        
+        :param str url:
+            The URL to fetch.
+            
+        :param str method:
+            HTTP method of the request.
+            
+        :param dict params:
+            Dictionary of request parameters.
+            
+        :param dict headers:
+            HTTP headers of the request.
+            
+        :param str body:
+            Body of ``POST``, ``PUT`` and ``PATCH`` requests.
+            
+        :param int max_redirects:
+            Number of maximum HTTP redirects to follow.
+            
+        :param function content_parser:
+            A callable to be used to parse the :attr:`.Response.data` from :attr:`.Response.content`.
+            
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple.
+            If ``None``, the :attr:`.timeout` will be used.
+            
+        :param float deadline:
+            Total number of seconds until the response headers must be
+            received, including all redirects.
+            If ``None``, the :attr:`.deadline` will be used.
+            
+        :param bool retry:
+            ``False`` if the request must not be retried by the
+            :attr:`.retry_policy`, e.g. the exchange of an authorization
+            code, ``True`` if it can be retried even if the method is not
+            idempotent, e.g. the credentials refreshment.
+            If ``None``, only requests with idempotent methods are retried.
+            
+        :param bool rate_limit:
+            Whether the request is taken from the budgets of the
+            :attr:`.rate_limits`. Fresh responses from the :attr:`.cache`
+            are not.
+        
+        :raises FetchTimeoutError:
+            If a timeout or the deadline has been exceeded.
+        
+        :raises RateLimitError:
+            If the request would exceed the quota.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if deadline is None:
+            deadline = self.deadline
+        
+        request_url, body, headers = self._prepare_request(url, method, params,
+                                                           headers, body)
+        
+        cache_key = self._cache_key(request_url, method)
+        cache_entry = None
+        if cache_key:
+            cache_entry = self.cache.get(cache_key)
+            if cache_entry is not None:
+                if cache_entry.is_fresh():
+                    self._log(logging.DEBUG, u'Got fresh response from cache.')
+                    response = authomatic.core.Response(
+                        cache_entry.to_response(), content_parser,
+                        self.content_parsers)
+                    response.from_cache = True
+                    return response
+                headers = dict(headers, **cache_entry.validators())
+        
+        rate_limit_keys = {}
+        if rate_limit:
+            rate_limit_keys, delay = self._acquire_rate_limit(url)
+            if delay:
+                time.sleep(delay)
+        
+        expires = None if deadline is None else time.time() + deadline
+        
+        while True:
+            request_url = self.redirect_cache.resolve(request_url)
+            response = self._send(method, request_url, body, headers, timeout,
+                                  expires, retry)
+            
+            redirect = self._redirect(response, request_url, method, body,
+                                      headers)
+            if redirect is None:
+                break
+            
+            if max_redirects <= 0:
                 raise FetchError('Max redirects reached!',
-                                 url=location,
+                                 url=redirect[0],
                                  status=response.status)
-        else:
-            self._log(logging.DEBUG, u'Got response:')
-            self._log(logging.DEBUG, u' \u251C\u2500 url: {0}'.format(url))
-            self._log(logging.DEBUG, u' \u251C\u2500 status: {0}'.format(response.status))
-            self._log(logging.DEBUG, u' \u2514\u2500 headers: {0}'.format(response.getheaders()))
-                
-        return authomatic.core.Response(response, content_parser)
+            max_redirects -= 1
+            
+            # Read the body to release the connection.
+            response.read()
+            
+            request_url, method, body, headers = redirect
+            
+            self._log(logging.DEBUG, u'Redirecting to {0}'.format(request_url))
+            self._log(logging.DEBUG, u'Remaining redirects: {0}'
+                      .format(max_redirects))
+        
+        self._log(logging.DEBUG, u'Got response:')
+        self._log(logging.DEBUG, u' \u251C\u2500 url: {0}'.format(request_url))
+        self._log(logging.DEBUG, u' \u251C\u2500 status: {0}'.format(response.status))
+        self._log(logging.DEBUG, u' \u2514\u2500 headers: {0}'.format(response.getheaders()))
+        
+        self._update_rate_limit(rate_limit_keys, response)
+        
+        if cache_key:
+            response = cache.store(self.cache, cache_key, response,
+                                   cache_entry)
+        
+        return authomatic.core.Response(response, content_parser,
+                                        self.content_parsers)
+    
+    
+    def _cache_key(self, url, method):
+        """
+        Creates the :attr:`.cache` key of a request.
+        
+        Only ``GET`` requests signed by credentials are cached and the key
+        contains the identity of the credentials.
+        
+        :param str url:
+            The request URL including the query string.
+            
+        :param str method:
+            HTTP method of the request.
+        
+        :returns:
+            :class:`str` or ``None`` if the request should not be cached.
+        """
+        
+        if self.cache is None or method != 'GET':
+            return
+        
+        identity = self._credentials_identity()
+        if identity:
+            return cache.cache_key(url, identity)
+    
+    
+    def _credentials_identity(self):
+        """
+        Identifies the provider and the credentials which sign its requests.
+        
+        :returns:
+            :class:`str` or ``None`` if there are no credentials.
+        """
+        
+        credentials = getattr(self, 'credentials', None)
+        token = getattr(credentials, 'token', None)
+        if token:
+            return u'{0}:{1}:{2}'.format(self.name, token,
+                                         credentials.token_secret or '')
+    
+    
+    def _redirect(self, response, url, method, body, headers):
+        """
+        Resolves the request which follows a redirect response and remembers
+        permanent redirects in the :attr:`.redirect_cache`.
+        
+        ``303`` redirects and ``301`` or ``302`` redirects of ``POST``
+        requests are followed by a ``GET`` request without body,
+        ``307`` and ``308`` redirects keep the method and the body.
+        
+        The :data:`.CREDENTIAL_HEADERS` are not forwarded to another scheme,
+        host or port and permanent redirects to another origin are not
+        remembered, so that later requests don't send the credentials there.
+        
+        :param response:
+            The response returned by the :attr:`.transport`.
+            
+        :param str url:
+            The URL of the request.
+            
+        :param str method:
+            HTTP method of the request.
+            
+        :param str body:
+            Body of the request.
+            
+        :param dict headers:
+            HTTP headers of the request.
+        
+        :returns:
+            A ``(url, method, body, headers)`` tuple of the next request or
+            ``None`` if the response is not a redirect.
+        """
+        
+        location = response.getheader('Location')
+        if response.status not in REDIRECT_STATUSES or not location:
+            return
+        
+        location = parse.urldefrag(parse.urljoin(url, location))[0]
+        
+        if location == url:
+            raise FetchError('Url redirects to itself!',
+                             url=location,
+                             status=response.status)
+        
+        same_origin = _origin(url) == _origin(location)
+        
+        if response.status in PERMANENT_REDIRECT_STATUSES and same_origin:
+            self.redirect_cache.add(url, location)
+        
+        if not same_origin:
+            headers = dict((k, v) for k, v in headers.items()
+                           if k.lower() not in CREDENTIAL_HEADERS)
+        
+        if response.status == 303 and method != 'HEAD' or \
+                response.status in (301, 302) and method == 'POST':
+            method = 'GET'
+            body = ''
+            headers = dict((k, v) for k, v in headers.items()
+                           if k.lower() not in ('content-type',
+                                                'content-length'))
+        
+        return location, method, body, headers
     
     
     def _update_or_create_user(self, data, credentials=None, content=None):
@@ -497,6 +918,32 @@ class BaseProvider(object):
         return user
 
 
+    @staticmethod
+    def _x_rate_limit_parser(response):
+        """
+        Handles different rate limit headers by different providers.
+        
+        :param response:
+            :class:`.Response` of a request to a **protected resource**.
+            
+        :returns:
+            A :class:`dict` of :class:`.RateLimit` instances of the access
+            token under the ``'token'`` key and of the consumer under
+            the ``'app'`` key.
+        """
+        
+        rate_limit = ratelimit.parse_headers(response, 'X-RateLimit-') or \
+                     ratelimit.parse_headers(response, 'RateLimit-')
+        
+        if rate_limit is None and response.status == 429:
+            # No quota headers, but we know that it is exhausted.
+            reset = ratelimit.reset_time(response.getheader('Retry-After'))
+            if reset is not None:
+                rate_limit = ratelimit.RateLimit(remaining=0, reset=reset)
+        
+        return {'token': rate_limit} if rate_limit else {}
+
+
     @staticmethod
     def _http_status_in_category(status, category):
         """Checks whether a HTTP status code is in the category denoted
@@ -507,6 +954,9 @@ class BaseProvider(object):
         return status >= cat and status < cat + 100
 
 
+jsoncodec.register_encoder(BaseProvider, BaseProvider.to_dict)
+
+
 class AuthorizationProvider(BaseProvider):
     """
     Base provider for *authorization protocols* i.e. protocols which allow a **provider**
@@ -529,6 +979,10 @@ class AuthorizationProvider(BaseProvider):
     #: :class:`bool` Whether the provider supports JSONP requests.
     supports_jsonp = False
     
+    #: :doc:`Pagination </reference/pagination>` strategy used by
+    #: :meth:`.paginate`.
+    paginator = pagination.LinkHeaderPaginator()
+    
     # Whether to use the HTTP Authorization header.
     _x_use_authorization_header = True
     
@@ -560,6 +1014,32 @@ class AuthorizationProvider(BaseProvider):
             A dictionary of default query string parameters that will be used when
             accessing **user's** protected resources.
             Applied by :meth:`.access()`, :meth:`.update_user()` and :meth:`.User.update()`
+            
+        :arg timeout:
+            Timeout of all requests to the **provider** including the
+            *access token request* and the credentials refreshment,
+            either number of seconds or a ``(connect, read)`` tuple.
+            
+        :arg float deadline:
+            Total number of seconds one request to the **provider** may take
+            until the response headers are received, including redirects.
+            
+        :arg dict content_parsers:
+            Parsers of responses by media type of the ``Content-Type``
+            header, e.g. ``{'text/plain': authomatic.core.qs_parser}``,
+            which take precedence over the parsers of the provider class
+            and the :data:`.core.CONTENT_PARSERS`.
+            
+        :arg retry_policy:
+            A :class:`.RetryPolicy` of requests to the **provider**.
+            Overrides the ``retry_policy`` of the :class:`.Authomatic`
+            instance.
+            
+        :arg str accept_encoding:
+            Value of the ``Accept-Encoding`` header of requests to the
+            **provider**. Defaults to ``'gzip, deflate'``. Set it to
+            ``'identity'`` if the **provider** can't compress responses
+            properly.
         """
 
         super(AuthorizationProvider, self).__init__(*args, **kwargs)
@@ -704,16 +1184,24 @@ class AuthorizationProvider(BaseProvider):
         serialization of :class:`.Credentials` and to identify the type of provider in JavaScript.
         The part before hyphen denotes the type of the provider, the part after hyphen denotes the class id
         e.g. ``oauth2.Facebook.type_id = '2-5'``, ``oauth1.Twitter.type_id = '1-5'``.
+        
+        Looked up in the :class:`.ProviderRegistry` of the :class:`.Authomatic`
+        instance if possible.
         """
         
-        cls = self.__class__
+        return super(AuthorizationProvider, self).type_id
+    
+    
+    @classmethod
+    def get_type_id(cls):
         mod = sys.modules.get(cls.__module__)
         
-        return str(self.PROVIDER_TYPE_ID) + '-' + str(mod.PROVIDER_ID_MAP.index(cls))
+        return str(cls.PROVIDER_TYPE_ID) + '-' + str(mod.PROVIDER_ID_MAP.index(cls))
     
     
     def access(self, url, params=None, method='GET', headers=None,
-               body='', max_redirects=5, content_parser=None):
+               body='', max_redirects=5, content_parser=None, timeout=None,
+               deadline=None):
         """
         Fetches the **protected resource** of an authenticated **user**.
         
@@ -737,6 +1225,15 @@ class AuthorizationProvider(BaseProvider):
             
         :param function content_parser:
             A function to be used to parse the :attr:`.Response.data` from :attr:`.Response.content`.
+            
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple.
+            If ``None``, the :attr:`.timeout` will be used.
+            
+        :param float deadline:
+            Total number of seconds until the response headers must be
+            received, including all redirects.
+            If ``None``, the :attr:`.deadline` will be used.
         
         :returns:
             :class:`.Response`
@@ -757,9 +1254,19 @@ class AuthorizationProvider(BaseProvider):
                                                         headers=headers,
                                                         method=method)
         
-        response = self._fetch(*request_elements,
-                              max_redirects=max_redirects,
-                              content_parser=content_parser)
+        if self.single_flight is not None and request_elements.method == 'GET':
+            shared, coalesced = self.single_flight.do(
+                self._single_flight_key(request_elements),
+                self._access_shared, request_elements, max_redirects,
+                timeout, deadline)
+            if coalesced:
+                self._log(logging.DEBUG, u'Coalesced with a request in progress.')
+            # Each caller gets its own copy of the body.
+            response = authomatic.core.Response(shared.copy(), content_parser,
+                                                self.content_parsers)
+        else:
+            response = self._access(request_elements, max_redirects,
+                                    content_parser, timeout, deadline)
         
         self._log(logging.INFO, u'Got response. HTTP status = {0}.'.format(response.status))
         return response
@@ -767,17 +1274,74 @@ class AuthorizationProvider(BaseProvider):
 
     def async_access(self, *args, **kwargs):
         """
-        Same as :meth:`.access` but runs asynchronously in a separate thread.
+        Same as :meth:`.access` but runs asynchronously in a thread pool.
+
+        :returns:
+            :class:`.Future` instance representing the activity.
+        """
+        
+        return authomatic.core.Future.submit(
+            authomatic.core._get_executor(self.settings),
+            self.access, *args, **kwargs)
+    
+    
+    def access_async(self, url, params=None, method='GET', headers=None,
+                     body='', max_redirects=5, content_parser=None,
+                     timeout=None, deadline=None):
+        """
+        Same as :meth:`.access` but returns a coroutine to be awaited in
+        an :mod:`asyncio` event loop.
         
         .. warning::
-
-            |async|
-
+        
+            Requires Python 3.5 or newer.
+        
         :returns:
-            :class:`.Future` instance representing the separate thread.
+            Coroutine which returns :class:`.Response`.
         """
         
-        return authomatic.core.Future(self.access, *args, **kwargs)
+        from authomatic import aio
+        return aio.provider_access(self, url, params, method, headers, body,
+                                   max_redirects, content_parser, timeout,
+                                   deadline)
+    
+    
+    def paginate(self, url, params=None, paginator=None, prefetch=1,
+                 max_pages=None, **kwargs):
+        """
+        Returns a generator of the items of all pages of a
+        **protected resource**. The next pages are fetched in the background
+        while the items of the current page are consumed.
+        
+        :param str url:
+            The URL of the first page.
+            
+        :param dict params:
+            The params of the first page.
+            
+        :param paginator:
+            A :class:`.BasePaginator` instance.
+            If ``None``, the :attr:`.paginator` will be used.
+            
+        :param int prefetch:
+            Maximum number of pages which are fetched in the background or
+            wait to be consumed. If ``0``, the pages are fetched only when
+            needed.
+            
+        :param int max_pages:
+            Maximum number of pages to fetch or ``None`` for all.
+        
+        The rest of the keyword arguments is passed to :meth:`.access`.
+        
+        :raises FetchError:
+            If a page is not fetched with a ``2xx`` status.
+        
+        :returns:
+            A generator of items.
+        """
+        
+        return pagination.paginate(self, url, params, paginator, prefetch,
+                                   max_pages, **kwargs)
     
     
     def update_user(self):
@@ -802,6 +1366,89 @@ class AuthorizationProvider(BaseProvider):
     # Internal methods
     #===========================================================================
     
+    def _access(self, request_elements, max_redirects, content_parser,
+                timeout, deadline):
+        """
+        Fetches the **protected resource** within the :attr:`.rate_limits`.
+        
+        :returns:
+            :class:`.Response`
+        """
+        
+        return self._fetch(*request_elements,
+                           max_redirects=max_redirects,
+                           content_parser=content_parser,
+                           timeout=timeout,
+                           deadline=deadline,
+                           rate_limit=True)
+    
+    
+    def _access_shared(self, request_elements, max_redirects, timeout,
+                       deadline):
+        """
+        Fetches the **protected resource** and reads the whole body to be
+        shared by the coalesced callers.
+        
+        :returns:
+            :class:`.BufferedResponse`
+        """
+        
+        response = self._access(request_elements, max_redirects, None,
+                                timeout, deadline)
+        return BufferedResponse.from_response(response.httplib_response)
+    
+    
+    def _single_flight_key(self, request_elements):
+        """
+        Identifies requests which can be coalesced by the
+        :attr:`.single_flight`.
+        
+        The key is made of the method, the URL without the params which
+        change with every signature, like ``oauth_nonce``, and the identity
+        of the credentials. The headers are left out, because they contain
+        the signature of |oauth1|_ requests.
+        """
+        
+        return (request_elements.method,
+                cache.cache_key(request_elements.full_url,
+                                self._credentials_identity() or self.name))
+    
+    
+    def _acquire_rate_limit(self, url):
+        """
+        Takes one request from the budgets of the :attr:`.credentials`
+        in the :attr:`.rate_limits`.
+        
+        :raises RateLimitError:
+            If the request would exceed the quota.
+        
+        :returns:
+            A ``(keys, delay)`` tuple of the budget keys and the number of
+            seconds the request should wait.
+        """
+        
+        if self.rate_limits is None:
+            return {}, 0
+        
+        keys = self.rate_limits.keys(self.name, self.credentials,
+                                     self.consumer_key)
+        delay = self.rate_limits.acquire(keys, url)
+        if delay:
+            self._log(logging.INFO, u'Waiting {0:.2f} seconds for the rate '
+                      u'limit reset.'.format(delay))
+        return keys, delay
+    
+    
+    def _update_rate_limit(self, keys, response):
+        """
+        Updates the budgets in the :attr:`.rate_limits` with the quotas
+        reported in the response.
+        """
+        
+        if keys:
+            self.rate_limits.update(keys, self._x_rate_limit_parser(response))
+    
+    
     @classmethod
     def _authorization_header(cls, credentials):
         """
@@ -816,9 +1463,12 @@ class AuthorizationProvider(BaseProvider):
         """
         
         if cls._x_use_authorization_header:
-            res = ':'.join((credentials.consumer_key, credentials.consumer_secret))
-            res = base64.b64encode(six.b(res)).decode()
-            return {'Authorization': 'Basic {0}'.format(res)}
+            key = (credentials.consumer_key, credentials.consumer_secret)
+            registry = getattr(credentials._settings, 'registry', None)
+            value = registry.basic_auth.get(key) if registry is not None \
+                else None
+            return {'Authorization': value or
+                    authomatic.core._basic_authorization(*key)}
         else:
             return {}
     
@@ -32,7 +32,7 @@ import logging
 import time
 import uuid
 
-from authomatic import providers
+from authomatic import providers, ratelimit
 from authomatic.exceptions import (
     CancellationError,
     FailureError,
@@ -385,7 +385,8 @@ class OAuth1(providers.AuthorizationProvider):
                                                              verifier=verifier,
                                                              params=self.access_token_params)
             
-            response = self._fetch(*request_elements)
+            # The verifier can be used only once.
+            response = self._fetch(*request_elements, retry=False)
             self.access_token_response = response
             
             if not self._http_status_in_category(response.status, 2):
@@ -472,6 +473,9 @@ class OAuth1(providers.AuthorizationProvider):
             self._log(logging.INFO, u'Redirecting user to {0}.'.format(request_elements.full_url))
             
             self.redirect(request_elements.full_url)
+            
+            # Warm up the connection for phase 2 while the user is away.
+            self._preconnect(self.access_token_url)
 
 
 class Bitbucket(OAuth1):
@@ -827,6 +831,9 @@ class Twitter(OAuth1):
     access_token_url = 'https://api.twitter.com/oauth/access_token'
     user_info_url = 'https://api.twitter.com/1.1/account/verify_credentials.json'
     
+    # The token endpoints return query strings as text/html.
+    content_parsers = {'text/html': core.qs_parser}
+    
     supports_jsonp = True
      
     @staticmethod
@@ -837,6 +844,12 @@ class Twitter(OAuth1):
         user.locale = data.get('lang')
         user.link = data.get('url')
         return user
+    
+    
+    @staticmethod
+    def _x_rate_limit_parser(response):
+        rate_limit = ratelimit.parse_headers(response, 'X-Rate-Limit-')
+        return {'token': rate_limit} if rate_limit else {}
 
 
 class Tumblr(OAuth1):
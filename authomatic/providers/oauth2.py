@@ -33,7 +33,7 @@ from authomatic.six.moves.urllib.parse import urlencode
 import datetime
 import logging
 
-from authomatic import providers
+from authomatic import jsoncodec, pagination, providers, ratelimit
 from authomatic.exceptions import CancellationError, FailureError, OAuth2Error
 import authomatic.core as core
 
@@ -237,6 +237,28 @@ class OAuth2(providers.AuthorizationProvider):
             :class:`.Response`.
         """
         
+        request_elements = self._refresh_request_elements(credentials)
+        if request_elements is None:
+            return
+        
+        self._log(logging.INFO, u'Refreshing credentials.')
+        response = self._fetch(*request_elements, retry=True)
+        
+        return self._update_refreshed_credentials(credentials, response)
+    
+    
+    def _refresh_request_elements(self, credentials):
+        """
+        Creates the *refresh token request* elements.
+        
+        :param credentials:
+            :class:`.Credentials` to be refreshed.
+        
+        :returns:
+            :class:`.RequestElements` or ``None`` if it doesn't give sense
+            to refresh the credentials.
+        """
+        
         if not self._x_refresh_credentials_if(credentials):
             return
         
@@ -245,13 +267,26 @@ class OAuth2(providers.AuthorizationProvider):
         credentials.consumer_key = cfg.get('consumer_key')
         credentials.consumer_secret = cfg.get('consumer_secret')
         
-        request_elements = self.create_request_elements(request_type=self.REFRESH_TOKEN_REQUEST_TYPE,
-                                                        credentials=credentials,
-                                                        url=self.access_token_url,
-                                                        method='POST')
+        return self.create_request_elements(request_type=self.REFRESH_TOKEN_REQUEST_TYPE,
+                                            credentials=credentials,
+                                            url=self.access_token_url,
+                                            method='POST')
+    
+    
+    def _update_refreshed_credentials(self, credentials, response):
+        """
+        Updates :class:`.Credentials` with the response of the
+        *refresh token request*.
         
-        self._log(logging.INFO, u'Refreshing credentials.')
-        response = self._fetch(*request_elements)
+        :param credentials:
+            :class:`.Credentials` to be refreshed.
+        
+        :param response:
+            :class:`.Response` of the *refresh token request*.
+        
+        :returns:
+            The :data:`response`.
+        """
         
         # We no longer need consumer info.
         credentials.consumer_key = None
@@ -329,7 +364,8 @@ class OAuth2(providers.AuthorizationProvider):
                                                              params=self.access_token_params,
                                                              headers=self.access_token_headers)
 
-            response = self._fetch(*request_elements)
+            # The authorization code can be used only once.
+            response = self._fetch(*request_elements, retry=False)
             self.access_token_response = response
             
             access_token = response.data.get('access_token', '')
@@ -408,6 +444,9 @@ class OAuth2(providers.AuthorizationProvider):
             self._log(logging.INFO, u'Redirecting user to {0}.'.format(request_elements.full_url))
             
             self.redirect(request_elements.full_url)
+            
+            # Warm up the connection for phase 2 while the user is away.
+            self._preconnect(self.access_token_url)
 
 
 class Amazon(OAuth2):
@@ -798,6 +837,8 @@ class Facebook(OAuth2):
         timezone=True
     )
     
+    paginator = pagination.CursorPaginator()
+    
     @classmethod
     def _x_request_elements_filter(cls, request_type, request_elements,
                                    credentials):
@@ -850,6 +891,32 @@ class Facebook(OAuth2):
         return user
     
     
+    @staticmethod
+    def _x_rate_limit_parser(response):
+        """
+        Facebook reports the usage of the app in percent of the quota in the
+        ``X-App-Usage`` header.
+        """
+        
+        try:
+            usage = jsoncodec.loads(
+                response.getheader('X-App-Usage') or 'null')
+        except ValueError:
+            return {}
+        
+        if not isinstance(usage, dict):
+            return {}
+        
+        # Ignore values which are not numbers rather than fail the request.
+        used = [number for number in map(ratelimit._to_number, usage.values())
+                if number is not None]
+        if not used:
+            return {}
+        
+        return {'app': ratelimit.RateLimit(limit=100,
+                                           remaining=max(0, 100 - max(used)))}
+    
+    
     @staticmethod
     def _x_credentials_parser(credentials, data):
         """
@@ -1059,6 +1126,8 @@ class GitHub(OAuth2):
         username=True
     )
     
+    paginator = pagination.LinkHeaderPaginator()
+    
     @staticmethod
     def _x_user_parser(user, data):
         user.username = data.get('login')
@@ -1132,6 +1201,8 @@ class Google(OAuth2):
         picture=True
     )
     
+    paginator = pagination.PageTokenPaginator()
+    
     def __init__(self, *args, **kwargs):
         super(Google, self).__init__(*args, **kwargs)
         
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Rate Limits
+-----------
+
+Many **providers** report the quota of the **user** or of the **consumer**
+in headers of every response, e.g. :class:`.oauth2.GitHub` in the
+``X-RateLimit-*`` and :class:`.oauth1.Twitter` in the ``x-rate-limit-*``
+headers. The quotas are parsed by the
+``_x_rate_limit_parser()`` hook of the provider and kept in
+a :class:`.RateLimitTracker` shared by all providers of an
+:class:`.Authomatic` instance, one budget per access token and one budget
+per ``consumer_key``.
+
+The tracker which :class:`.Authomatic` creates by default only tracks the
+budgets. Pass your own tracker, which enforces them unless created with
+``enforce=False``, to the ``rate_limits`` argument of :class:`.Authomatic`
+to delay or reject calls of :meth:`.Authomatic.access` and
+:meth:`.Authomatic.access_many` before the quota is exhausted, instead of
+sending requests which the **provider** would reject with
+``429 Too Many Requests``:
+
+::
+
+    from authomatic import Authomatic
+    from authomatic.ratelimit import RateLimitTracker
+
+    authomatic = Authomatic(CONFIG, 'secret',
+                            rate_limits=RateLimitTracker(reserve=5,
+                                                         max_delay=30))
+
+    response = authomatic.access(credentials, url)
+    authomatic.rate_limit(credentials)
+    # {'token': RateLimit(limit=5000, remaining=4999, reset=1476612345.0)}
+
+.. autosummary::
+    :nosignatures:
+
+    RateLimit
+    RateLimitTracker
+
+"""
+
+import collections
+import hashlib
+import threading
+import time
+
+from authomatic import six
+from authomatic.exceptions import RateLimitError
+
+
+__all__ = ['RateLimit', 'RateLimitTracker', 'parse_headers']
+
+#: Values of reset headers lower than this are seconds until the reset,
+#: higher values are UNIX timestamps.
+TIMESTAMP_THRESHOLD = 10 ** 9
+
+
+def _to_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+def reset_time(value, now=None):
+    """
+    Converts the value of a reset header to a UNIX timestamp.
+
+    :param value:
+        Either a UNIX timestamp or a number of seconds until the reset.
+
+    :returns:
+        :class:`float` or ``None``.
+    """
+
+    value = _to_number(value)
+    if value is None:
+        return None
+    if value < TIMESTAMP_THRESHOLD:
+        return (time.time() if now is None else now) + value
+    return float(value)
+
+
+def parse_headers(response, prefix='X-RateLimit-'):
+    """
+    Parses the ``Limit``, ``Remaining``, ``Reset`` and ``Resource`` headers
+    with a common prefix.
+
+    :param response:
+        A :class:`.Response`.
+
+    :param str prefix:
+        Prefix of the headers, e.g. ``'X-RateLimit-'``.
+
+    :returns:
+        :class:`.RateLimit` or ``None`` if the response has none of the
+        headers.
+    """
+
+    limit = _to_number(response.getheader(prefix + 'Limit'))
+    remaining = _to_number(response.getheader(prefix + 'Remaining'))
+    if limit is None and remaining is None:
+        return None
+
+    return RateLimit(limit=limit,
+                     remaining=remaining,
+                     reset=reset_time(response.getheader(prefix + 'Reset')),
+                     resource=response.getheader(prefix + 'Resource'))
+
+
+class RateLimit(object):
+    """
+    A quota reported by a **provider**.
+    """
+
+    def __init__(self, limit=None, remaining=None, reset=None, resource=None):
+        #: Number of requests allowed in the current window or ``None``.
+        self.limit = limit
+
+        #: Number of requests left in the current window or ``None``.
+        self.remaining = remaining
+
+        #: UNIX timestamp when the quota will be restored or ``None``.
+        self.reset = reset
+
+        #: Name of the resource the quota applies to or ``None``.
+        self.resource = resource
+
+        #: Time of the last update.
+        self.updated = time.time()
+
+        # Number of requests which wait for the reset.
+        self._waiting = 0
+
+    def __repr__(self):
+        return '{0}(limit={1!r}, remaining={2!r}, reset={3!r})'.format(
+            self.__class__.__name__, self.limit, self.remaining, self.reset)
+
+    def copy(self):
+        """
+        Returns a copy of the rate limit.
+        """
+
+        rate_limit = RateLimit(self.limit, self.remaining, self.reset,
+                               self.resource)
+        rate_limit.updated = self.updated
+        return rate_limit
+
+    def to_dict(self):
+        """
+        Converts the rate limit to a :class:`dict`.
+        """
+
+        return dict(limit=self.limit,
+                    remaining=self.remaining,
+                    reset=self.reset,
+                    resource=self.resource)
+
+
+class RateLimitTracker(object):
+    """
+    A thread-safe store of the live budgets of access tokens and consumers.
+
+    Every call of :meth:`.acquire` takes one request from the budgets and
+    every response replaces them with the quota reported by the
+    **provider**, so that concurrent requests can't overdraw a budget.
+    """
+
+    def __init__(self, enforce=True, reserve=0, max_delay=0, stale_after=60,
+                 maxsize=10000):
+        """
+        :param bool enforce:
+            If ``False``, the budgets are only tracked, like by the default
+            tracker of :class:`.Authomatic`.
+
+        :param int reserve:
+            Number of requests which should be left in a budget, e.g. for
+            interactive use.
+
+        :param float max_delay:
+            Maximum number of seconds a call waits for the reset of
+            an exhausted budget. If the reset is further away or unknown,
+            :class:`.RateLimitError` is raised.
+
+        :param float stale_after:
+            Number of seconds after which a budget without a known reset
+            time is forgotten.
+
+        :param int maxsize:
+            Maximum number of budgets. The least recently updated budgets
+            are discarded first.
+        """
+
+        self.enforce = enforce
+        self.reserve = reserve
+        self.max_delay = max_delay
+        self.stale_after = stale_after
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._limits = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._limits)
+
+    @staticmethod
+    def keys(provider_name, credentials, consumer_key=None):
+        """
+        Returns the keys of the budgets of the credentials.
+
+        :param str provider_name:
+            Name of the provider in the :doc:`config`.
+
+        :param credentials:
+            :class:`.Credentials` or ``None``.
+
+        :param str consumer_key:
+            The ``consumer_key`` of the provider in the :doc:`config`.
+            The :attr:`.Credentials.consumer_key` can't be used, because it
+            is not restored by :meth:`.Credentials.deserialize` and it is
+            cleared by the refreshment.
+
+        :returns:
+            A :class:`dict` with the ``'token'`` and ``'app'`` keys.
+        """
+
+        keys = {}
+        if credentials is None:
+            return keys
+
+        if credentials.token:
+            # Don't keep the tokens in memory longer than necessary.
+            token = credentials.token
+            if isinstance(token, six.text_type):
+                token = token.encode('utf-8')
+            keys['token'] = (provider_name, 'token',
+                             hashlib.sha1(token).hexdigest())
+
+        if consumer_key:
+            keys['app'] = (provider_name, 'app', consumer_key)
+
+        return keys
+
+    def _current(self, key, now):
+        """Returns the budget of the key if it is still valid."""
+
+        rate_limit = self._limits.get(key)
+        if rate_limit is None:
+            return None
+
+        if rate_limit.reset is not None and rate_limit.reset <= now:
+            if rate_limit.limit is None:
+                del self._limits[key]
+                return None
+            # A new window has started.
+            rate_limit.remaining = rate_limit.limit - rate_limit._waiting
+            rate_limit.reset = None
+            rate_limit._waiting = 0
+            rate_limit.updated = now
+        elif rate_limit.reset is None and \
+                now - rate_limit.updated > self.stale_after:
+            del self._limits[key]
+            return None
+
+        return rate_limit
+
+    def acquire(self, keys, url=''):
+        """
+        Takes one request from the budgets.
+
+        :param dict keys:
+            Keys returned by :meth:`.keys`.
+
+        :param str url:
+            URL of the request used in the error.
+
+        :raises RateLimitError:
+            If a budget is exhausted and its reset is further than
+            :attr:`.max_delay` away.
+
+        :returns:
+            Number of seconds the request should wait.
+        """
+
+        delay = 0
+        now = time.time()
+        with self._lock:
+            # Check all budgets before taking from any of them, so that
+            # a rejected request doesn't use up the quota of the others.
+            available, waiting = [], []
+            for key in keys.values():
+                rate_limit = self._current(key, now)
+                if rate_limit is None or rate_limit.remaining is None:
+                    continue
+
+                if rate_limit.remaining > self.reserve or not self.enforce:
+                    available.append(rate_limit)
+                    continue
+
+                wait = None if rate_limit.reset is None \
+                    else rate_limit.reset - now
+                can_wait = rate_limit.limit is not None and \
+                    rate_limit._waiting < rate_limit.limit - self.reserve
+                if wait is None or wait > self.max_delay or not can_wait:
+                    raise RateLimitError(u'Rate limit exhausted!',
+                                         url=url,
+                                         status=429,
+                                         reset=rate_limit.reset)
+
+                waiting.append(rate_limit)
+                delay = max(delay, wait)
+
+            for rate_limit in available:
+                rate_limit.remaining = max(0, rate_limit.remaining - 1)
+            for rate_limit in waiting:
+                rate_limit._waiting += 1
+
+        return delay
+
+    def update(self, keys, limits):
+        """
+        Replaces the budgets with the quotas reported by the **provider**.
+
+        :param dict keys:
+            Keys returned by :meth:`.keys`.
+
+        :param dict limits:
+            :class:`.RateLimit` instances by the same keys as in ``keys``.
+        """
+
+        with self._lock:
+            for scope, rate_limit in (limits or {}).items():
+                key = keys.get(scope)
+                if key is None or rate_limit is None:
+                    continue
+
+                previous = self._limits.pop(key, None)
+                if previous is not None and previous.reset == rate_limit.reset:
+                    rate_limit._waiting = previous._waiting
+                self._limits[key] = rate_limit
+
+            while len(self._limits) > self.maxsize:
+                self._limits.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns a copy of a budget.
+
+        :param key:
+            One of the values returned by :meth:`.keys`.
+
+        :returns:
+            :class:`.RateLimit` or ``None``.
+        """
+
+        with self._lock:
+            rate_limit = self._current(key, time.time())
+            return rate_limit.copy() if rate_limit else None
+
+    def lookup(self, provider_name, credentials, consumer_key=None):
+        """
+        Returns copies of the budgets of the credentials.
+
+        The arguments are the same as of :meth:`.keys`.
+
+        :returns:
+            A :class:`dict` of :class:`.RateLimit` instances by ``'token'``
+            and ``'app'`` keys.
+        """
+
+        budgets = {}
+        keys = self.keys(provider_name, credentials, consumer_key)
+        for scope, key in keys.items():
+            rate_limit = self.get(key)
+            if rate_limit is not None:
+                budgets[scope] = rate_limit
+        return budgets
+
+    def budgets(self):
+        """
+        Returns copies of all budgets.
+
+        :returns:
+            A :class:`dict` of :class:`.RateLimit` instances by
+            ``(provider_name, scope, id)`` keys.
+        """
+
+        now = time.time()
+        with self._lock:
+            budgets = {}
+            for key in list(self._limits):
+                rate_limit = self._current(key, now)
+                if rate_limit is not None:
+                    budgets[key] = rate_limit.copy()
+            return budgets
+
+    def clear(self):
+        """
+        Forgets all budgets.
+        """
+
+        with self._lock:
+            self._limits.clear()
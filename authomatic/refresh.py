@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Background Refresh
+------------------
+
+:meth:`.Credentials.refresh` runs only when the application calls it and
+makes the caller wait for the **provider**. A :class:`.RefreshScheduler`
+refreshes registered credentials in the background instead, shortly before
+they expire, so that requests to **protected resources** always find
+a valid access token and never wait for a refresh:
+
+::
+
+    from authomatic.refresh import RefreshScheduler
+
+    def save(key, credentials):
+        db.update(key, credentials.serialize())
+
+    scheduler = RefreshScheduler(margin=300, on_refresh=save)
+
+    for key, serialized in db.rows():
+        scheduler.register(authomatic.credentials(serialized), key)
+
+The credentials are kept in a heap ordered by the time of their next
+refresh, which is :attr:`.RefreshScheduler.margin` seconds before the
+``expiration_time`` minus a random jitter, so that tokens issued at the
+same time are not refreshed at the same time. The refreshes run in a
+bounded thread pool with at most :attr:`.RefreshScheduler.max_per_provider`
+concurrent refreshes per **provider**. The credentials are updated in place.
+
+.. autosummary::
+    :nosignatures:
+
+    RefreshScheduler
+
+"""
+
+import collections
+from concurrent import futures
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from authomatic.retry import parse_retry_after
+
+
+__all__ = ['RefreshScheduler']
+
+_logger = logging.getLogger(__name__)
+
+#: Statuses of refresh responses after which the credentials are dropped,
+#: because refreshing them again would fail the same way.
+DROP_STATUSES = (400, 401, 403)
+
+
+class _Entry(object):
+    """Registered credentials."""
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.due = None
+        # Incremented on every rescheduling to invalidate older heap items.
+        self.generation = 0
+        self.running = False
+
+
+class RefreshScheduler(object):
+    """
+    Refreshes registered :class:`.Credentials` in background threads before
+    they expire.
+    """
+
+    def __init__(self, margin=300, jitter=60, max_workers=4,
+                 max_per_provider=2, retry_delay=60, on_refresh=None,
+                 on_error=None, executor=None, timeout=None, deadline=None):
+        """
+        :param float margin:
+            Number of seconds before the expiration when the credentials
+            should be refreshed.
+
+        :param float jitter:
+            Maximum number of seconds by which a refresh may be randomly
+            brought forward.
+
+        :param int max_workers:
+            Maximum number of concurrent refreshes. Used only if
+            :data:`executor` is ``None``.
+
+        :param int max_per_provider:
+            Maximum number of concurrent refreshes per **provider**.
+
+        :param float retry_delay:
+            Number of seconds after which a refresh which failed with
+            a transient error is retried, unless the response has
+            a ``Retry-After`` header.
+
+        :param callable on_refresh:
+            Called with the key and the :class:`.Credentials` after they
+            have been refreshed, e.g. to persist the new tokens.
+
+        :param callable on_error:
+            Called with the key, the :class:`.Credentials` and the exception
+            or the :class:`.Response` of a failed refresh. Credentials which
+            can't be refreshed, e.g. because the refresh token was revoked,
+            are unregistered; the third argument is the ``400``, ``401`` or
+            ``403`` response or ``None`` if the **provider** doesn't support
+            refreshing them. Other failed refreshes, including ``408`` and
+            ``429`` responses, are retried.
+
+        :param executor:
+            A :class:`concurrent.futures.Executor` which runs the refreshes.
+            If ``None``, a dedicated thread pool will be created, so that
+            the refreshes can't occupy the executor of the
+            :class:`.Authomatic` instance.
+
+        :param timeout:
+            Timeout of the refresh requests passed to
+            :meth:`.Credentials.refresh`.
+
+        :param float deadline:
+            Deadline of the refresh requests passed to
+            :meth:`.Credentials.refresh`.
+        """
+
+        self.margin = margin
+        self.jitter = jitter
+        self.max_per_provider = max_per_provider
+        self.retry_delay = retry_delay
+        self.on_refresh = on_refresh
+        self.on_error = on_error
+        self.timeout = timeout
+        self.deadline = deadline
+
+        #: Counts of ``refreshed``, ``failed``, ``dropped`` and ``deferred``
+        #: refreshes.
+        self.stats = dict(refreshed=0, failed=0, dropped=0, deferred=0)
+
+        self._executor = executor
+        self._own_executor = executor is None
+        self._max_workers = max_workers
+        self._cond = threading.Condition()
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        # Number of running refreshes by provider names.
+        self._running = collections.defaultdict(int)
+        # (key, generation) tuples which wait for a free slot by provider.
+        self._waiting = collections.defaultdict(collections.deque)
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _due(self, credentials):
+        """Returns the time of the next refresh or ``None``."""
+
+        if not credentials.expiration_time:
+            return None
+        return credentials.expiration_time - self.margin - \
+            random.uniform(0, self.jitter)
+
+    def _schedule(self, key, entry, due):
+        """Must be called with the lock held."""
+
+        entry.generation += 1
+        entry.due = due
+        if due is not None:
+            heapq.heappush(self._heap,
+                           (due, next(self._counter), key, entry.generation))
+            self._cond.notify()
+
+    def register(self, credentials, key=None):
+        """
+        Registers credentials to be refreshed before they expire.
+
+        Registering the same key again replaces the credentials and
+        reschedules the refresh.
+
+        :param credentials:
+            :class:`.Credentials`.
+
+        :param key:
+            A hashable key passed to the callbacks, e.g. the primary key of
+            the row where the credentials are stored. If ``None``, the
+            :func:`id` of the credentials will be used.
+
+        :returns:
+            The key.
+        """
+
+        key = id(credentials) if key is None else key
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError('The scheduler has been stopped!')
+
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(credentials)
+            entry.credentials = credentials
+            self._schedule(key, entry, self._due(credentials))
+            self._start()
+        return key
+
+    def unregister(self, key):
+        """
+        Stops refreshing the credentials registered under the key.
+
+        A refresh which is already running will finish, but its callbacks
+        won't be called.
+        """
+
+        with self._cond:
+            self._entries.pop(key, None)
+
+    def next_refresh(self, key):
+        """
+        Returns the UNIX timestamp of the next refresh of the credentials
+        or ``None`` if no refresh is scheduled.
+        """
+
+        with self._cond:
+            entry = self._entries.get(key)
+            return entry.due if entry is not None else None
+
+    def _start(self):
+        """Must be called with the lock held."""
+
+        if self._thread is None:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(self._max_workers)
+            self._thread = threading.Thread(target=self._run,
+                                            name='RefreshScheduler')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, wait=True):
+        """
+        Stops the scheduler.
+
+        :param bool wait:
+            If ``True``, waits until the running refreshes finish.
+        """
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait)
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, key, generation = heapq.heappop(self._heap)
+                    self._dispatch(key, generation)
+
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._cond.wait(timeout)
+
+    def _dispatch(self, key, generation):
+        """Must be called with the lock held."""
+
+        entry = self._entries.get(key)
+        if entry is None or entry.generation != generation or entry.running:
+            return
+
+        provider_name = entry.credentials.provider_name
+        if self._running[provider_name] >= self.max_per_provider:
+            self.stats['deferred'] += 1
+            self._waiting[provider_name].append((key, generation))
+            return
+
+        self._running[provider_name] += 1
+        entry.running = True
+        try:
+            self._executor.submit(self._refresh, key, entry)
+        except RuntimeError:
+            # The executor has been shut down.
+            self._running[provider_name] -= 1
+            entry.running = False
+
+    def _refresh(self, key, entry):
+        credentials = entry.credentials
+        provider_name = credentials.provider_name
+        response = error = None
+        try:
+            response = credentials.refresh(force=True, timeout=self.timeout,
+                                           deadline=self.deadline)
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            self._running[provider_name] -= 1
+            entry.running = False
+
+            # Give the free slot to the next waiting credentials.
+            waiting = self._waiting[provider_name]
+            while waiting and \
+                    self._running[provider_name] < self.max_per_provider:
+                self._dispatch(*waiting.popleft())
+
+            if self._entries.get(key) is not entry:
+                # Unregistered in the meantime.
+                return
+
+            now = time.time()
+            if error is None and response is not None and \
+                    200 <= response.status < 300:
+                self.stats['refreshed'] += 1
+                callback, args = self.on_refresh, (key, credentials)
+                due = self._due(credentials)
+                if due is None or due <= now:
+                    # The provider didn't extend the expiration.
+                    due = now + self.retry_delay
+            elif error is None and (response is None or
+                                    response.status in DROP_STATUSES):
+                # Can't be refreshed, e.g. the refresh token was revoked.
+                self.stats['dropped'] += 1
+                callback, args = self.on_error, (key, credentials, response)
+                del self._entries[key]
+                due = None
+            else:
+                self.stats['failed'] += 1
+                callback, args = self.on_error, \
+                    (key, credentials, error or response)
+                retry_after = parse_retry_after(response)
+                due = now + (self.retry_delay if retry_after is None
+                             else retry_after)
+
+            if due is not None:
+                self._schedule(key, entry, due)
+
+        if error is not None:
+            _logger.warning(u'Refreshing credentials {0!r} failed: {1!r}'
+                            .format(key, error))
+
+        if callback is not None:
+            try:
+                callback(*args)
+            except Exception as e:
+                _logger.exception(u'Refresh callback failed: {0!r}'
+                                  .format(e))
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Retries
+-------
+
+Requests to **providers** which fail with a transient error, like
+a connection reset or a ``503 Service Unavailable`` response, can be retried
+according to a :class:`.RetryPolicy`. The retries wait for an exponentially
+growing random time (*exponential backoff with full jitter*) or for as long
+as the ``Retry-After`` header of the response says, and a shared
+:class:`.RetryBudget` makes sure that the retries can't multiply the load
+of a **provider** which is already in trouble.
+
+Set the policy for all providers with the ``retry_policy`` argument of the
+:class:`.Authomatic` constructor or per provider with the ``retry_policy`` key
+in the :doc:`config`:
+
+::
+
+    from authomatic import Authomatic
+    from authomatic.retry import RetryPolicy, RetryBudget
+
+    policy = RetryPolicy(total=3, budget=RetryBudget())
+    authomatic = Authomatic(CONFIG, 'secret', retry_policy=policy)
+
+By default only requests with idempotent methods and the credentials
+refreshment are retried. The exchange of the authorization code or
+verifier for the access token is never retried, because the code can only
+be used once.
+
+.. autosummary::
+    :nosignatures:
+
+    RetryPolicy
+    RetryBudget
+    parse_retry_after
+
+"""
+
+import calendar
+import email.utils
+import random
+import threading
+import time
+
+from authomatic.pool import IDEMPOTENT_METHODS
+
+
+__all__ = ['RetryPolicy', 'RetryBudget', 'parse_retry_after']
+
+
+def parse_retry_after(response):
+    """
+    Parses the ``Retry-After`` header of a response.
+
+    :param response:
+        A :class:`.Response` or ``None``.
+
+    :returns:
+        Number of seconds or ``None`` if the header is missing or invalid.
+    """
+
+    value = response.getheader('Retry-After') \
+        if response is not None else None
+    if not value:
+        return
+
+    try:
+        return max(0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate(value)
+        if parsed:
+            return max(0, calendar.timegm(parsed) - time.time())
+
+
+class RetryBudget(object):
+    """
+    A thread-safe token bucket which limits the retries to a fraction of all
+    requests.
+
+    Every request deposits :attr:`.ratio` tokens and every retry withdraws
+    one token, so that there can be at most ``ratio`` retries per request
+    on average. To allow retries when there are only a few requests, the
+    bucket is also refilled by :attr:`.min_per_second` tokens each second.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=100):
+        """
+        :param float ratio:
+            Number of retries allowed per request.
+
+        :param float min_per_second:
+            Number of retries per second allowed regardless of the number
+            of requests.
+
+        :param float max_tokens:
+            Maximum number of retries which can be saved up.
+        """
+
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens = float(max_tokens)
+        self._updated = time.time()
+        self._stats = dict(requests=0, retries=0, rejected=0)
+
+    @property
+    def stats(self):
+        """
+        A :class:`dict` with the number of ``requests``, allowed ``retries``,
+        ``rejected`` retries and currently available ``tokens``.
+        """
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tokens'] = self._tokens
+            return stats
+
+    def _refill(self, tokens):
+        now = time.time()
+        tokens += (now - self._updated) * self.min_per_second
+        self._tokens = min(self.max_tokens, self._tokens + tokens)
+        self._updated = now
+
+    def deposit(self):
+        """
+        Records a request.
+        """
+
+        with self._lock:
+            self._stats['requests'] += 1
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        """
+        Asks for a retry.
+
+        :returns:
+            ``True`` if the retry is allowed.
+        """
+
+        with self._lock:
+            self._refill(0)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._stats['retries'] += 1
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed requests should be retried and how long to wait
+    before.
+    """
+
+    def __init__(self, total=3, statuses=(429, 500, 502, 503, 504),
+                 methods=IDEMPOTENT_METHODS, exceptions=(Exception,),
+                 backoff=0.5, max_backoff=30, retry_after=True,
+                 max_retry_after=60, budget=None):
+        """
+        :param int total:
+            Maximum number of retries of a request.
+
+        :param statuses:
+            HTTP status codes of responses which should be retried.
+
+        :param methods:
+            HTTP methods which are safe to retry.
+
+        :param tuple exceptions:
+            Exception types raised by the :doc:`transport </reference/transports>`
+            which should be retried.
+
+        :param float backoff:
+            Base of the exponential backoff in seconds. The n-th retry
+            waits a random time between ``0`` and ``backoff * 2 ** n``
+            seconds.
+
+        :param float max_backoff:
+            Maximum backoff in seconds.
+
+        :param bool retry_after:
+            Whether to honor the ``Retry-After`` header.
+
+        :param float max_retry_after:
+            The request won't be retried if the ``Retry-After`` header
+            asks to wait longer than this number of seconds.
+
+        :param budget:
+            A :class:`.RetryBudget` shared by all requests or ``None``.
+        """
+
+        self.total = total
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(methods)
+        self.exceptions = exceptions
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+
+    def allows(self, method, retry=None):
+        """
+        Whether a request may be retried at all.
+
+        :param str method:
+            HTTP method of the request.
+
+        :param bool retry:
+            ``False`` if the request must never be retried, ``True`` if it
+            should be retried even if its method is not idempotent and
+            ``None`` to decide by the :attr:`.methods`.
+        """
+
+        if retry is None:
+            return method in self.methods
+        return bool(retry)
+
+    def is_retryable(self, response=None, error=None):
+        """
+        Whether a response or an error of the transport should be retried.
+        """
+
+        if error is not None:
+            return isinstance(error, self.exceptions)
+        return response.status in self.statuses
+
+    def delay(self, attempt, response=None):
+        """
+        Returns the number of seconds to wait before a retry.
+
+        :param int attempt:
+            Number of the retry starting from ``0``.
+
+        :param response:
+            The response which is retried or ``None``.
+
+        :returns:
+            Number of seconds or ``None`` if the request should not be
+            retried because the ``Retry-After`` is too long.
+        """
+
+        if self.retry_after:
+            retry_after = parse_retry_after(response)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return
+                return retry_after
+
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    def start(self):
+        """
+        Records a new request in the :attr:`.budget`.
+        """
+
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def acquire(self):
+        """
+        Asks the :attr:`.budget` for a retry.
+
+        :returns:
+            ``True`` if the retry is allowed.
+        """
+
+        return self.budget is None or self.budget.withdraw()
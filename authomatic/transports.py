@@ -0,0 +1,614 @@
+# -*- coding: utf-8 -*-
+"""
+Transports
+----------
+
+All the HTTP requests made by **providers** go through a **transport**.
+By default the :class:`.HTTPClientTransport` based on the standard library
+is used, but you can pass any other transport to the :class:`.Authomatic`
+constructor, e.g. to reuse an HTTP stack which you already use elsewhere
+in your application:
+
+::
+
+    import urllib3
+    from authomatic import Authomatic
+    from authomatic.transports import Urllib3Transport
+
+    http = urllib3.PoolManager(maxsize=20)
+    authomatic = Authomatic(CONFIG, 'secret',
+                            transport=Urllib3Transport(http))
+
+If your application makes many concurrent requests to the same **provider**,
+e.g. with :meth:`.Authomatic.access_many`, the :class:`.HTTP2Transport`
+multiplexes them over a single HTTP/2 connection:
+
+::
+
+    from authomatic.transports import HTTP2Transport
+
+    authomatic = Authomatic(CONFIG, 'secret', transport=HTTP2Transport())
+
+The transport you pass doesn't use the ``ssl_context`` of the
+:class:`.Authomatic` instance, so pass the same context to both:
+
+::
+
+    context = ssl.create_default_context(cafile='ca-bundle.pem')
+    authomatic = Authomatic(CONFIG, 'secret', ssl_context=context,
+                            transport=HTTP2Transport(ssl_context=context))
+
+.. autosummary::
+    :nosignatures:
+
+    BaseTransport
+    HTTPClientTransport
+    Urllib3Transport
+    HTTP2Transport
+
+Implementing a Transport
+^^^^^^^^^^^^^^^^^^^^^^^^
+
+Subclass the :class:`.BaseTransport` and implement the
+:meth:`.BaseTransport.request` method. It must return an object with the
+same interface as :class:`httplib.HTTPResponse`, which means these members:
+
+* ``status``
+* ``reason``
+* ``version``
+* ``getheader(name, default=None)``
+* ``getheaders()``
+* ``read(amt=None)``
+* ``close()``
+
+Optionally it can also have the ``readinto(b)`` method to let the
+:meth:`.Response.save` method avoid copying the body.
+
+The transport must not decompress the body, the :class:`.Response`
+takes care of the ``Content-Encoding``.
+
+"""
+
+import abc
+import io
+import logging
+import numbers
+
+from authomatic.pool import ConnectionPool
+from authomatic.six.moves import urllib_parse as parse
+
+
+__all__ = ['BaseTransport', 'HTTPClientTransport', 'Urllib3Transport',
+           'HTTP2Transport', 'BufferedResponse', 'split_timeout']
+
+
+#: Values of the :attr:`httplib.HTTPResponse.version` by HTTP version.
+HTTP_VERSIONS = {'HTTP/1.0': 10, 'HTTP/1.1': 11, 'HTTP/2': 20}
+
+
+def split_timeout(timeout):
+    """
+    Normalizes a timeout.
+
+    :param timeout:
+        ``None``, number of seconds or a ``(connect, read)`` tuple.
+
+    :returns:
+        A ``(connect, read)`` tuple of seconds or ``None`` values.
+    """
+
+    if timeout is None or isinstance(timeout, numbers.Number):
+        return timeout, timeout
+    connect, read = timeout
+    return connect, read
+
+
+class BufferedResponse(object):
+    """
+    A response whose body is already in memory, with the same interface as
+    :class:`httplib.HTTPResponse`.
+    """
+
+    def __init__(self, status, reason, headers, body, version=11):
+        """
+        :param int status:
+            HTTP status code.
+
+        :param str reason:
+            HTTP reason phrase.
+
+        :param list headers:
+            List of ``(header, value)`` tuples.
+
+        :param bytes body:
+            The whole response body.
+
+        :param int version:
+            HTTP version, ``10`` for HTTP/1.0, ``11`` for HTTP/1.1.
+        """
+
+        #: HTTP status code.
+        self.status = status
+        #: HTTP reason phrase.
+        self.reason = reason
+        #: HTTP version, ``10`` for HTTP/1.0, ``11`` for HTTP/1.1.
+        self.version = version
+        #: List of ``(header, value)`` tuples.
+        self.msg = list(headers)
+        self._body = io.BytesIO(body)
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Reads the whole body of a response.
+
+        :param response:
+            A :class:`httplib.HTTPResponse` compatible response.
+
+        :returns:
+            :class:`.BufferedResponse`
+        """
+
+        body = response.read()
+        return cls(response.status, response.reason, response.getheaders(),
+                   body, getattr(response, 'version', 11))
+
+    def copy(self):
+        """
+        Returns a copy of the response with its own read position, which
+        can be read independently of the original.
+        """
+
+        return self.__class__(self.status, self.reason, self.msg,
+                              self._body.getvalue(), self.version)
+
+    def read(self, amt=None):
+        """
+        Reads and returns at most :data:`amt` bytes or the rest of the body
+        if :data:`amt` is ``None``.
+        """
+
+        return self._body.read(-1 if amt is None else amt)
+
+    def readinto(self, b):
+        """
+        Reads the body into a pre-allocated writable buffer.
+        """
+
+        return self._body.readinto(b)
+
+    def getheader(self, name, default=None):
+        """
+        Returns the value of the :data:`name` header or :data:`default`.
+        Values of repeated headers are joined by comma.
+        """
+
+        name = name.lower()
+        values = [v for k, v in self.msg if k.lower() == name]
+        return ', '.join(values) if values else default
+
+    def getheaders(self):
+        """
+        Returns a :class:`list` of ``(header, value)`` tuples.
+        """
+
+        return list(self.msg)
+
+    def isclosed(self):
+        """
+        ``True`` if the whole body has been read.
+        """
+
+        return self._body.tell() == len(self._body.getvalue())
+
+    def close(self):
+        """
+        Discards the unread rest of the body.
+        """
+
+        self._body.seek(0, io.SEEK_END)
+
+
+class BaseTransport(object):
+    """
+    Abstract base class for all transports.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """
+        Must send the request and return the response as soon as the status
+        line and headers have been received. Redirects must not be followed.
+
+        :param str method:
+            HTTP method of the request.
+
+        :param str url:
+            Absolute URL of the request including the query string.
+
+        :param str body:
+            Body of the request.
+
+        :param dict headers:
+            HTTP headers of the request.
+
+        :param timeout:
+            Number of seconds or a ``(connect, read)`` tuple, see
+            :func:`.split_timeout`. The read timeout applies to each read
+            from the socket. ``None`` means no timeout.
+
+        :returns:
+            An object with the :class:`httplib.HTTPResponse` interface.
+        """
+
+    def preconnect(self, url, timeout=None):
+        """
+        Opens a connection to the host of the :data:`url` ahead of time,
+        so that the next request to it doesn't have to wait for the DNS
+        lookup, TCP and TLS handshake.
+        Does nothing by default.
+
+        :param str url:
+            Any URL of the host.
+
+        :param float timeout:
+            Connect timeout in seconds.
+
+        :returns:
+            ``True`` if a new connection has been opened.
+        """
+
+        return False
+
+    def close(self):
+        """
+        Releases all resources held by the transport.
+        """
+
+
+class HTTPClientTransport(BaseTransport):
+    """
+    The default transport based on the :mod:`httplib` module of the standard
+    library, which keeps connections alive in a :class:`.ConnectionPool`.
+    """
+
+    def __init__(self, pool=None):
+        """
+        :param pool:
+            A :class:`.ConnectionPool` instance.
+            If ``None``, a pool with default settings will be created.
+        """
+
+        #: The :class:`.ConnectionPool` used by the transport.
+        self.pool = pool or ConnectionPool()
+
+    @property
+    def ssl_context(self):
+        """
+        :class:`ssl.SSLContext` of the :attr:`pool`.
+        """
+
+        return self.pool.ssl_context
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        scheme, host, path, query, fragment = parse.urlsplit(url)
+        request_path = parse.urlunsplit(('', '', path or '/', query, ''))
+
+        return self.pool.request(scheme, host, method, request_path, body,
+                                 headers, split_timeout(timeout))
+
+    def preconnect(self, url, timeout=None):
+        scheme, host = parse.urlsplit(url)[:2]
+        return self.pool.preconnect(scheme, host, timeout)
+
+    def close(self):
+        self.pool.clear()
+
+
+class Urllib3Response(object):
+    """
+    Adapts the |urllib3|_ response to the :class:`httplib.HTTPResponse`
+    interface.
+    """
+
+    def __init__(self, response):
+        """
+        :param response:
+            The wrapped :class:`urllib3.response.HTTPResponse` instance.
+        """
+
+        self._response = response
+
+        #: The response headers.
+        self.msg = response.headers
+        #: HTTP version, ``10`` for HTTP/1.0, ``11`` for HTTP/1.1.
+        self.version = response.version
+        #: HTTP status code.
+        self.status = response.status
+        #: HTTP reason phrase.
+        self.reason = response.reason
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def read(self, amt=None):
+        """
+        Reads and returns at most :data:`amt` bytes or the rest of the body
+        if :data:`amt` is ``None``.
+        """
+
+        return self._response.read(amt)
+
+    def getheader(self, name, default=None):
+        """
+        Returns the value of the :data:`name` header or :data:`default`.
+        """
+
+        return self._response.headers.get(name, default)
+
+    def getheaders(self):
+        """
+        Returns a :class:`list` of ``(header, value)`` tuples.
+        """
+
+        return list(self._response.headers.items())
+
+    def close(self):
+        """
+        Closes the response and returns the connection to the pool.
+
+        The rest of a partially read body is discarded first, so that
+        the next request on the connection doesn't read it. Versions of
+        |urllib3|_ without :meth:`drain_conn` close the connection instead.
+        """
+
+        drain_conn = getattr(self._response, 'drain_conn', None)
+        if drain_conn is not None:
+            drain_conn()
+        else:
+            self._response.close()
+        self._response.release_conn()
+
+
+class Urllib3Transport(BaseTransport):
+    """
+    Adapter for |urllib3|_ and compatible pooled HTTP engines.
+
+    Accepts any object with the :meth:`urllib3.PoolManager.urlopen`
+    interface, e.g. a :class:`urllib3.PoolManager` or
+    :class:`urllib3.ProxyManager`, which allows you to share the connection
+    pools, proxies and TLS settings you already use elsewhere.
+
+    .. note::
+
+        Depends on the |urllib3|_ package only if you don't provide the
+        :data:`pool_manager`.
+    """
+
+    def __init__(self, pool_manager=None, **kwargs):
+        """
+        :param pool_manager:
+            An object with the :meth:`urllib3.PoolManager.urlopen` interface.
+            If ``None``, a new :class:`urllib3.PoolManager` will be created
+            with the additional keyword arguments.
+        """
+
+        if pool_manager is None:
+            import urllib3
+            pool_manager = urllib3.PoolManager(**kwargs)
+
+        #: The wrapped pool manager.
+        self.pool_manager = pool_manager
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        kwargs = {}
+        if timeout is not None:
+            import urllib3
+            connect, read = split_timeout(timeout)
+            kwargs['timeout'] = urllib3.Timeout(connect=connect, read=read)
+
+        response = self.pool_manager.urlopen(method, url,
+                                             body=body or None,
+                                             headers=headers or {},
+                                             redirect=False,
+                                             retries=False,
+                                             preload_content=False,
+                                             decode_content=False,
+                                             **kwargs)
+        return Urllib3Response(response)
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+class HTTPXResponse(object):
+    """
+    Adapts the |httpx|_ streamed response to the
+    :class:`httplib.HTTPResponse` interface.
+    """
+
+    def __init__(self, response):
+        """
+        :param response:
+            The wrapped :class:`httpx.Response` sent with ``stream=True``.
+        """
+
+        self._response = response
+        self._chunks = response.iter_raw()
+        self._buffer = b''
+        self._exhausted = False
+
+        #: List of ``(header, value)`` tuples.
+        self.msg = list(response.headers.multi_items())
+        #: HTTP version, ``11`` for HTTP/1.1, ``20`` for HTTP/2.
+        self.version = HTTP_VERSIONS.get(response.http_version, 11)
+        #: HTTP status code.
+        self.status = response.status_code
+        #: HTTP reason phrase.
+        self.reason = response.reason_phrase
+
+    def read(self, amt=None):
+        """
+        Reads and returns at most :data:`amt` bytes or the rest of the body
+        if :data:`amt` is ``None``.
+        """
+
+        while not self._exhausted and (amt is None or
+                                       len(self._buffer) < amt):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                # The iterator has returned the stream to the pool.
+                self._exhausted = True
+            else:
+                self._buffer += chunk
+
+        if amt is None:
+            amt = len(self._buffer)
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def readinto(self, b):
+        """
+        Reads the body into a pre-allocated writable buffer.
+        """
+
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def getheader(self, name, default=None):
+        """
+        Returns the value of the :data:`name` header or :data:`default`.
+        Values of repeated headers are joined by comma.
+        """
+
+        values = self._response.headers.get_list(name)
+        return ', '.join(values) if values else default
+
+    def getheaders(self):
+        """
+        Returns a :class:`list` of ``(header, value)`` tuples.
+        """
+
+        return list(self.msg)
+
+    def isclosed(self):
+        """
+        ``True`` if the whole body has been read.
+        """
+
+        return self._exhausted and not self._buffer
+
+    def close(self):
+        """
+        Closes the response and releases the stream.
+        """
+
+        self._exhausted = True
+        self._buffer = b''
+        self._response.close()
+
+
+class HTTP2Transport(BaseTransport):
+    """
+    An opt-in transport based on |httpx|_, which multiplexes concurrent
+    requests to a host over a single HTTP/2 connection.
+
+    It falls back to HTTP/1.1 for hosts which don't negotiate HTTP/2,
+    for all hosts if the |h2|_ package is not installed, and to the
+    :class:`.HTTPClientTransport` if |httpx|_ is not installed at all.
+
+    .. note::
+
+        Depends on the |httpx|_ package and for HTTP/2 on the |h2|_
+        package, e.g. ``pip install httpx[http2]``.
+    """
+
+    def __init__(self, client=None, ssl_context=None, max_connections=10,
+                 **kwargs):
+        """
+        :param client:
+            An :class:`httpx.Client` instance.
+            If ``None``, a new HTTP/2 enabled client will be created with the
+            additional keyword arguments.
+
+        :param ssl_context:
+            :class:`ssl.SSLContext` of the client created if :data:`client`
+            is ``None``, or of the fallback :class:`.HTTPClientTransport`.
+            Pass the :attr:`.Authomatic.ssl_context` to share it.
+
+        :param int max_connections:
+            Maximum number of connections of the client created if
+            :data:`client` is ``None``.
+        """
+
+        #: The fallback :class:`.HTTPClientTransport` or ``None``.
+        self.fallback = None
+        #: The :class:`ssl.SSLContext` passed to the transport, ``None`` if
+        #: it uses the :data:`client` as is.
+        self.ssl_context = None
+
+        if client is None:
+            self.ssl_context = ssl_context
+            try:
+                import httpx
+            except ImportError:
+                logging.getLogger(__name__).warning(
+                    u'The httpx package is not installed, falling back to '
+                    u'the HTTPClientTransport.')
+                self.fallback = HTTPClientTransport(
+                    ConnectionPool(ssl_context=ssl_context))
+            else:
+                client = self._create_client(httpx, ssl_context,
+                                             max_connections, kwargs)
+
+        #: The wrapped :class:`httpx.Client` or ``None``.
+        self.client = client
+
+    @staticmethod
+    def _create_client(httpx, ssl_context, max_connections, kwargs):
+        """Creates the client, without HTTP/2 if h2 is missing."""
+
+        if ssl_context is not None:
+            kwargs.setdefault('verify', ssl_context)
+        kwargs.setdefault('timeout', None)
+        kwargs.setdefault('limits', httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections))
+
+        try:
+            return httpx.Client(http2=True, **kwargs)
+        except ImportError:
+            logging.getLogger(__name__).warning(
+                u'The h2 package is not installed, falling back to HTTP/1.1.')
+            return httpx.Client(**kwargs)
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        if self.fallback is not None:
+            return self.fallback.request(method, url, body, headers, timeout)
+
+        import httpx
+        connect, read = split_timeout(timeout)
+
+        request = self.client.build_request(
+            method, url,
+            content=body or None,
+            headers=headers or {},
+            timeout=httpx.Timeout(None, connect=connect, read=read))
+
+        response = self.client.send(request, stream=True,
+                                    follow_redirects=False)
+        return HTTPXResponse(response)
+
+    def preconnect(self, url, timeout=None):
+        if self.fallback is not None:
+            return self.fallback.preconnect(url, timeout)
+        return False
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+        else:
+            self.client.close()
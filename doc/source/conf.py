@@ -78,9 +78,22 @@ rst_prolog = """
 .. _pyopenid:
 .. _python-openid: http://pypi.python.org/pypi/python-openid/
 
-.. |classmethod| replace:: Must be a classmethod!
+.. |urllib3| replace:: urllib3
+.. _urllib3: https://urllib3.readthedocs.io/
+
+.. |httpx| replace:: httpx
+.. _httpx: https://www.python-httpx.org/
+
+.. |h2| replace:: h2
+.. _h2: https://python-hyper.org/projects/h2/
 
-.. |async| replace:: The internal implementation of the future pattern is quite naive. Use with caution!
+.. |orjson| replace:: orjson
+.. _orjson: https://github.com/ijl/orjson
+
+.. |ujson| replace:: ujson
+.. _ujson: https://github.com/ultrajson/ultrajson
+
+.. |classmethod| replace:: Must be a classmethod!
 
 .. |provider-class| replace:: provider class
 .. _provider-class: /reference/providers
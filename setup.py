@@ -1,8 +1,23 @@
+import sys
+
 from setuptools import setup,find_packages
+from setuptools.command.build_py import build_py
 
 from authomatic import six
 
 
+class BuildPy(build_py):
+    """Leaves out the modules which can't be compiled by the interpreter."""
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            # The asyncio API uses the async def syntax.
+            modules = [m for m in modules if m[:2] != ('authomatic', 'aio')]
+        return modules
+
+
+
 setup(
     name='Authomatic',
     version='0.1.0.post1', # TODO: Put version in one place.
@@ -16,8 +31,12 @@ setup(
     keywords='authorization authentication oauth openid',
     url='http://peterhudec.github.io/authomatic',
     license = 'MIT',
+    cmdclass={'build_py': BuildPy},
+    python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*',
+    install_requires=[] if six.PY3 else ['futures'],
     extras_require={
         'OpenID': ['python3-openid' if six.PY3 else 'python-openid'],
+        'HTTP2': ['httpx[http2]'],
     },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
@@ -27,6 +46,13 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Programming Language :: JavaScript',
         'Topic :: Internet :: WWW/HTTP',
         'Topic :: Internet :: WWW/HTTP :: Dynamic Content :: '
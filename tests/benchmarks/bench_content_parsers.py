@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the cost of parsing typical token and profile responses by
+guessing the format with :func:`authomatic.core.json_qs_parser` and by
+choosing the parser by the ``Content-Type`` header.
+
+Run it with::
+
+    $ python tests/benchmarks/bench_content_parsers.py [number]
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from authomatic import core
+from authomatic.transports import BufferedResponse
+
+
+PROFILE = json.dumps(dict(
+    id='1234567890',
+    name='John Doe',
+    first_name='John',
+    last_name='Doe',
+    email='john.doe@example.com',
+    link='https://www.facebook.com/john.doe',
+    locale='en_US',
+    location=dict(id='110843418940484', name='Prague, Czech Republic'),
+    friends=[dict(id=str(i), name='Friend {0}'.format(i))
+             for i in range(200)],
+))
+
+PAYLOADS = [
+    ('JSON token', 'application/json; charset=UTF-8',
+     json.dumps(dict(access_token='a' * 180, token_type='bearer',
+                     expires_in=5183999))),
+    ('query string token', 'application/x-www-form-urlencoded',
+     'access_token={0}&expires=5183999'.format('a' * 180)),
+    ('query string token as text/html', 'text/html; charset=utf-8',
+     'oauth_token={0}&oauth_token_secret={1}&oauth_callback_confirmed=true'
+     .format('a' * 40, 'b' * 40)),
+    ('JSON profile', 'application/json', PROFILE),
+    ('XML profile', 'application/xml',
+     '<?xml version="1.0"?><person><id>123</id><first-name>John</first-name>'
+     '<last-name>Doe</last-name><email-address>john@example.com'
+     '</email-address></person>'),
+]
+
+# Twitter uses text/html for the token responses.
+PROVIDER_PARSERS = {'text/html': core.qs_parser}
+
+
+def parse(content_type, body, content_parser=None):
+    response = core.Response(
+        BufferedResponse(200, 'OK', [('Content-Type', content_type)],
+                         body.encode('utf-8')),
+        content_parser, PROVIDER_PARSERS)
+    return response.data
+
+
+def main(number=2000):
+    print('{0:<34}{1:>14}{2:>14}{3:>9}'.format('payload', 'guessing (us)',
+                                              'registry (us)', 'speedup'))
+    for name, content_type, body in PAYLOADS:
+        guessing = timeit.timeit(
+            lambda: parse(content_type, body, core.json_qs_parser),
+            number=number) / number * 1e6
+        registry = timeit.timeit(lambda: parse(content_type, body),
+                                 number=number) / number * 1e6
+        print('{0:<34}{1:>14.1f}{2:>14.1f}{3:>8.1f}x'.format(
+            name, guessing, registry, guessing / registry))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
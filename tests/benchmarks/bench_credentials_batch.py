@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the throughput of deserializing and serializing credentials one by
+one with :meth:`.Credentials.deserialize` and :meth:`.Credentials.serialize`
+and in batches with :meth:`.Authomatic.deserialize_many` and
+:meth:`.Authomatic.serialize_many`.
+
+The corpus cycles through the samples of
+``bench_credentials_serialization.py`` in both formats.
+
+Run it with::
+
+    $ python tests/benchmarks/bench_credentials_batch.py [rows]
+"""
+
+from __future__ import print_function
+
+import collections
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from authomatic import Authomatic, core
+from bench_credentials_serialization import CONFIG, SAMPLES, make_credentials
+
+
+def corpus(rows, compact):
+    serialized = [make_credentials(name, values).serialize(compact=compact)
+                  for name, values in SAMPLES]
+    return itertools.islice(itertools.cycle(serialized), rows)
+
+
+def consume(iterable):
+    collections.deque(iterable, maxlen=0)
+
+
+def measure(name, rows, func):
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    print('{0:<50}{1:>10.2f}{2:>14,.0f}'.format(name, elapsed,
+                                                rows / elapsed))
+
+
+def main(rows=1000000):
+    authomatic = Authomatic(CONFIG, 'secret')
+    credentials = [make_credentials(name, values) for name, values in SAMPLES]
+    records = list(authomatic.deserialize_many(
+        [c.serialize() for c in credentials], output='tuple'))
+
+    print('{0:<50}{1:>10}{2:>14}'.format('{0:,} rows'.format(rows), 'seconds',
+                                         'rows/s'))
+
+    for compact in (False, True):
+        label = 'compact' if compact else 'legacy'
+
+        measure('{0}: Credentials.deserialize()'.format(label), rows,
+                lambda: consume(core.Credentials.deserialize(CONFIG, s)
+                                for s in corpus(rows, compact)))
+
+        for output in ('credentials', 'tuple', 'dict'):
+            measure('{0}: deserialize_many(output={1!r})'
+                    .format(label, output), rows,
+                    lambda: consume(authomatic.deserialize_many(
+                        corpus(rows, compact), output=output)))
+
+        measure('{0}: Credentials.serialize()'.format(label), rows,
+                lambda: consume(c.serialize(compact=compact) for c in
+                                itertools.islice(itertools.cycle(credentials),
+                                                 rows)))
+
+        measure('{0}: serialize_many(records)'.format(label), rows,
+                lambda: consume(authomatic.serialize_many(
+                    itertools.islice(itertools.cycle(records), rows),
+                    compact=compact)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
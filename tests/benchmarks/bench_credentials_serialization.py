@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the size and the speed of :meth:`.Credentials.serialize` and
+:meth:`.Credentials.deserialize` in the legacy percent encoded format and
+in the compact format.
+
+Run it with::
+
+    $ python tests/benchmarks/bench_credentials_serialization.py [number]
+"""
+
+from __future__ import print_function
+
+import base64
+import os
+import random
+import string
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from authomatic import core
+from authomatic.providers import oauth1, oauth2
+
+
+random.seed(0)
+
+ALPHANUMERIC = string.ascii_letters + string.digits
+B64URL = ALPHANUMERIC + '-_'
+
+
+def random_string(length, alphabet=B64URL):
+    return ''.join(random.choice(alphabet) for _ in range(length))
+
+
+def jwt(length):
+    segment = lambda n: base64.urlsafe_b64encode(
+        os.urandom(n)).decode('ascii').rstrip('=')
+    return '.'.join((segment(36), segment(length), segment(256)))
+
+
+CONFIG = {
+    'google': {'class_': oauth2.Google, 'id': 1},
+    'facebook': {'class_': oauth2.Facebook, 'id': 2},
+    'github': {'class_': oauth2.GitHub, 'id': 3},
+    'twitter': {'class_': oauth1.Twitter, 'id': 4},
+    'jwt': {'class_': oauth2.Google, 'id': 5},
+}
+
+SAMPLES = [
+    ('google', dict(token='ya29.' + random_string(160),
+                    refresh_token='1//0' + random_string(99),
+                    expiration_time=int(time.time()) + 3600)),
+    ('facebook', dict(token='EAAB' + random_string(180, ALPHANUMERIC),
+                      expiration_time=int(time.time()) + 5184000)),
+    ('github', dict(token='gho_' + random_string(36, ALPHANUMERIC))),
+    ('twitter', dict(token='1234567890-' + random_string(39, ALPHANUMERIC),
+                     token_secret=random_string(45, ALPHANUMERIC))),
+    ('jwt', dict(token=jwt(900),
+                   refresh_token=random_string(300, ALPHANUMERIC + '+/'),
+                   expiration_time=int(time.time()) + 3600)),
+]
+
+
+def make_credentials(provider_name, values):
+    credentials = core.Credentials(CONFIG)
+    credentials.provider_name = provider_name
+    credentials.provider_id = CONFIG[provider_name]['id']
+    credentials.provider_class = CONFIG[provider_name]['class_']
+    credentials.provider_type = credentials.provider_class.get_type()
+    credentials.provider_type_id = credentials.provider_class(
+        core.Authomatic(CONFIG, 'secret'), None, provider_name).type_id
+    credentials.token_type = 'Bearer'
+    for key, value in values.items():
+        setattr(credentials, key, value)
+    return credentials
+
+
+def best(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5))
+
+
+def main(number=20000):
+    print('{0:<10}{1:>8}{2:>9}{3:>13}{4:>13}{5:>13}{6:>13}'.format(
+        'provider', 'legacy', 'compact', 'enc legacy', 'enc compact',
+        'dec legacy', 'dec compact'))
+    print('{0:<10}{1:>8}{2:>9}{3:>13}{4:>13}{5:>13}{6:>13}'.format(
+        '', '(bytes)', '(bytes)', '(us)', '(us)', '(us)', '(us)'))
+
+    for provider_name, values in SAMPLES:
+        credentials = make_credentials(provider_name, values)
+        legacy = credentials.serialize()
+        compact = credentials.serialize(compact=True)
+
+        timings = [
+            best(lambda: credentials.serialize(), number),
+            best(lambda: credentials.serialize(compact=True), number),
+            best(lambda: core.Credentials.deserialize(CONFIG, legacy), number),
+            best(lambda: core.Credentials.deserialize(CONFIG, compact),
+                 number),
+        ]
+
+        print('{0:<10}{1:>8}{2:>9}{3:>13.2f}{4:>13.2f}{5:>13.2f}{6:>13.2f}'
+              .format(provider_name, len(legacy), len(compact),
+                      *[t / number * 1e6 for t in timings]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures of the unit tests.
+
+The ``server`` fixture is a local HTTP/1.1 server whose responses are
+set per test::
+
+    def test_something(server):
+        server.respond('/foo', 200, {'Content-Type': 'text/plain'}, b'foo')
+        server.url('/foo')  # 'http://127.0.0.1:<port>/foo'
+        server.requests     # List of received Request tuples.
+
+The ``make_authomatic`` fixture creates an :class:`.Authomatic` instance
+with a single OAuth 2.0 provider named ``'local'`` whose token endpoint is
+the ``/token`` path of the server, optionally with more ``settings``, and
+``make_credentials`` creates its credentials.
+"""
+
+import collections
+import socket
+import sys
+import threading
+
+import pytest
+
+from authomatic import Authomatic
+from authomatic.core import Credentials
+from authomatic.providers.oauth2 import OAuth2
+from authomatic.six.moves import BaseHTTPServer, socketserver
+
+
+if sys.version_info < (3, 5):
+    # The asyncio API uses the async def syntax.
+    collect_ignore = ['test_aio.py']
+
+
+Request = collections.namedtuple('Request', 'method path headers body')
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        request = Request(self.command, self.path, dict(self.headers.items()),
+                          body)
+
+        server = self.server.local_server
+        with server.lock:
+            server.requests.append(request)
+            route = server.routes.get(self.path.partition('?')[0])
+
+        if route is None:
+            status, headers, body = 404, {}, b'Not found'
+        elif callable(route):
+            status, headers, body = route(request)
+        else:
+            status, headers, body = route
+
+        self.send_response(status)
+        headers = dict(headers)
+        if 'Content-Length' not in headers and \
+                'Transfer-Encoding' not in headers:
+            headers['Content-Length'] = str(len(body))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_PATCH = _handle
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn,
+                       BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections are not errors.
+        if not isinstance(sys.exc_info()[1], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request,
+                                                   client_address)
+
+
+class LocalServer(object):
+    """A local HTTP server with configurable responses."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.requests = []
+        self._server = _ThreadingServer(('127.0.0.1', 0), _Handler)
+        self._server.local_server = self
+        self.host = '127.0.0.1:{0}'.format(self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def respond(self, path, status=200, headers=None, body=b''):
+        """
+        Sets the response of a path. The :data:`status` can also be a
+        function which takes a :class:`Request` and returns a
+        ``(status, headers, body)`` tuple.
+        """
+
+        if callable(status):
+            self.routes[path] = status
+        else:
+            self.routes[path] = (status, headers or {}, body)
+
+    def url(self, path='/'):
+        return 'http://{0}{1}'.format(self.host, path)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def server():
+    server = LocalServer()
+    yield server
+    server.close()
+
+
+class Local(OAuth2):
+    """OAuth 2.0 provider whose endpoints are taken from the config."""
+
+    user_authorization_url = 'https://example.com/authorize'
+
+    @property
+    def access_token_url(self):
+        return self._config['access_token_url']
+
+    @property
+    def user_info_url(self):
+        return self._config['user_info_url']
+
+
+PROVIDER_ID_MAP = [Local]
+
+
+@pytest.fixture
+def make_authomatic(server):
+    def make_authomatic(settings=None, **kwargs):
+        config = {'local': {'class_': Local,
+                            'id': 1,
+                            'consumer_key': 'key',
+                            'consumer_secret': 'secret',
+                            'access_token_url': server.url('/token'),
+                            'user_info_url': server.url('/me')}}
+        config['local'].update(settings or {})
+        return Authomatic(config, 'secret', **kwargs)
+
+    return make_authomatic
+
+
+@pytest.fixture
+def make_credentials():
+    def make_credentials(authomatic, provider_name='local', **kwargs):
+        ProviderClass = authomatic.registry.provider_class(provider_name)
+        provider = ProviderClass(authomatic, None, provider_name)
+        kwargs.setdefault('token', 'token')
+        kwargs.setdefault('token_type', 'Bearer')
+        kwargs.setdefault('refresh_token', 'refresh')
+        kwargs.setdefault('expire_in', 3600)
+        return Credentials(authomatic.config, provider=provider, **kwargs)
+
+    return make_credentials
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from authomatic.transports import BaseTransport, BufferedResponse
+
+
+class EchoTransport(BaseTransport):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            threading.Event().wait(0.01)
+            body = '{0} {1}'.format(url, headers['Authorization'])
+            return BufferedResponse(200, 'OK', [], body.encode())
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def count_deserializations(authomatic):
+    calls = []
+    credentials = authomatic.credentials
+
+    def wrapper(value):
+        calls.append(value)
+        return credentials(value)
+
+    authomatic.credentials = wrapper
+    return calls
+
+
+def test_access_many(make_authomatic, make_credentials):
+    transport = EchoTransport()
+    authomatic = make_authomatic(transport=transport)
+    users = [make_credentials(authomatic, token='token{0}'.format(i))
+             .serialize() for i in range(3)]
+    requests = [(users[i % 3], 'https://example.com/{0}'.format(i))
+                for i in range(9)]
+
+    results = dict(authomatic.access_many(iter(requests), concurrency=4,
+                                          per_host=2))
+
+    assert sorted(results) == list(range(9))
+    for index, future in results.items():
+        assert future.result().content == \
+            'https://example.com/{0} Bearer token{1}'.format(index, index % 3)
+    assert transport.max_in_flight <= 2
+
+
+def test_access_many_accepts_dicts(make_authomatic, make_credentials):
+    authomatic = make_authomatic(transport=EchoTransport())
+    credentials = make_credentials(authomatic)
+
+    (index, future), = authomatic.access_many([
+        dict(credentials=credentials, url='https://example.com/',
+             params={'a': 'b'})])
+
+    assert future.result().content == 'https://example.com/?a=b Bearer token'
+
+
+def test_access_many_shares_credentials_in_flight(make_authomatic,
+                                                   make_credentials):
+    authomatic = make_authomatic(transport=EchoTransport())
+    serialized = make_credentials(authomatic).serialize()
+    calls = count_deserializations(authomatic)
+
+    requests = [(serialized, 'https://example.com/')] * 5
+    list(authomatic.access_many(requests, concurrency=5))
+
+    assert len(calls) == 1
+
+
+def test_access_many_forgets_completed_credentials(make_authomatic,
+                                                    make_credentials):
+    authomatic = make_authomatic(transport=EchoTransport())
+    serialized = make_credentials(authomatic).serialize()
+    calls = count_deserializations(authomatic)
+
+    requests = [(serialized, 'https://example.com/')] * 3
+    list(authomatic.access_many(requests, concurrency=1))
+
+    assert len(calls) == 3
+
+
+def test_access_many_reports_errors(make_authomatic, make_credentials):
+    authomatic = make_authomatic(transport=EchoTransport())
+    credentials = make_credentials(authomatic)
+
+    results = dict(authomatic.access_many([
+        ('invalid', 'https://example.com/'),
+        (credentials, 'https://example.com/'),
+    ]))
+
+    assert results[0].exception() is not None
+    assert results[1].result().status == 200
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from concurrent import futures
+import json
+import threading
+import time
+
+import pytest
+
+from authomatic import aio
+from authomatic.exceptions import CredentialsError
+from authomatic.six.moves import http_client
+
+from tests.unit_tests.conftest import Local
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_streams_transport_keeps_connection_alive(server):
+    server.respond('/', 200, body=b'foo')
+    transport = aio.StreamsTransport()
+
+    async def fetch_twice():
+        first = await transport.request('GET', server.url('/'))
+        second = await transport.request('GET', server.url('/'))
+        return first.read(), second.read()
+
+    assert run(fetch_twice()) == (b'foo', b'foo')
+    stats = transport.pool.stats
+    assert (stats['misses'], stats['hits']) == (1, 1)
+
+
+def test_streams_transport_reads_chunked_body(server):
+    server.respond('/', 200, {'Transfer-Encoding': 'chunked'},
+                   b'3\r\nfoo\r\n4\r\n bar\r\n0\r\n\r\n')
+    transport = aio.StreamsTransport()
+
+    response = run(transport.request('GET', server.url('/')))
+
+    assert response.read() == b'foo bar'
+
+
+@pytest.mark.parametrize('name, value', [
+    ('X-Foo', 'bar\r\nX-Injected: baz'),
+    ('X-Foo', 'bar\nbaz'),
+    ('X-Foo\r\nX-Injected', 'baz'),
+    ('X-Foo:', 'bar'),
+    ('', 'bar'),
+])
+def test_streams_transport_rejects_invalid_headers(server, name, value):
+    transport = aio.StreamsTransport()
+
+    with pytest.raises(ValueError):
+        run(transport.request('GET', server.url('/'), headers={name: value}))
+
+    assert server.requests == []
+
+
+@pytest.mark.parametrize('method, path', [
+    ('GET', '/foo HTTP/1.1\r\nX-Injected: bar'),
+    ('GET', '/foo bar'),
+    ('GET\r\n', '/'),
+])
+def test_streams_transport_rejects_invalid_request_line(method, path):
+    with pytest.raises((ValueError, http_client.InvalidURL)):
+        aio.StreamsTransport._head(method, 'example.com', path, b'', {})
+
+
+def test_streams_transport_allows_folded_header_values():
+    head = aio.StreamsTransport._head('GET', 'example.com', '/', b'',
+                                      {'X-Foo': 'bar\r\n baz'})
+
+    assert b'X-Foo: bar\r\n baz\r\n' in head
+
+
+def test_streams_transport_host_without_user_info(server):
+    server.respond('/', 200, body=b'foo')
+    transport = aio.StreamsTransport()
+    url = server.url('/').replace('://', '://user:secret@')
+
+    run(transport.request('GET', url))
+
+    assert server.requests[0].headers['Host'] == server.host
+
+
+def test_pool_drops_connections_of_closed_loops(server):
+    server.respond('/', 200, body=b'foo')
+    transport = aio.StreamsTransport()
+
+    run(transport.request('GET', server.url('/')))
+    run(transport.request('GET', server.url('/')))
+
+    stats = transport.pool.stats
+    assert stats['misses'] == 2
+    assert stats['idle'] == 1
+
+
+def test_access_async(server, make_authomatic, make_credentials):
+    server.respond('/foo', 200, {'Content-Type': 'application/json'},
+                   b'{"foo": "bar"}')
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+
+    response = run(authomatic.access_async(credentials.serialize(),
+                                           server.url('/foo'),
+                                           params={'a': 'b'}))
+
+    assert response.status == 200
+    assert response.data == {'foo': 'bar'}
+    request = server.requests[0]
+    assert request.path == '/foo?a=b'
+    assert request.headers['Authorization'] == 'Bearer token'
+
+
+def test_access_async_without_credentials(make_authomatic):
+    authomatic = make_authomatic()
+    provider = authomatic.registry.provider_class('local')(authomatic, None,
+                                                          'local')
+    provider.credentials = None
+
+    with pytest.raises(CredentialsError):
+        run(provider.access_async('https://example.com'))
+
+
+def test_refresh_async(server, make_authomatic, make_credentials):
+    server.respond('/token', 200, {'Content-Type': 'application/json'},
+                   json.dumps({'access_token': 'new',
+                               'expires_in': 7200}).encode())
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+
+    response = run(credentials.refresh_async(force=True))
+
+    assert response.status == 200
+    assert credentials.token == 'new'
+    assert credentials.refresh_token == 'refresh'
+    request = server.requests[0]
+    assert request.method == 'POST'
+    assert b'grant_type=refresh_token' in request.body
+
+
+def slow_token(request):
+    time.sleep(0.3)
+    return 200, {'Content-Type': 'application/json'}, \
+        json.dumps({'access_token': 'new', 'expires_in': 7200}).encode()
+
+
+def test_concurrent_refresh_async_is_coalesced(server, make_authomatic,
+                                               make_credentials):
+    server.respond('/token', slow_token)
+    authomatic = make_authomatic()
+    first = make_credentials(authomatic)
+    second = make_credentials(authomatic)
+
+    async def refresh_both():
+        return await asyncio.gather(first.refresh_async(force=True),
+                                    second.refresh_async(force=True))
+
+    responses = run(refresh_both())
+
+    assert len(server.requests) == 1
+    assert [i.status for i in responses] == [200, 200]
+    assert first.token == second.token == 'new'
+
+
+def test_refresh_async_failure_is_shared(server, make_authomatic,
+                                       make_credentials):
+    def token(request):
+        time.sleep(0.2)
+        return 500, {}, b'Error'
+
+    server.respond('/token', token)
+    authomatic = make_authomatic()
+    first = make_credentials(authomatic)
+    second = make_credentials(authomatic)
+
+    async def refresh_both():
+        return await asyncio.gather(first.refresh_async(force=True),
+                                    second.refresh_async(force=True))
+
+    first_response, second_response = run(refresh_both())
+
+    assert len(server.requests) == 1
+    assert first_response.status == 500
+    assert second_response is first_response
+    assert first.token == second.token == 'token'
+
+
+def test_cancelled_follower_does_not_cancel_refresh(server, make_authomatic,
+                                                    make_credentials):
+    server.respond('/token', slow_token)
+    authomatic = make_authomatic()
+    first = make_credentials(authomatic)
+    second = make_credentials(authomatic)
+
+    async def refresh_both():
+        leader = asyncio.ensure_future(first.refresh_async(force=True))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(second.refresh_async(force=True))
+        await asyncio.sleep(0.05)
+        follower.cancel()
+        return await leader
+
+    response = run(refresh_both())
+
+    assert response.status == 200
+    assert first.token == 'new'
+    assert second.token == 'token'
+
+
+def test_refresh_async_does_not_use_the_executor(server, make_authomatic,
+                                                 make_credentials):
+    server.respond('/token', slow_token)
+    executor = futures.ThreadPoolExecutor(1)
+    release = threading.Event()
+    executor.submit(release.wait, 5)
+    authomatic = make_authomatic(executor=executor)
+    credentials = [make_credentials(authomatic, refresh_token=str(i))
+                   for i in range(5)]
+
+    async def refresh_all():
+        return await asyncio.gather(*[i.refresh_async(force=True)
+                                      for i in credentials])
+
+    try:
+        responses = run(refresh_all())
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert [i.status for i in responses] == [200] * 5
+    assert len(server.requests) == 5
+
+
+def test_refresh_async_does_nothing_if_not_expiring(server, make_authomatic,
+                                                    make_credentials):
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic, expire_in=3 * 86400)
+
+    assert run(credentials.refresh_async()) is None
+    assert server.requests == []
+
+
+def test_update_user_async(server, make_authomatic, make_credentials):
+    server.respond('/me', 200, {'Content-Type': 'application/json'},
+                   b'{"id": 123, "name": "Foo"}')
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+    provider = credentials.provider_class(authomatic, None, 'local')
+    provider.credentials = credentials
+    provider.user = provider._update_or_create_user({},
+                                                    credentials=credentials)
+
+    response = run(provider.user.update_async())
+
+    assert response.user.id == '123'
+    assert response.user.name == 'Foo'
+
+
+class CustomUserInfo(Local):
+    def _access_user_info(self):
+        return self.access(self.user_info_url)
+
+
+PROVIDER_ID_MAP = [CustomUserInfo]
+
+
+def test_update_user_async_custom_uses_the_executor(server, make_authomatic,
+                                                    make_credentials):
+    server.respond('/me', 200, {'Content-Type': 'application/json'},
+                   b'{"id": 123}')
+    submitted = []
+
+    class Executor(futures.ThreadPoolExecutor):
+        def submit(self, func, *args, **kwargs):
+            submitted.append(func)
+            return super(Executor, self).submit(func, *args, **kwargs)
+
+    executor = Executor(1)
+    authomatic = make_authomatic(executor=executor)
+    credentials = make_credentials(authomatic)
+    provider = CustomUserInfo(authomatic, None, 'local')
+    provider.credentials = credentials
+    provider.user = provider._update_or_create_user({},
+                                                    credentials=credentials)
+
+    response = run(provider.user.update_async())
+    executor.shutdown()
+
+    assert response.user.id == '123'
+    assert submitted == [provider._access_user_info]
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from authomatic import cache
+from authomatic.cache import (CacheEntry, MemoryCache, SQLiteCache,
+                              cache_key)
+from authomatic.ratelimit import RateLimitTracker
+from authomatic.transports import BufferedResponse
+
+
+def entry(body=b'body', expires=None, headers=None):
+    if expires is None:
+        expires = time.time() + 60
+    return CacheEntry(200, 'OK', headers or [('ETag', '"1"')], body, expires)
+
+
+def test_cache_key():
+    assert cache_key('http://A.com/?b=2&a=1&oauth_nonce=x') == \
+        cache_key('http://a.com/?a=1&b=2&oauth_nonce=y')
+    assert cache_key('http://a.com/', 'alice') != \
+        cache_key('http://a.com/', 'bob')
+
+
+@pytest.mark.parametrize('headers, fresh_for', [
+    ([('Cache-Control', 'max-age=60')], 60),
+    ([('Cache-Control', 'max-age=60'), ('Age', '20')], 40),
+    ([('Date', 'Thu, 01 Jan 2015 00:00:00 GMT'),
+      ('Expires', 'Thu, 01 Jan 2015 00:01:40 GMT')], 100),
+])
+def test_freshness(headers, fresh_for):
+    now = 1000000
+    response = BufferedResponse(200, 'OK', headers, b'')
+
+    e = CacheEntry.from_response(response, b'', now)
+
+    assert e.expires == now + fresh_for
+
+
+@pytest.mark.parametrize('status, headers', [
+    (200, [('Cache-Control', 'no-store, max-age=60')]),
+    (200, [('Cache-Control', 'max-age=60'), ('Vary', 'Accept')]),
+    # Stale and can't be revalidated.
+    (200, [('Cache-Control', 'no-cache')]),
+    (404, [('Cache-Control', 'max-age=60')]),
+])
+def test_not_stored(status, headers):
+    response = BufferedResponse(status, 'OK', headers, b'')
+    assert CacheEntry.from_response(response, b'') is None
+
+
+def test_revalidated():
+    stale = CacheEntry(200, 'OK', [('ETag', '"1"'),
+                                   ('Last-Modified', 'yesterday'),
+                                   ('Cache-Control', 'no-cache')],
+                       b'body', 0)
+    assert stale.validators() == {'If-None-Match': '"1"',
+                                  'If-Modified-Since': 'yesterday'}
+
+    not_modified = BufferedResponse(304, 'Not Modified',
+                                    [('Cache-Control', 'max-age=60'),
+                                     ('Content-Length', '0')], b'')
+    fresh = stale.revalidated(not_modified)
+
+    assert fresh.body == b'body'
+    assert fresh.is_fresh()
+    assert fresh.getheader('ETag') == '"1"'
+    assert fresh.getheader('Content-Length') is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(max_bytes=3 * entry(b'x').size)
+    for key in 'abc':
+        memory.set(key, entry(b'x'))
+    memory.get('a')
+    memory.set('d', entry(b'x'))
+
+    assert memory.get('b') is None
+    assert memory.get('a') is not None
+    assert len(memory) == 3
+    assert memory.size == 3 * entry(b'x').size
+
+
+@pytest.fixture
+def sqlite_cache(tmpdir):
+    sqlite_cache = SQLiteCache(str(tmpdir.join('cache.db')), max_entries=3)
+    yield sqlite_cache
+    sqlite_cache.close()
+
+
+def test_sqlite_cache(sqlite_cache):
+    sqlite_cache.set('a', entry(b'\x00\xff', headers=[('X-Foo', 'foo')]))
+
+    e = sqlite_cache.get('a')
+    assert e.body == b'\x00\xff'
+    assert e.headers == [('X-Foo', 'foo')]
+    assert e.is_fresh()
+
+    sqlite_cache.delete('a')
+    assert sqlite_cache.get('a') is None
+
+
+def test_sqlite_cache_evicts_least_recently_used(sqlite_cache):
+    for key in 'abc':
+        sqlite_cache.set(key, entry())
+        time.sleep(0.01)
+    sqlite_cache.get('a')
+    sqlite_cache.set('d', entry())
+
+    assert len(sqlite_cache) == 3
+    assert sqlite_cache.get('b') is None
+    assert sqlite_cache.get('a') is not None
+
+
+def test_sqlite_cache_evicts_stale_first(sqlite_cache):
+    sqlite_cache.set('a', entry())
+    sqlite_cache.set('b', entry(expires=time.time() - 1))
+    sqlite_cache.set('c', entry())
+    sqlite_cache.get('b')
+    sqlite_cache.set('d', entry())
+
+    assert sqlite_cache.get('b') is None
+    assert sqlite_cache.get('a') is not None
+
+
+def test_store_doesnt_cache_big_bodies():
+    memory = MemoryCache()
+    response = BufferedResponse(200, 'OK', [('Cache-Control', 'max-age=60')],
+                                b'x' * 11)
+
+    stored = cache.store(memory, 'key', response, max_entry_size=10)
+
+    assert stored.read() == b'x' * 11
+    assert memory.get('key') is None
+
+
+@pytest.fixture
+def access(make_authomatic, make_credentials):
+    authomatic = make_authomatic(cache=MemoryCache())
+    credentials = make_credentials(authomatic)
+
+    def access(path, **kwargs):
+        return authomatic.access(credentials, path, **kwargs)
+
+    return access
+
+
+def test_fresh_response_is_served_from_cache(server, access):
+    server.respond('/', 200, {'Cache-Control': 'max-age=60'}, b'body')
+
+    assert access(server.url('/')).content == 'body'
+    assert access(server.url('/')).content == 'body'
+    assert len(server.requests) == 1
+
+    access(server.url('/'), method='POST')
+    assert len(server.requests) == 2
+
+
+def test_stale_response_is_revalidated(server, access):
+    def respond(request):
+        if request.headers.get('If-None-Match') == '"1"':
+            return 304, {'ETag': '"1"'}, b''
+        return 200, {'ETag': '"1"', 'Cache-Control': 'no-cache'}, b'body'
+    server.respond('/', respond)
+
+    first = access(server.url('/'))
+    second = access(server.url('/'))
+
+    assert first.content == second.content == 'body'
+    assert second.status == 200
+    assert len(server.requests) == 2
+    assert server.requests[1].headers['If-None-Match'] == '"1"'
+
+
+def test_fresh_response_leaves_rate_limit_unchanged(server, make_authomatic,
+                                                    make_credentials):
+    server.respond('/cached', 200, {'Cache-Control': 'max-age=60',
+                                    'X-RateLimit-Limit': '100',
+                                    'X-RateLimit-Remaining': '10'}, b'body')
+    server.respond('/other', 200, {'X-RateLimit-Limit': '100',
+                                   'X-RateLimit-Remaining': '0',
+                                   'X-RateLimit-Reset': '600'}, b'body')
+    authomatic = make_authomatic(cache=MemoryCache(),
+                                 rate_limits=RateLimitTracker())
+    credentials = make_credentials(authomatic)
+    authomatic.access(credentials, server.url('/cached'))
+    authomatic.access(credentials, server.url('/other'))
+    before = authomatic.rate_limit(credentials)['token'].to_dict()
+
+    response = authomatic.access(credentials, server.url('/cached'))
+
+    assert response.from_cache
+    assert response.content == 'body'
+    assert len(server.requests) == 2
+    # Neither taken from the exhausted budget nor reset to the stale one.
+    assert authomatic.rate_limit(credentials)['token'].to_dict() == before
+    assert before['remaining'] == 0
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from authomatic import core
+from authomatic.core import (Response, get_content_parser, json_parser,
+                             json_qs_parser, qs_parser, xml_parser)
+from authomatic.transports import BufferedResponse
+
+
+def response(content_type, body, **kwargs):
+    headers = [('Content-Type', content_type)] if content_type else []
+    return Response(BufferedResponse(200, 'OK', headers, body), **kwargs)
+
+
+@pytest.mark.parametrize('content_type, parser', [
+    ('application/json', json_parser),
+    ('Application/JSON; charset=utf-8', json_parser),
+    ('application/vnd.github.v3+json', json_parser),
+    ('text/xml', xml_parser),
+    ('application/atom+xml', xml_parser),
+    ('application/x-www-form-urlencoded', qs_parser),
+    ('text/html', None),
+    ('', None),
+    (None, None),
+])
+def test_get_content_parser(content_type, parser):
+    assert get_content_parser(content_type) is parser
+
+
+def test_provider_parsers_take_precedence():
+    parsers = {'text/html': qs_parser, 'application/json': xml_parser}
+
+    assert get_content_parser('text/html', parsers) is qs_parser
+    assert get_content_parser('application/json', parsers) is xml_parser
+
+
+def test_register_content_parser(monkeypatch):
+    monkeypatch.setattr(core, 'CONTENT_PARSERS', dict(core.CONTENT_PARSERS))
+    parser = lambda content: {'custom': content}
+
+    core.register_content_parser('Text/Custom', parser)
+
+    assert response('text/custom', b'foo').data == {'custom': 'foo'}
+
+
+def test_data_by_content_type():
+    assert response('application/json', b'{"a": 1}').data == {'a': 1}
+    assert response('application/x-www-form-urlencoded',
+                    b'a=1&b=2').data == {'a': '1', 'b': '2'}
+    assert response('text/xml', b'<a>1</a>').data.text == '1'
+
+
+def test_mislabeled_content_falls_back_to_guessing():
+    assert response('application/json', b'a=1').data == {'a': '1'}
+
+
+def test_unknown_content_type_is_guessed():
+    assert response(None, b'{"a": 1}').data == {'a': 1}
+    assert response('text/plain', b'a=1').data == {'a': '1'}
+    assert json_qs_parser('<a>1</a>').tag == 'a'
+
+
+def test_explicit_parser_doesnt_fall_back():
+    with pytest.raises(ValueError):
+        response('text/plain', b'a=1', content_parser=json_parser).data
+
+
+def test_provider_content_parsers_from_config(server, make_authomatic,
+                                              make_credentials):
+    server.respond('/', 200, {'Content-Type': 'text/html'}, b'a=1')
+    authomatic = make_authomatic(settings={'content_parsers': {
+        'text/html': lambda content: {'html': content}}})
+    credentials = make_credentials(authomatic)
+
+    assert authomatic.access(credentials, server.url('/')).data == \
+        {'html': 'a=1'}
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from authomatic import core
+from authomatic.core import Future, futures
+
+
+def test_future_runs_in_default_executor():
+    assert Future(lambda a, b=0: a + b, 1, b=2).get_result(5) == 3
+    assert core._get_default_executor() is core._get_default_executor()
+    assert core._get_default_executor()._max_workers == \
+        core.DEFAULT_MAX_WORKERS
+
+
+def test_get_result_reraises_exception():
+    def fail():
+        raise ValueError('foo')
+
+    with pytest.raises(ValueError):
+        Future(fail).get_result(5)
+
+
+def test_future_works_with_concurrent_futures():
+    executor = futures.ThreadPoolExecutor(2)
+    fs = [Future.submit(executor, lambda i=i: i * 2) for i in range(5)]
+
+    done, _ = futures.wait(fs, timeout=5)
+
+    assert sorted(f.result() for f in done) == [0, 2, 4, 6, 8]
+
+
+def test_cancelled_future_doesnt_run():
+    executor = futures.ThreadPoolExecutor(1)
+    release = threading.Event()
+    calls = []
+
+    blocker = Future.submit(executor, release.wait)
+    future = Future.submit(executor, calls.append, 'foo')
+    assert future.cancel()
+    release.set()
+
+    blocker.get_result(5)
+    executor.shutdown(wait=True)
+    assert calls == []
+    assert future.cancelled()
+
+
+def test_async_access_uses_executor_of_authomatic(make_authomatic,
+                                                   make_credentials, server):
+    server.respond('/foo', 200, body=b'foo')
+    executor = futures.ThreadPoolExecutor(1)
+    submitted = []
+    submit = executor.submit
+    executor.submit = lambda *args: submitted.append(args) or submit(*args)
+
+    authomatic = make_authomatic(executor=executor)
+    # Won't be refreshed.
+    credentials = make_credentials(authomatic, expire_in=3 * 86400)
+
+    response = authomatic.async_access(credentials,
+                                       server.url('/foo')).get_result(5)
+    assert response.content == 'foo'
+
+    response = credentials.async_refresh().get_result(5)
+    assert response is None
+    assert len(submitted) == 2
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import ssl
+import sys
+
+import pytest
+
+from authomatic.exceptions import ConfigError
+from authomatic.transports import (
+    HTTP2Transport,
+    HTTPClientTransport,
+    HTTPXResponse,
+)
+
+
+class FakeHeaders(object):
+
+    def __init__(self, items):
+        self.items = items
+
+    def multi_items(self):
+        return list(self.items)
+
+    def get_list(self, name):
+        return [v for k, v in self.items if k.lower() == name.lower()]
+
+
+class FakeHTTPXResponse(object):
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.headers = FakeHeaders([('X-Foo', 'a'), ('X-Foo', 'b')])
+        self.http_version = 'HTTP/2'
+        self.status_code = 200
+        self.reason_phrase = 'OK'
+        self.closed = False
+
+    def iter_raw(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+def test_httpx_response():
+    fake = FakeHTTPXResponse([b'abc', b'def', b'g'])
+    response = HTTPXResponse(fake)
+
+    assert (response.status, response.version) == (200, 20)
+    assert response.getheader('x-foo') == 'a, b'
+    assert response.read(4) == b'abcd'
+    buffer_ = bytearray(2)
+    assert response.readinto(buffer_) == 2
+    assert buffer_ == b'ef'
+    assert not response.isclosed()
+    assert response.read() == b'g'
+    assert response.isclosed()
+
+    response.close()
+    assert fake.closed
+
+
+def test_falls_back_without_httpx(server, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'httpx', None)
+    server.respond('/', 200, body=b'foo')
+
+    transport = HTTP2Transport()
+
+    assert transport.client is None
+    assert transport.preconnect(server.url('/'))
+    assert transport.request('GET', server.url('/')).read() == b'foo'
+
+
+def test_httpx_transport(server):
+    pytest.importorskip('httpx')
+    server.respond('/', 200, {'X-Foo': 'bar'}, b'foo')
+    transport = HTTP2Transport()
+
+    response = transport.request('POST', server.url('/'), 'body', timeout=5)
+
+    assert response.read() == b'foo'
+    assert response.getheader('X-Foo') == 'bar'
+    assert server.requests[0].body == b'body'
+    transport.close()
+
+
+def test_fallback_uses_ssl_context(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'httpx', None)
+    context = ssl.create_default_context()
+
+    transport = HTTP2Transport(ssl_context=context)
+
+    assert transport.ssl_context is context
+    assert transport.fallback.pool.ssl_context is context
+
+
+def test_ssl_context_of_transport(make_authomatic, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'httpx', None)
+    context = ssl.create_default_context()
+
+    with pytest.raises(ConfigError):
+        make_authomatic(ssl_context=context, transport=HTTP2Transport())
+    with pytest.raises(ConfigError):
+        make_authomatic(ssl_context=context, transport=HTTPClientTransport())
+
+    transport = HTTP2Transport(ssl_context=context)
+    authomatic = make_authomatic(ssl_context=context, transport=transport)
+    assert authomatic.transport is transport
+    assert authomatic.ssl_context is context
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from authomatic import jsoncodec
+from authomatic.exceptions import ConfigError
+from authomatic.jsoncodec import (JSONCodec, OrjsonCodec, UjsonCodec,
+                                  escape_script, get_codec, register_encoder)
+
+
+def available_codecs():
+    codecs = []
+    for cls in (JSONCodec, OrjsonCodec, UjsonCodec):
+        try:
+            codecs.append(cls())
+        except ImportError:
+            pass
+    return codecs
+
+
+class Point(object):
+
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class WithToDict(object):
+
+    def to_dict(self):
+        return {'foo': 'bar'}
+
+
+OBJ = {'a': [1, 2.5, None, True], 'b': {'c': u'č'}}
+
+
+@pytest.fixture(params=available_codecs(), ids=lambda codec: codec.name)
+def codec(request):
+    return request.param
+
+
+def test_round_trip(codec):
+    assert codec.loads(codec.dumps(OBJ)) == OBJ
+    assert codec.loads(b'{"a": 1}') == {'a': 1}
+
+
+def test_invalid_json_raises_value_error(codec):
+    with pytest.raises(ValueError):
+        codec.loads('{')
+
+
+@pytest.mark.parametrize('indent', [None, 0, 2, 4])
+def test_indentation_matches_json(codec, indent):
+    def normalize(s):
+        return s.replace(', ', ',').replace(': ', ':')
+
+    # The codecs may differ in insignificant whitespace.
+    obj = {'a': [1, 2.5, None, True], 'b': {'c': 'd'}}
+    assert normalize(codec.dumps(obj, indent=indent)) == \
+        normalize(json.dumps(obj, indent=indent))
+
+
+def test_encoders(codec, monkeypatch):
+    monkeypatch.setattr(jsoncodec, '_encoders', dict(jsoncodec._encoders))
+    monkeypatch.setattr(jsoncodec, '_encoders_by_type', {})
+    register_encoder(Point, lambda p: [p.x, p.y])
+
+    assert codec.loads(codec.dumps({'p': Point(1, 2),
+                                    'd': WithToDict(),
+                                    'o': object()})) == \
+        {'p': [1, 2], 'd': {'foo': 'bar'}, 'o': ''}
+
+
+def test_escape_script():
+    assert escape_script(u'"</script> "') == u'"<\\/script>\\u2028"'
+    assert json.loads(escape_script(json.dumps(u'</ '))) == u'</ '
+
+
+def test_get_codec():
+    codec = JSONCodec()
+
+    assert get_codec(codec) is codec
+    assert get_codec('json').name == 'json'
+    assert get_codec() is get_codec()
+    names = [c.name for c in available_codecs()]
+    fastest = [name for name, _ in jsoncodec.CODECS if name in names][0]
+    assert get_codec().name == fastest
+    with pytest.raises(ConfigError):
+        get_codec('foo')
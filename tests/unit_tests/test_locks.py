@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from authomatic.exceptions import LockError
+from authomatic.locks import (FileLockBackend, LocalLockClient,
+                              NetworkLockBackend)
+
+
+TOKEN_BODY = json.dumps({'access_token': 'new', 'token_type': 'Bearer',
+                         'expires_in': 3600}).encode('utf-8')
+
+needs_fcntl = pytest.mark.skipif(sys.platform == 'win32',
+                                 reason='Requires the fcntl module.')
+
+
+class RecordingBackend(NetworkLockBackend):
+    """Records the calls of the lock backend."""
+
+    def __init__(self):
+        super(RecordingBackend, self).__init__(LocalLockClient(), timeout=1)
+        self.calls = []
+
+    def acquire(self, key):
+        self.calls.append('acquire')
+        return super(RecordingBackend, self).acquire(key)
+
+    def release(self, handle):
+        self.calls.append('release')
+        super(RecordingBackend, self).release(handle)
+
+    def read(self, handle):
+        self.calls.append('read')
+        return super(RecordingBackend, self).read(handle)
+
+    def write(self, handle, record):
+        self.calls.append('write')
+        super(RecordingBackend, self).write(handle, record)
+
+
+def run(coroutine):
+    import asyncio
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def refresh(credentials, use_async):
+    if use_async:
+        return run(credentials.refresh_async(force=True))
+    return credentials.refresh(force=True)
+
+
+@pytest.fixture(params=[False, True], ids=['sync', 'async'])
+def use_async(request):
+    if request.param and sys.version_info < (3, 5):
+        pytest.skip('The asyncio API requires Python 3.5 or newer.')
+    return request.param
+
+
+@pytest.fixture
+def backend():
+    return RecordingBackend()
+
+
+def lock_key(credentials):
+    return '{0}:{1}'.format(*credentials._refresh_key())
+
+
+def test_refresh_writes_the_record(server, make_authomatic, make_credentials,
+                                   backend, use_async):
+    server.respond('/token', 200, {'Content-Type': 'application/json'},
+                   TOKEN_BODY)
+    authomatic = make_authomatic(refresh_lock=backend)
+    credentials = make_credentials(authomatic)
+    key = lock_key(credentials)
+
+    response = refresh(credentials, use_async)
+
+    assert response.status == 200
+    assert credentials.token == 'new'
+    assert backend.calls == ['acquire', 'read', 'write', 'release']
+    handle = backend.acquire(key)
+    record = backend.read(handle)
+    assert record['token'] == 'new'
+    assert record['expiration_time'] == credentials.expiration_time
+    # The provider didn't rotate the refresh token.
+    assert record['refresh_token'] is None
+
+
+def test_refresh_adopts_the_record(server, make_authomatic, make_credentials,
+                                   backend, use_async):
+    authomatic = make_authomatic(refresh_lock=backend)
+    credentials = make_credentials(authomatic)
+    expiration_time = int(time.time()) + 3600
+    handle = backend.acquire(lock_key(credentials))
+    backend.write(handle, dict(token='other', refresh_token='rotated',
+                               token_type='Bearer',
+                               expiration_time=expiration_time,
+                               refreshed=int(time.time())))
+    backend.release(handle)
+    del backend.calls[:]
+
+    response = refresh(credentials, use_async)
+
+    assert server.requests == []
+    assert backend.calls == ['acquire', 'read', 'release']
+    assert response.status == 200
+    assert response.data['access_token'] == 'other'
+    assert credentials.token == 'other'
+    assert credentials.refresh_token == 'rotated'
+    assert credentials.expiration_time == expiration_time
+
+
+def test_refresh_ignores_expired_record(server, make_authomatic,
+                                        make_credentials, backend):
+    server.respond('/token', 200, {'Content-Type': 'application/json'},
+                   TOKEN_BODY)
+    authomatic = make_authomatic(refresh_lock=backend)
+    credentials = make_credentials(authomatic)
+    handle = backend.acquire(lock_key(credentials))
+    backend.write(handle, dict(token='other',
+                               expiration_time=int(time.time()) - 1))
+    backend.release(handle)
+
+    credentials.refresh(force=True)
+
+    assert len(server.requests) == 1
+    assert credentials.token == 'new'
+
+
+def test_refresh_lock_timeout(server, make_authomatic, make_credentials,
+                              backend):
+    authomatic = make_authomatic(refresh_lock=backend)
+    credentials = make_credentials(authomatic)
+    backend.timeout = 0.1
+    backend.acquire(lock_key(credentials))
+
+    with pytest.raises(LockError):
+        credentials.refresh(force=True)
+
+    assert server.requests == []
+
+
+@pytest.fixture
+def lock_directory(tmp_path):
+    return str(tmp_path / 'locks')
+
+
+@needs_fcntl
+def test_file_lock_record(lock_directory):
+    backend = FileLockBackend(lock_directory)
+
+    handle = backend.acquire('key')
+    assert backend.read(handle) is None
+    backend.write(handle, {'token': 'new'})
+    backend.release(handle)
+
+    handle = backend.acquire('key')
+    assert backend.read(handle)['token'] == 'new'
+    backend.release(handle)
+    assert os.stat(lock_directory).st_mode & 0o777 == 0o700
+
+
+@needs_fcntl
+def test_file_lock_is_exclusive(lock_directory):
+    backend = FileLockBackend(lock_directory, timeout=0.1)
+    handle = backend.acquire('key')
+
+    with pytest.raises(LockError):
+        backend.acquire('key')
+
+    backend.release(handle)
+    backend.release(backend.acquire('key'))
+
+
+@needs_fcntl
+def test_file_lock_waits_for_release(lock_directory):
+    backend = FileLockBackend(lock_directory, timeout=5)
+    handle = backend.acquire('key')
+    timer = threading.Timer(0.2, backend.release, [handle])
+    timer.start()
+
+    start = time.time()
+    backend.release(backend.acquire('key'))
+
+    assert time.time() - start >= 0.15
+
+
+@needs_fcntl
+def test_file_lock_records_of_other_keys(lock_directory):
+    # All keys share the single lock file.
+    backend = FileLockBackend(lock_directory, stripes=1)
+
+    handle = backend.acquire('key')
+    backend.write(handle, {'token': 'new'})
+    backend.release(handle)
+
+    handle = backend.acquire('other')
+    assert backend.read(handle) is None
+    backend.release(handle)
+
+
+@needs_fcntl
+def test_file_lock_expired_records_are_removed(lock_directory):
+    backend = FileLockBackend(lock_directory, stripes=1, record_ttl=-1)
+
+    handle = backend.acquire('key')
+    backend.write(handle, {'token': 'new'})
+    assert backend.read(handle) is None
+    backend.release(handle)
+
+    path = os.path.join(lock_directory, '0.lock')
+    assert os.path.getsize(path) == 0
+
+
+@needs_fcntl
+def test_file_lock_purge(lock_directory):
+    backend = FileLockBackend(lock_directory, stripes=4, record_ttl=0.1)
+    for key in ('a', 'b', 'c'):
+        handle = backend.acquire(key)
+        backend.write(handle, {'token': key})
+        backend.release(handle)
+    time.sleep(0.15)
+
+    backend.purge()
+
+    for name in os.listdir(lock_directory):
+        assert os.path.getsize(os.path.join(lock_directory, name)) == 0
+
+
+@needs_fcntl
+def test_file_lock_rejects_insecure_directory(lock_directory):
+    os.makedirs(lock_directory)
+    os.chmod(lock_directory, 0o755)
+
+    with pytest.raises(LockError):
+        FileLockBackend(lock_directory).acquire('key')
+
+
+@needs_fcntl
+def test_file_lock_rejects_symbolic_link(lock_directory, tmp_path):
+    backend = FileLockBackend(lock_directory, stripes=1)
+    backend.release(backend.acquire('key'))
+    path = os.path.join(lock_directory, '0.lock')
+    os.remove(path)
+    os.symlink(str(tmp_path / 'target'), path)
+
+    with pytest.raises(LockError):
+        backend.acquire('key')
+
+
+def test_network_lock_record():
+    backend = NetworkLockBackend(LocalLockClient())
+
+    handle = backend.acquire('key')
+    assert backend.read(handle) is None
+    backend.write(handle, {'token': 'new'})
+    backend.release(handle)
+
+    handle = backend.acquire('key')
+    assert backend.read(handle) == {'token': 'new'}
+    backend.release(handle)
+
+
+def test_network_lock_timeout():
+    backend = NetworkLockBackend(LocalLockClient(), timeout=0.1)
+    backend.acquire('key')
+
+    with pytest.raises(LockError):
+        backend.acquire('key')
+
+    # Other keys are not affected.
+    backend.release(backend.acquire('other'))
+
+
+def test_network_lock_expires():
+    backend = NetworkLockBackend(LocalLockClient(), ttl=0.1, timeout=1)
+    backend.acquire('key')
+
+    start = time.time()
+    backend.release(backend.acquire('key'))
+
+    assert 0.05 <= time.time() - start < 1
+
+
+def test_local_lock_client():
+    client = LocalLockClient()
+
+    assert client.acquire('lock', 'a', 60)
+    assert not client.acquire('lock', 'b', 60)
+    # Only the owner can release the lock.
+    client.release('lock', 'b')
+    assert not client.acquire('lock', 'b', 60)
+    client.release('lock', 'a')
+    assert client.acquire('lock', 'b', 60)
+
+    client.set('value', 'foo', 60)
+    client.set('expired', 'bar', -1)
+    assert client.get('value') == 'foo'
+    assert client.get('expired') is None
+    assert client.get('missing') is None
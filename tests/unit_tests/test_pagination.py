@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from authomatic.exceptions import FetchError
+from authomatic.pagination import (CursorPaginator, LinkHeaderPaginator,
+                                   PageTokenPaginator, parse_link_header)
+from authomatic.six.moves.urllib.parse import parse_qs, urlsplit
+
+
+PAGES = [[1, 2], [3, 4], [5]]
+
+
+def page_number(request):
+    query = parse_qs(urlsplit(request.path).query)
+    return int(query.get('page', ['0'])[0])
+
+
+def json_page(data, headers=None):
+    headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    return 200, headers, json.dumps(data).encode('utf-8')
+
+
+@pytest.fixture
+def paginate(make_authomatic, make_credentials):
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic, expire_in=3 * 86400)
+
+    def paginate(url, **kwargs):
+        return authomatic.paginate(credentials, url, **kwargs)
+
+    return paginate
+
+
+@pytest.fixture
+def link_pages(server):
+    def route(request):
+        number = page_number(request)
+        headers = {}
+        if number + 1 < len(PAGES):
+            headers['Link'] = '<{0}>; rel="next"'.format(
+                server.url('/items?page={0}'.format(number + 1)))
+        return json_page(PAGES[number], headers)
+
+    server.respond('/items', route)
+    return server
+
+
+def test_parse_link_header():
+    value = ('<https://example.com/2>; rel="next", '
+             '<https://example.com/9>; rel="last first"')
+
+    assert parse_link_header(value) == {'next': 'https://example.com/2',
+                                        'last': 'https://example.com/9',
+                                        'first': 'https://example.com/9'}
+    assert parse_link_header(None) == {}
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_link_header_pages(paginate, link_pages, prefetch):
+    items = paginate(link_pages.url('/items'),
+                     paginator=LinkHeaderPaginator(), prefetch=prefetch)
+
+    assert list(items) == [1, 2, 3, 4, 5]
+    assert len(link_pages.requests) == 3
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_max_pages(paginate, link_pages, prefetch):
+    items = paginate(link_pages.url('/items'), prefetch=prefetch,
+                     max_pages=2)
+
+    assert list(items) == [1, 2, 3, 4]
+    assert len(link_pages.requests) == 2
+
+
+def test_cursor_pages(paginate, server):
+    def route(request):
+        number = page_number(request)
+        data = {'data': PAGES[number], 'paging': {}}
+        if number + 1 < len(PAGES):
+            data['paging']['next'] = server.url(
+                '/items?page={0}'.format(number + 1))
+        return json_page(data)
+
+    server.respond('/items', route)
+    items = paginate(server.url('/items'), paginator=CursorPaginator())
+
+    assert list(items) == [1, 2, 3, 4, 5]
+
+
+def test_page_token_pages(paginate, server):
+    def route(request):
+        number = page_number(request)
+        data = {'items': PAGES[number]}
+        if number + 1 < len(PAGES):
+            data['nextPageToken'] = str(number + 1)
+        return json_page(data)
+
+    server.respond('/items', route)
+    paginator = PageTokenPaginator(param='page')
+    items = paginate(server.url('/items'), params={'foo': 'bar'},
+                     paginator=paginator)
+
+    assert list(items) == [1, 2, 3, 4, 5]
+    for request in server.requests:
+        assert 'foo=bar' in request.path
+
+
+@pytest.mark.parametrize('prefetch', [0, 1])
+def test_failed_page_raises(paginate, server, prefetch):
+    def route(request):
+        if page_number(request):
+            return 500, {}, b'Error'
+        return json_page([1, 2], {'Link': '<{0}>; rel="next"'.format(
+            server.url('/items?page=1'))})
+
+    server.respond('/items', route)
+    items = paginate(server.url('/items'), prefetch=prefetch)
+
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(FetchError) as excinfo:
+        next(items)
+    assert excinfo.value.status == 500
+
+
+def test_prefetch_is_bounded(paginate, server):
+    def route(request):
+        number = page_number(request)
+        return json_page([number], {'Link': '<{0}>; rel="next"'.format(
+            server.url('/items?page={0}'.format(number + 1)))})
+
+    server.respond('/items', route)
+    items = paginate(server.url('/items'), prefetch=2)
+
+    assert [next(items) for _ in range(3)] == [0, 1, 2]
+    items.close()
+
+    # The consumed pages plus at most prefetch pages ahead.
+    assert len(server.requests) <= 5
+
+
+def test_authomatic_paginate(make_authomatic, make_credentials, link_pages):
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic, expire_in=3 * 86400)
+
+    items = authomatic.paginate(credentials.serialize(),
+                                link_pages.url('/items'))
+
+    assert list(items) == [1, 2, 3, 4, 5]
+    assert link_pages.requests[0].headers['Authorization'] == 'Bearer token'
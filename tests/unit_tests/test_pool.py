@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import threading
+
+import pytest
+
+from authomatic.pool import ConnectionPool
+
+
+def request(pool, server, path='/', method='GET', headers=None):
+    response = pool.request('http', server.host, method, path,
+                            headers=headers)
+    body = response.read()
+    return response, body
+
+
+def test_reuses_connection(server):
+    server.respond('/', 200, body=b'foo')
+    pool = ConnectionPool()
+
+    for _ in range(3):
+        response, body = request(pool, server)
+        assert (response.status, body) == (200, b'foo')
+
+    stats = pool.stats
+    assert stats['misses'] == 1
+    assert stats['hits'] == 2
+    assert stats['idle'] == 1
+
+
+def test_retries_idempotent_request_over_dropped_connection(server):
+    server.respond('/', 200, {'Connection': 'close'}, b'foo')
+    pool = ConnectionPool()
+
+    request(pool, server)
+    response, body = request(pool, server)
+
+    assert body == b'foo'
+    assert pool.stats['idle'] == 0
+
+
+def test_evicts_idle_connections(server):
+    server.respond('/', 200, body=b'foo')
+    pool = ConnectionPool(idle_timeout=-1)
+
+    request(pool, server)
+    request(pool, server)
+
+    stats = pool.stats
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 0
+
+
+def test_drops_connections_after_fork(server):
+    server.respond('/', 200, body=b'foo')
+    pool = ConnectionPool()
+    request(pool, server)
+    assert pool.stats['idle'] == 1
+
+    # Pretend we are in a forked child.
+    pool._pid = -1
+
+    assert pool.stats['idle'] == 0
+    request(pool, server)
+    assert pool.stats['misses'] == 1
+
+
+def test_invalid_request_releases_slot(server):
+    server.respond('/', 200, body=b'foo')
+    pool = ConnectionPool(maxsize=1, block=True)
+
+    with pytest.raises(ValueError):
+        request(pool, server, headers={'X-Foo': 'bar\r\nX-Bar: baz'})
+
+    assert pool._in_use[('http', server.host)] == 0
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(
+        request(pool, server)[1]))
+    thread.daemon = True
+    thread.start()
+    thread.join(5)
+    assert result == [b'foo']
+
+
+def test_blocks_when_full(server):
+    server.respond('/', 200, body=b'foo')
+    pool = ConnectionPool(maxsize=1, block=True)
+
+    # Keep the only connection busy.
+    busy = pool.request('http', server.host, 'GET', '/')
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(
+        request(pool, server)[1]))
+    thread.daemon = True
+    thread.start()
+    thread.join(0.2)
+    assert result == []
+
+    busy.read()
+    thread.join(5)
+    assert result == [b'foo']
+    assert pool.stats['misses'] == 1
+
+
+def test_abandoned_partial_read_frees_the_slot(server):
+    server.respond('/', 200, body=b'x' * 100000)
+    pool = ConnectionPool(maxsize=1, block=True)
+
+    response = pool.request('http', server.host, 'GET', '/')
+    assert response.read(10) == b'x' * 10
+    del response
+    gc.collect()
+
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(request(pool, server)[1]))
+    thread.daemon = True
+    thread.start()
+    thread.join(5)
+
+    assert results == [b'x' * 100000]
+    assert pool.stats['discards'] == 1
+
+
+def test_closed_partial_read_frees_the_slot(server):
+    server.respond('/', 200, body=b'x' * 100000)
+    pool = ConnectionPool(maxsize=1, block=True)
+
+    response = pool.request('http', server.host, 'GET', '/')
+    response.read(10)
+    response.close()
+    del response
+
+    assert request(pool, server)[1] == b'x' * 100000
+    assert pool.stats['discards'] == 1
+
+
+def test_abandoned_streamed_response_frees_the_slot(server, make_authomatic,
+                                                    make_credentials):
+    server.respond('/', 200, body=b'x' * 100000)
+    authomatic = make_authomatic(
+        connection_pool=ConnectionPool(maxsize=1, block=True))
+    credentials = make_credentials(authomatic)
+
+    for _ in range(3):
+        response = authomatic.access(credentials, server.url('/'))
+        assert len(next(response.iter_content(10))) == 10
+        del response
+        gc.collect()
+
+    assert len(server.requests) == 3
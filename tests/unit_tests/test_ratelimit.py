@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from authomatic import Authomatic
+from authomatic.core import Credentials
+from authomatic.exceptions import RateLimitError
+from authomatic.providers import oauth2
+from authomatic.ratelimit import (RateLimit, RateLimitTracker, parse_headers,
+                                  reset_time)
+from authomatic.transports import BufferedResponse
+
+
+class Token(object):
+    token = 'token'
+
+
+def test_parse_headers():
+    response = BufferedResponse(200, 'OK', [('X-RateLimit-Limit', '5000'),
+                                            ('X-RateLimit-Remaining', '4999'),
+                                            ('X-RateLimit-Reset', '60')], b'')
+
+    rate_limit = parse_headers(response)
+
+    assert (rate_limit.limit, rate_limit.remaining) == (5000, 4999)
+    assert 55 < rate_limit.reset - time.time() <= 60
+    assert parse_headers(response, 'RateLimit-') is None
+
+
+def test_reset_time():
+    assert reset_time('10', now=100) == 110
+    assert reset_time('1500000000') == 1500000000
+    assert reset_time('soon') is None
+
+
+def test_keys():
+    keys = RateLimitTracker.keys('fb', Token(), 'APPID')
+
+    assert keys['app'] == ('fb', 'app', 'APPID')
+    assert keys['token'][:2] == ('fb', 'token')
+    assert 'token' not in keys['token'][2]
+    assert 'app' not in RateLimitTracker.keys('fb', Token())
+
+
+def test_tracks_without_enforcing():
+    tracker = RateLimitTracker(enforce=False)
+    keys = RateLimitTracker.keys('fb', Token())
+    tracker.update(keys, {'token': RateLimit(limit=10, remaining=0)})
+
+    assert tracker.acquire(keys) == 0
+    assert tracker.get(keys['token']).remaining == 0
+
+
+def test_rejects_exhausted_budget():
+    tracker = RateLimitTracker(reserve=1)
+    keys = RateLimitTracker.keys('fb', Token())
+    tracker.update(keys, {'token': RateLimit(limit=10, remaining=2)})
+
+    tracker.acquire(keys)
+    with pytest.raises(RateLimitError):
+        tracker.acquire(keys)
+
+
+def test_waits_for_near_reset():
+    tracker = RateLimitTracker(max_delay=10)
+    keys = RateLimitTracker.keys('fb', Token())
+    tracker.update(keys, {'token': RateLimit(limit=10, remaining=0,
+                                             reset=time.time() + 5)})
+
+    assert 4 < tracker.acquire(keys) <= 5
+
+
+def test_new_window_restores_budget():
+    tracker = RateLimitTracker()
+    keys = RateLimitTracker.keys('fb', Token())
+    tracker.update(keys, {'token': RateLimit(limit=10, remaining=0,
+                                             reset=time.time() - 1)})
+
+    assert tracker.acquire(keys) == 0
+    assert tracker.get(keys['token']).remaining == 9
+
+
+@pytest.fixture
+def facebook(server):
+    config = {'fb': {'class_': oauth2.Facebook,
+                     'id': 1,
+                     'consumer_key': 'APPID',
+                     'consumer_secret': 'secret'}}
+    authomatic = Authomatic(config, 'secret',
+                            rate_limits=RateLimitTracker())
+    provider = oauth2.Facebook(authomatic, None, 'fb')
+    credentials = Credentials(config, provider=provider, token='token',
+                              token_type='Bearer', expire_in=3600)
+    server.respond('/me', 200, {'X-App-Usage': '{"call_count": 100}'}, b'')
+    return authomatic, credentials.serialize()
+
+
+def test_app_budget_of_deserialized_credentials(server, facebook):
+    authomatic, serialized = facebook
+    assert authomatic.credentials(serialized).consumer_key == ''
+
+    authomatic.access(serialized, server.url('/me'))
+
+    budgets = authomatic.rate_limit(serialized)
+    assert budgets['app'].remaining == 0
+    with pytest.raises(RateLimitError):
+        authomatic.access(serialized, server.url('/me'))
+    assert len(server.requests) == 1
+
+
+def test_rejected_request_doesnt_use_up_other_budgets():
+    tracker = RateLimitTracker(max_delay=10)
+    keys = RateLimitTracker.keys('fb', Token(), 'APPID')
+    reset = time.time() + 5
+    tracker.update(keys, {'token': RateLimit(limit=10, remaining=5,
+                                             reset=reset),
+                          'app': RateLimit(limit=100, remaining=0)})
+
+    for _ in range(3):
+        with pytest.raises(RateLimitError):
+            tracker.acquire(keys)
+
+    assert tracker.get(keys['token']).remaining == 5
+
+
+@pytest.mark.parametrize('value, remaining', [
+    ('{"call_count": 5, "total_time": 20}', 80),
+    ('{"call_count": 5, "type": "x"}', 95),
+    ('{"call_count": "30"}', 70),
+    ('{"call_count": 120}', 0),
+])
+def test_facebook_app_usage(value, remaining):
+    response = BufferedResponse(200, 'OK', [('X-App-Usage', value)], b'')
+
+    rate_limit = oauth2.Facebook._x_rate_limit_parser(response)['app']
+
+    assert (rate_limit.limit, rate_limit.remaining) == (100, remaining)
+
+
+@pytest.mark.parametrize('value', [
+    None, '', 'not json', '[5]', '{}', '{"type": "x", "list": [1]}',
+])
+def test_facebook_malformed_app_usage(value):
+    headers = [('X-App-Usage', value)] if value is not None else []
+    response = BufferedResponse(200, 'OK', headers, b'')
+
+    assert oauth2.Facebook._x_rate_limit_parser(response) == {}
+
+
+def test_malformed_app_usage_doesnt_break_access(server, facebook):
+    authomatic, serialized = facebook
+    server.respond('/me', 200, {'X-App-Usage': '{"call_count": 5, '
+                                               '"type": "x"}'}, b'')
+
+    response = authomatic.access(serialized, server.url('/me'))
+
+    assert response.status == 200
+    assert authomatic.rate_limit(serialized)['app'].remaining == 95
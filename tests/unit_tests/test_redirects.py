@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from authomatic.core import RedirectCache
+from authomatic.exceptions import FetchError
+
+
+@pytest.fixture
+def access(make_authomatic, make_credentials):
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+
+    def access(url, **kwargs):
+        return authomatic.access(credentials, url, **kwargs)
+
+    access.authomatic = authomatic
+    return access
+
+
+def paths(server):
+    return [(r.method, r.path) for r in server.requests]
+
+
+@pytest.mark.parametrize('status, method, expected', [
+    (301, 'POST', 'GET'),
+    (302, 'POST', 'GET'),
+    (303, 'POST', 'GET'),
+    (303, 'PUT', 'GET'),
+    (307, 'POST', 'POST'),
+    (308, 'POST', 'POST'),
+    (302, 'PUT', 'PUT'),
+])
+def test_redirect_method(server, access, status, method, expected):
+    server.respond('/old', status, {'Location': '/new'})
+    server.respond('/new', 200, body=b'new')
+
+    response = access(server.url('/old'), method=method, body='body')
+
+    assert response.content == 'new'
+    new = server.requests[1]
+    assert new.method == expected
+    assert new.body == (b'body' if expected != 'GET' else b'')
+    if expected == 'GET':
+        assert 'Content-Type' not in new.headers
+
+
+def test_permanent_redirect_is_remembered(server, access):
+    server.respond('/old', lambda request: (
+        301, {'Location': request.path.replace('/old', '/new')}, b''))
+    server.respond('/new', 200, body=b'new')
+
+    access(server.url('/old'), params={'a': 'b'})
+    access(server.url('/old'), params={'a': 'c'})
+
+    assert paths(server) == [('GET', '/old?a=b'), ('GET', '/new?a=b'),
+                             ('GET', '/new?a=c')]
+    assert len(access.authomatic.redirect_cache) == 1
+
+
+def test_temporary_redirect_is_not_remembered(server, access):
+    server.respond('/old', 302, {'Location': '/new'})
+    server.respond('/new', 200, body=b'new')
+
+    access(server.url('/old'))
+    access(server.url('/old'))
+
+    assert paths(server) == [('GET', '/old'), ('GET', '/new')] * 2
+
+
+def test_cross_origin_redirect_drops_credentials(server, access):
+    other = server.url('/new').replace('127.0.0.1', 'localhost')
+    server.respond('/old', 301, {'Location': other})
+    server.respond('/new', 200, body=b'new')
+
+    access(server.url('/old'), headers={'Cookie': 'foo=bar', 'X-Foo': 'foo'})
+    access(server.url('/old'))
+
+    old, new = server.requests[:2]
+    assert old.headers['Authorization'] == 'Bearer token'
+    assert old.headers['Cookie'] == 'foo=bar'
+    assert 'Authorization' not in new.headers
+    assert 'Cookie' not in new.headers
+    assert new.headers['X-Foo'] == 'foo'
+    # Not remembered.
+    assert paths(server)[2] == ('GET', '/old')
+    assert len(access.authomatic.redirect_cache) == 0
+
+
+def test_max_redirects(server, access):
+    server.respond('/a', 302, {'Location': '/b'})
+    server.respond('/b', 302, {'Location': '/a'})
+
+    with pytest.raises(FetchError) as e:
+        access(server.url('/a'), max_redirects=3)
+    assert 'Max redirects' in str(e.value)
+    assert len(server.requests) == 4
+
+
+def test_redirect_to_itself(server, access):
+    server.respond('/a', 302, {'Location': '/a'})
+
+    with pytest.raises(FetchError):
+        access(server.url('/a'))
+
+
+def test_redirect_cache():
+    redirects = RedirectCache(maxsize=2)
+
+    redirects.add('http://a/1?x=1', 'http://a/2?x=1')
+    # Changes the query string.
+    redirects.add('http://a/3?x=1', 'http://a/4')
+    assert redirects.resolve('http://a/1?y=2') == 'http://a/2?y=2'
+    assert redirects.resolve('http://a/3') == 'http://a/3'
+
+    redirects.add('http://b/1', 'http://b/2')
+    # http://a/1 was used more recently than http://b/1.
+    redirects.resolve('http://a/1')
+    redirects.add('http://c/1', 'http://c/2')
+    assert len(redirects) == 2
+    assert redirects.resolve('http://b/1') == 'http://b/1'
+    assert redirects.resolve('http://a/1') == 'http://a/2'
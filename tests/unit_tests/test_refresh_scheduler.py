@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+
+import pytest
+
+from authomatic.refresh import RefreshScheduler
+
+
+TOKEN_BODY = json.dumps({'access_token': 'new', 'token_type': 'Bearer',
+                         'expires_in': 3600}).encode('utf-8')
+
+
+@pytest.fixture
+def credentials(make_authomatic, make_credentials):
+    return make_credentials(make_authomatic(), expire_in=3600)
+
+
+@pytest.fixture
+def scheduler():
+    events = []
+    done = threading.Event()
+
+    def on_refresh(key, credentials):
+        events.append(('refresh', key, credentials))
+        done.set()
+
+    def on_error(key, credentials, error):
+        events.append(('error', key, error))
+        done.set()
+
+    # The margin is longer than the lifetime, so the refresh is due now.
+    scheduler = RefreshScheduler(margin=4000, jitter=0, retry_delay=100,
+                                 on_refresh=on_refresh, on_error=on_error)
+    scheduler.events = events
+    scheduler.done = done
+    yield scheduler
+    scheduler.stop()
+
+
+def wait(scheduler):
+    assert scheduler.done.wait(5)
+    # Let the callback finish updating the scheduler.
+    time.sleep(0.05)
+
+
+def test_refreshes_due_credentials(server, scheduler, credentials):
+    server.respond('/token', 200, {'Content-Type': 'application/json'},
+                   TOKEN_BODY)
+
+    scheduler.register(credentials, 'key')
+    wait(scheduler)
+
+    assert scheduler.events == [('refresh', 'key', credentials)]
+    assert credentials.token == 'new'
+    assert scheduler.stats['refreshed'] == 1
+    assert len(scheduler) == 1
+    # The new expiration is still within the margin.
+    assert scheduler.next_refresh('key') == pytest.approx(time.time() + 100,
+                                                          abs=5)
+
+
+def test_schedules_before_expiration(credentials):
+    scheduler = RefreshScheduler(margin=300, jitter=60)
+    with scheduler:
+        scheduler.register(credentials, 'key')
+        due = scheduler.next_refresh('key')
+
+    assert credentials.expiration_time - 360 <= due <= \
+        credentials.expiration_time - 300
+
+
+def test_never_expiring_credentials_are_not_scheduled(credentials):
+    credentials.expiration_time = 0
+
+    with RefreshScheduler() as scheduler:
+        scheduler.register(credentials, 'key')
+
+        assert scheduler.next_refresh('key') is None
+        assert len(scheduler) == 1
+
+
+@pytest.mark.parametrize('status', [400, 401, 403])
+def test_drops_credentials_which_cannot_be_refreshed(server, scheduler,
+                                                     credentials, status):
+    server.respond('/token', status, {}, b'{"error": "invalid_grant"}')
+
+    scheduler.register(credentials, 'key')
+    wait(scheduler)
+
+    (kind, key, response), = scheduler.events
+    assert (kind, key, response.status) == ('error', 'key', status)
+    assert scheduler.stats['dropped'] == 1
+    assert len(scheduler) == 0
+    assert scheduler.next_refresh('key') is None
+
+
+@pytest.mark.parametrize('status', [404, 408, 429, 500])
+def test_retries_transient_failures(server, scheduler, credentials, status):
+    server.respond('/token', status, {}, b'')
+
+    scheduler.register(credentials, 'key')
+    wait(scheduler)
+
+    (kind, key, response), = scheduler.events
+    assert (kind, key, response.status) == ('error', 'key', status)
+    assert scheduler.stats['failed'] == 1
+    assert scheduler.stats['dropped'] == 0
+    assert scheduler.next_refresh('key') == pytest.approx(time.time() + 100,
+                                                          abs=5)
+
+
+def test_honors_retry_after(server, scheduler, credentials):
+    server.respond('/token', 429, {'Retry-After': '1000'}, b'')
+
+    scheduler.register(credentials, 'key')
+    wait(scheduler)
+
+    assert scheduler.stats['failed'] == 1
+    assert scheduler.next_refresh('key') == pytest.approx(time.time() + 1000,
+                                                          abs=5)
+
+
+def test_retry_after_shorter_than_retry_delay(server, scheduler,
+                                              credentials):
+    server.respond('/token', 503, {'Retry-After': '10'}, b'')
+
+    scheduler.register(credentials, 'key')
+    wait(scheduler)
+
+    assert scheduler.next_refresh('key') == pytest.approx(time.time() + 10,
+                                                          abs=5)
+
+
+def test_limits_concurrent_refreshes_per_provider(server, make_authomatic,
+                                                   make_credentials):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def token(request):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return 200, {'Content-Type': 'application/json'}, TOKEN_BODY
+
+    server.respond('/token', token)
+    authomatic = make_authomatic()
+    refreshed = []
+    done = threading.Event()
+
+    def on_refresh(key, credentials):
+        refreshed.append(key)
+        if len(refreshed) == 5:
+            done.set()
+
+    with RefreshScheduler(margin=4000, jitter=0, max_workers=5,
+                          max_per_provider=2,
+                          on_refresh=on_refresh) as scheduler:
+        for key in range(5):
+            scheduler.register(make_credentials(authomatic,
+                                                refresh_token=str(key)), key)
+        assert done.wait(5)
+
+    assert sorted(refreshed) == [0, 1, 2, 3, 4]
+    assert running[1] == 2
+    assert scheduler.stats['deferred'] > 0
+
+
+def test_unregister_skips_callbacks(server, scheduler, credentials):
+    started = threading.Event()
+    release = threading.Event()
+
+    def token(request):
+        started.set()
+        release.wait(5)
+        return 200, {'Content-Type': 'application/json'}, TOKEN_BODY
+
+    server.respond('/token', token)
+
+    scheduler.register(credentials, 'key')
+    assert started.wait(5)
+    scheduler.unregister('key')
+    release.set()
+    scheduler.stop()
+
+    assert scheduler.events == []
+    assert len(scheduler) == 0
+
+
+def test_register_after_stop(credentials):
+    scheduler = RefreshScheduler()
+    scheduler.stop()
+
+    with pytest.raises(RuntimeError):
+        scheduler.register(credentials)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from authomatic import Authomatic, six
+from authomatic.core import ProviderRegistry, _basic_authorization
+from authomatic.exceptions import ConfigError
+from authomatic.providers import oauth2
+
+from tests.unit_tests.conftest import Local
+
+
+def config(**providers):
+    result = {'local': {'class_': Local, 'id': 1,
+                        'consumer_key': 'key', 'consumer_secret': 'secret'}}
+    result.update(providers)
+    return result
+
+
+def test_compiles_the_config():
+    registry = ProviderRegistry(config(
+        fb={'class_': 'oauth2.Facebook', 'id': 2},
+        __defaults__={'scope': ['email'], 'consumer_key': 'default'},
+    ))
+
+    assert registry.classes == {'local': Local, 'fb': oauth2.Facebook}
+    assert registry.names_by_id == {1: 'local', 2: 'fb'}
+    assert registry.type_ids[oauth2.Facebook] == \
+        oauth2.Facebook.get_type_id()
+    assert registry.type_classes[Local.get_type()] is oauth2.OAuth2
+    assert registry.basic_auth[('key', 'secret')] == \
+        _basic_authorization('key', 'secret')
+
+
+def test_provider_class():
+    registry = ProviderRegistry(config())
+
+    assert registry.provider_class('local') is Local
+
+    with pytest.raises(ConfigError):
+        registry.provider_class('missing')
+
+
+def test_providers_added_later_are_resolved():
+    cfg = config()
+    registry = ProviderRegistry(cfg)
+    cfg['fb'] = {'class_': 'oauth2.Facebook', 'id': 2}
+
+    assert registry.provider_class('fb') is oauth2.Facebook
+    assert registry.name_by_id(2) == 'fb'
+    assert registry.settings_of('fb')['id'] == 2
+
+
+def test_settings_of_applies_defaults():
+    registry = ProviderRegistry(config(
+        fb={'class_': 'oauth2.Facebook', 'id': 2, 'scope': [],
+            'consumer_key': 'fb-key'},
+        __defaults__={'scope': ['email'], 'consumer_key': 'default',
+                      'popup': True},
+    ))
+
+    settings = registry.settings_of('fb')
+
+    # Falsy values don't override the defaults.
+    assert settings['scope'] == ['email']
+    assert settings['consumer_key'] == 'fb-key'
+    assert settings['popup'] is True
+    assert registry.settings_of('local')['consumer_key'] == 'key'
+
+
+@pytest.mark.skipif(six.PY2, reason='No read-only mappings on Python 2.')
+def test_settings_are_read_only():
+    registry = ProviderRegistry(config())
+
+    with pytest.raises(TypeError):
+        registry.settings_of('local')['consumer_key'] = 'other'
+
+
+def test_name_by_id():
+    registry = ProviderRegistry(config(fb={'class_': 'oauth2.Facebook',
+                                           'id': 2}))
+
+    assert registry.name_by_id(1) == 'local'
+    assert registry.name_by_id(2) == 'fb'
+
+    with pytest.raises(Exception):
+        registry.name_by_id(3)
+
+
+def test_duplicate_ids():
+    with pytest.raises(ConfigError) as excinfo:
+        ProviderRegistry(config(fb={'class_': 'oauth2.Facebook', 'id': 1}))
+
+    assert 'same id=1' in excinfo.value.message
+
+
+@pytest.mark.parametrize('provider_id', ['2', 2.0, True])
+def test_non_integer_id(provider_id):
+    with pytest.raises(ConfigError):
+        ProviderRegistry(config(fb={'class_': 'oauth2.Facebook',
+                                    'id': provider_id}))
+
+
+@pytest.mark.parametrize('provider_config', [
+    {'id': 2},
+    {'class_': 'oauth2.Missing', 'id': 2},
+    {'class_': 'foo.bar.Baz', 'id': 2},
+])
+def test_invalid_class(provider_config):
+    with pytest.raises(ConfigError):
+        ProviderRegistry(config(other=provider_config))
+
+
+def test_class_not_in_provider_id_map():
+    class Unmapped(oauth2.OAuth2):
+        pass
+
+    with pytest.raises(ConfigError) as excinfo:
+        ProviderRegistry(config(other={'class_': Unmapped, 'id': 2}))
+
+    assert 'PROVIDER_ID_MAP' in excinfo.value.message
+
+
+def test_authomatic_validates_the_config():
+    with pytest.raises(ConfigError):
+        Authomatic(config(fb={'class_': 'oauth2.Facebook', 'id': 1}),
+                   'secret')
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import zlib
+
+import pytest
+
+from authomatic.core import Response
+from authomatic.transports import BufferedResponse, HTTPClientTransport
+
+
+def response(body, headers=None):
+    return Response(BufferedResponse(200, 'OK', headers or [], body))
+
+
+def test_iter_content():
+    chunks = list(response(b'abcdefg').iter_content(3))
+    assert chunks == [b'abc', b'def', b'g']
+
+
+def test_iter_content_after_content():
+    r = response(b'abcdefg')
+    assert r.content == 'abcdefg'
+    assert list(r.iter_content(4)) == [b'abcd', b'efg']
+
+
+def test_iter_lines_across_chunks():
+    r = response(b'foo\r\nbar\nbaz\nqux')
+
+    assert list(r.iter_lines(chunk_size=2)) == [b'foo', b'bar', b'baz',
+                                                 b'qux']
+
+
+def test_iter_lines_keepends():
+    r = response(b'foo\nbar\n')
+    assert list(r.iter_lines(keepends=True)) == [b'foo\n', b'bar\n']
+
+
+def test_readinto():
+    r = response(b'abcde')
+    buffer_ = bytearray(3)
+
+    assert r.readinto(buffer_) == 3
+    assert buffer_ == b'abc'
+    assert r.readinto(buffer_) == 2
+    assert buffer_[:2] == b'de'
+    assert r.readinto(buffer_) == 0
+    assert r.raw_size == 5
+
+
+def test_save_to_file_object():
+    out = io.BytesIO()
+    assert response(b'x' * 100).save(out, chunk_size=7) == 100
+    assert out.getvalue() == b'x' * 100
+
+
+def test_save_to_path(tmpdir):
+    path = str(tmpdir.join('body'))
+    assert response(b'foo').save(path) == 3
+    with open(path, 'rb') as f:
+        assert f.read() == b'foo'
+
+
+def test_streamed_body_releases_pooled_connection(server):
+    server.respond('/', 200, body=b'line\n' * 1000)
+    transport = HTTPClientTransport()
+
+    r = Response(transport.request('GET', server.url('/')))
+    assert len(list(r.iter_lines(chunk_size=100))) == 1000
+    assert transport.pool.stats['idle'] == 1
+
+
+def test_close_discards_partially_read_connection(server):
+    server.respond('/', 200, body=b'x' * 100000)
+    transport = HTTPClientTransport()
+
+    r = Response(transport.request('GET', server.url('/')))
+    next(r.iter_content(10))
+    r.close()
+
+    stats = transport.pool.stats
+    assert stats['idle'] == 0
+    assert stats['discards'] == 1
+
+
+def gzipped(data):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb') as f:
+        f.write(data)
+    return out.getvalue()
+
+
+def raw_deflated(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def test_gzip():
+    body = gzipped(b'foo' * 1000)
+    r = response(body, [('Content-Encoding', 'gzip'),
+                        ('Content-Length', str(len(body))),
+                        ('Content-Type', 'text/plain')])
+
+    assert r.content == 'foo' * 1000
+    assert r.raw_size == len(body)
+    assert r.getheader('Content-Encoding') is None
+    assert r.getheader('Content-Length') is None
+    assert r.getheaders() == [('Content-Type', 'text/plain')]
+
+
+@pytest.mark.parametrize('body', [zlib.compress(b'foo' * 1000),
+                                  raw_deflated(b'foo' * 1000)])
+def test_deflate(body):
+    r = response(body, [('Content-Encoding', 'deflate')])
+    assert r.read() == b'foo' * 1000
+
+
+def test_decompresses_incrementally():
+    r = response(gzipped(b'0123456789' * 100), [('Content-Encoding', 'gzip')])
+
+    assert r.read(5) == b'01234'
+    assert b''.join(r.iter_content(7)) == (b'0123456789' * 100)[5:]
+    assert r.read(5) == b''
+
+
+def test_uncompressed_body_is_untouched():
+    r = response(b'foo', [('Content-Encoding', 'identity'),
+                          ('Content-Length', '3')])
+
+    assert r.read() == b'foo'
+    assert r.getheader('Content-Length') == '3'
+
+
+def test_requests_compressed_responses(server, make_authomatic,
+                                       make_credentials):
+    server.respond('/', 200, {'Content-Encoding': 'gzip',
+                              'Content-Type': 'application/json'},
+                   gzipped(b'{"foo": "bar"}'))
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+
+    r = authomatic.access(credentials, server.url('/'))
+
+    assert r.data == {'foo': 'bar'}
+    assert server.requests[0].headers['Accept-Encoding'] == 'gzip, deflate'
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import email.utils
+import time
+
+import pytest
+
+from authomatic.retry import RetryBudget, RetryPolicy
+from authomatic.transports import BufferedResponse
+
+
+def response(status, headers=None):
+    return BufferedResponse(status, '', headers or [], b'')
+
+
+def flaky(*statuses):
+    """Responds with the statuses in order and then with 200."""
+
+    statuses = list(statuses)
+
+    def respond(request):
+        status = statuses.pop(0) if statuses else 200
+        return status, {'Retry-After': '0'} if status == 429 else {}, b''
+    return respond
+
+
+def test_is_retryable():
+    policy = RetryPolicy()
+
+    assert policy.is_retryable(response(503))
+    assert policy.is_retryable(response(429))
+    assert not policy.is_retryable(response(404))
+    assert policy.is_retryable(error=IOError())
+    assert not RetryPolicy(exceptions=(IOError,)).is_retryable(
+        error=ValueError())
+
+
+def test_allows():
+    policy = RetryPolicy()
+
+    assert policy.allows('GET')
+    assert not policy.allows('POST')
+    assert policy.allows('POST', retry=True)
+    assert not policy.allows('GET', retry=False)
+
+
+def test_exponential_backoff_with_jitter(monkeypatch):
+    monkeypatch.setattr('random.uniform', lambda a, b: b)
+    policy = RetryPolicy(backoff=0.5, max_backoff=3)
+
+    assert [policy.delay(i) for i in range(5)] == [0.5, 1, 2, 3, 3]
+
+
+def test_retry_after():
+    policy = RetryPolicy(max_retry_after=60)
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+    assert policy.delay(0, response(503, [('Retry-After', '5')])) == 5
+    assert 25 < policy.delay(0, response(503, [('Retry-After', date)])) <= 30
+    # Too long.
+    assert policy.delay(0, response(503, [('Retry-After', '120')])) is None
+    # Ignored.
+    assert RetryPolicy(retry_after=False, backoff=0).delay(
+        0, response(503, [('Retry-After', '120')])) == 0
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert budget.stats['requests'] == 2
+    assert budget.stats['retries'] == 2
+    assert budget.stats['rejected'] == 1
+
+
+@pytest.fixture
+def access(make_authomatic, make_credentials):
+    def access(url, policy, **kwargs):
+        authomatic = make_authomatic(retry_policy=policy)
+        credentials = make_credentials(authomatic)
+        return authomatic.access(credentials, url, **kwargs)
+    return access
+
+
+def test_retries_get(server, access):
+    server.respond('/', flaky(503, 429))
+
+    r = access(server.url('/'), RetryPolicy(backoff=0))
+
+    assert r.status == 200
+    assert len(server.requests) == 3
+
+
+def test_gives_up_after_total(server, access):
+    server.respond('/', flaky(503, 503, 503))
+
+    r = access(server.url('/'), RetryPolicy(total=2, backoff=0))
+
+    assert r.status == 503
+    assert len(server.requests) == 3
+
+
+def test_doesnt_retry_post(server, access):
+    server.respond('/', flaky(503))
+
+    r = access(server.url('/'), RetryPolicy(backoff=0), method='POST')
+
+    assert r.status == 503
+    assert len(server.requests) == 1
+
+
+def test_budget_limits_retries(server, access):
+    server.respond('/', flaky(503, 503))
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=1)
+
+    r = access(server.url('/'), RetryPolicy(backoff=0, budget=budget))
+
+    assert r.status == 503
+    assert len(server.requests) == 2
+
+
+def test_refresh_is_retried(server, make_authomatic, make_credentials):
+    server.respond('/token', lambda request: (
+        (503, {}, b'') if len(server.requests) == 1 else
+        (200, {'Content-Type': 'application/json'},
+         b'{"access_token": "new", "expires_in": 3600}')))
+    authomatic = make_authomatic(retry_policy=RetryPolicy(backoff=0))
+    credentials = make_credentials(authomatic, refresh_token='retried')
+
+    r = credentials.refresh(force=True)
+
+    assert r.status == 200
+    assert credentials.token == 'new'
+    assert [request.method for request in server.requests] == ['POST'] * 2
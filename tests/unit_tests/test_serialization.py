@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from authomatic.core import (Credentials, _deserialize, _deserialize_compact,
+                             _serialize, _serialize_compact)
+from authomatic.exceptions import CredentialsError
+
+
+TOKEN = 'ya29.a0AfH6SMCxYz-4kx_Lq8vQtUvWx'
+
+
+@pytest.fixture
+def authomatic(make_authomatic):
+    return make_authomatic()
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_round_trip(authomatic, make_credentials, compact):
+    credentials = make_credentials(authomatic, token=TOKEN)
+
+    serialized = credentials.serialize(compact)
+    deserialized = authomatic.credentials(serialized)
+
+    assert deserialized.provider_name == 'local'
+    assert deserialized.provider_id == 1
+    assert deserialized.provider_class is credentials.provider_class
+    assert deserialized.token == TOKEN
+    assert deserialized.refresh_token == 'refresh'
+    assert deserialized.token_type == 'Bearer'
+    assert deserialized.expiration_time == credentials.expiration_time
+
+
+def test_compact_is_shorter_and_not_legacy(authomatic, make_credentials):
+    credentials = make_credentials(authomatic, token=TOKEN)
+
+    compact = credentials.serialize(compact=True)
+    legacy = credentials.serialize()
+
+    assert len(compact) < len(legacy)
+    assert legacy[:1].isdigit()
+    assert not compact[:1].isdigit() and compact[:1] != '-'
+    # The characters of the access token appear unchanged.
+    assert 'a0AfH6SMC' in compact
+
+
+@pytest.mark.parametrize('items', [
+    (),
+    (None, 0, -1, 2 ** 40, -2 ** 40),
+    ('', 'a', 'abcd', 'a-b_c', 'a.b/c+d=='),
+    ('00ff', 'deadbeef', '0'),
+    (u'žluťoučký kůň', u'a b\nc', '%0A'),
+    ('.'.join(['x'] * 40), 'x' * 300),
+    ('x' * 200000,),
+])
+def test_compact_items(items):
+    serialized = _serialize_compact(-5, '2-7', items)
+
+    provider_id, provider_type_id, decoded = _deserialize(serialized)
+
+    assert provider_id == -5
+    assert provider_type_id == '2-7'
+    assert decoded == [str(i) for i in items]
+
+
+def test_legacy_format_is_detected():
+    items = ('token', u'a b%c', None, 123)
+
+    for provider_id in (5, -5):
+        serialized = _serialize(provider_id, '2-7', items)
+
+        assert _deserialize(serialized) == (provider_id, '2-7',
+                                            ['token', u'a b%c', 'None',
+                                             '123'])
+
+
+def test_legacy_lower_case_escapes():
+    serialized = '5%0a2-7%0atoken'
+
+    assert _deserialize(serialized) == (5, '2-7', ['token'])
+
+
+def test_accepts_bytes():
+    serialized = _serialize_compact(5, '2-7', ('token',))
+
+    assert _deserialize_compact(serialized.encode('ascii')) == \
+        (5, '2-7', ['token'])
+
+
+def test_unsupported_version():
+    serialized = _serialize_compact(5, '2-7', ('token',))
+    data = bytearray(serialized[:4].encode('ascii'))
+    # The first base64url character holds the high bits of the version.
+    data[0] = ord('C')
+
+    with pytest.raises(CredentialsError) as excinfo:
+        _deserialize(data.decode('ascii') + serialized[4:])
+
+    assert 'version' in str(excinfo.value)
+
+
+@pytest.mark.parametrize('mutate', [
+    lambda s: s[:-1],
+    lambda s: s + 'AAAA',
+    lambda s: s[:4],
+    lambda s: s[:3] + '!' + s[4:],
+])
+def test_invalid_compact(mutate):
+    serialized = _serialize_compact(5, '2-7', ('token', 'x' * 10))
+
+    with pytest.raises(CredentialsError):
+        _deserialize(mutate(serialized))
+
+
+def test_deserialize_with_plain_config(authomatic, make_credentials):
+    serialized = make_credentials(authomatic).serialize(compact=True)
+
+    deserialized = Credentials.deserialize(authomatic.config, serialized)
+
+    assert deserialized.provider_name == 'local'
+    assert deserialized.token == 'token'
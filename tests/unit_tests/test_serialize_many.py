@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from authomatic import Authomatic
+from authomatic.core import Credentials, CredentialsRecord
+from authomatic.exceptions import ConfigError
+
+from tests.unit_tests.conftest import Local
+
+
+@pytest.fixture
+def authomatic():
+    return Authomatic({
+        'local': {'class_': Local, 'id': 1, 'consumer_key': 'key',
+                  'consumer_secret': 'secret'},
+        'tw': {'class_': 'oauth1.Twitter', 'id': 2, 'consumer_key': 'tw-key',
+               'consumer_secret': 'tw-secret'},
+    }, 'secret')
+
+
+@pytest.fixture
+def serialized(authomatic, make_credentials):
+    credentials = [
+        make_credentials(authomatic, token='a', refresh_token='r'),
+        make_credentials(authomatic, 'tw', token='b', token_secret='s',
+                         token_type='', refresh_token=''),
+        make_credentials(authomatic, token='c', refresh_token=''),
+    ]
+    return [item.serialize(compact=bool(i % 2))
+            for i, item in enumerate(credentials)]
+
+
+def test_deserialize_credentials(authomatic, serialized):
+    result = list(authomatic.deserialize_many(serialized))
+
+    assert all(isinstance(i, Credentials) for i in result)
+    assert [i.provider_name for i in result] == ['local', 'tw', 'local']
+    assert [i.token for i in result] == ['a', 'b', 'c']
+    assert result[0].refresh_token == 'r'
+    assert result[1].token_secret == 's'
+    assert result[0]._settings is authomatic
+
+
+def test_deserialize_tuples(authomatic, serialized):
+    result = list(authomatic.deserialize_many(serialized, output='tuple'))
+    expected = authomatic.credentials(serialized[0])
+
+    assert all(isinstance(i, CredentialsRecord) for i in result)
+    assert result[0] == CredentialsRecord('local', 1,
+                                          expected.provider_type_id, 'a',
+                                          'Bearer', 'r', '',
+                                          expected.expiration_time)
+    assert result[1].provider_name == 'tw'
+    assert result[1].token_secret == 's'
+
+
+def test_deserialize_dicts(authomatic, serialized):
+    result = list(authomatic.deserialize_many(serialized, output='dict'))
+
+    assert [i['token'] for i in result] == ['a', 'b', 'c']
+    assert set(result[0]) == set(CredentialsRecord._fields)
+
+
+def test_deserialize_passes_credentials_through(authomatic, serialized):
+    credentials = authomatic.credentials(serialized[0])
+
+    result = list(authomatic.deserialize_many([credentials]))
+    records = list(authomatic.deserialize_many([credentials],
+                                               output='tuple'))
+
+    assert result == [credentials]
+    assert records[0].token == 'a'
+
+
+def test_unknown_output(authomatic, serialized):
+    with pytest.raises(ConfigError):
+        authomatic.deserialize_many(serialized, output='list')
+
+
+@pytest.mark.parametrize('output', ['credentials', 'tuple', 'dict'])
+@pytest.mark.parametrize('compact', [False, True])
+def test_round_trip(authomatic, serialized, output, compact):
+    items = list(authomatic.deserialize_many(serialized, output=output))
+
+    reserialized = list(authomatic.serialize_many(items, compact=compact))
+
+    assert [authomatic.credentials(i).token for i in reserialized] == \
+        ['a', 'b', 'c']
+    if not compact:
+        assert [authomatic.credentials(i).serialize() for i in serialized] \
+            == reserialized
+
+
+def test_serialize_many_requires_id(authomatic, make_credentials):
+    credentials = make_credentials(authomatic)
+    credentials.provider_id = None
+
+    with pytest.raises(ConfigError):
+        list(authomatic.serialize_many([credentials]))
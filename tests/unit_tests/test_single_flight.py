@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+
+from authomatic import Authomatic
+from authomatic.core import SingleFlight
+from authomatic.providers import oauth1
+
+
+def run_concurrently(func, count):
+    results, errors = [], []
+
+    def target():
+        try:
+            results.append(func())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'result'
+
+    results, errors = run_concurrently(lambda: flights.do('key', slow), 5)
+
+    assert calls == [1]
+    assert sorted(results) == [('result', False)] + [('result', True)] * 4
+    assert flights.stats == dict(calls=5, coalesced=4)
+    assert len(flights) == 0
+
+
+def test_followers_get_the_exception():
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('foo')
+
+    results, errors = run_concurrently(lambda: flights.do('key', fail), 3)
+
+    assert results == []
+    assert len(errors) == 3
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_sequential_calls_are_not_coalesced():
+    flights = SingleFlight()
+
+    assert flights.do('key', lambda: 1) == (1, False)
+    assert flights.do('key', lambda: 2) == (2, False)
+
+
+@pytest.mark.parametrize('method, requests', [('GET', 1), ('POST', 5)])
+def test_access_coalesces_gets(server, make_authomatic, make_credentials,
+                               method, requests):
+    def slow(request):
+        time.sleep(0.2)
+        return 200, {}, b'body'
+    server.respond('/', slow)
+    authomatic = make_authomatic(single_flight=SingleFlight())
+    credentials = make_credentials(authomatic)
+
+    results, errors = run_concurrently(
+        lambda: authomatic.access(credentials, server.url('/'),
+                                  method=method).content, 5)
+
+    assert errors == []
+    assert results == ['body'] * 5
+    assert len(server.requests) == requests
+
+
+def slow_body(request):
+    time.sleep(0.2)
+    return 200, {}, b'body'
+
+
+@pytest.fixture
+def twitter(server, make_credentials):
+    authomatic = Authomatic({'tw': {'class_': oauth1.Twitter, 'id': 1,
+                                    'consumer_key': 'key',
+                                    'consumer_secret': 'secret'}},
+                            'secret', single_flight=SingleFlight())
+    credentials = make_credentials(authomatic, 'tw', token_secret='s',
+                                   token_type='', refresh_token='')
+    server.respond('/', slow_body)
+    return authomatic, credentials
+
+
+def test_access_coalesces_oauth1_gets(server, twitter):
+    authomatic, credentials = twitter
+
+    results, errors = run_concurrently(
+        lambda: authomatic.access(credentials, server.url('/'),
+                                  params={'a': 1}).content, 5)
+
+    assert errors == []
+    assert results == ['body'] * 5
+    assert len(server.requests) == 1
+    assert 'oauth_nonce' in server.requests[0].path + \
+        server.requests[0].headers.get('Authorization', '')
+
+
+def test_access_doesnt_coalesce_other_credentials(server, twitter,
+                                                  make_credentials):
+    authomatic, credentials = twitter
+    other = make_credentials(authomatic, 'tw', token='other',
+                             token_secret='s', token_type='',
+                             refresh_token='')
+    both = iter([credentials, other] * 3)
+
+    results, errors = run_concurrently(
+        lambda: authomatic.access(next(both), server.url('/')).content, 6)
+
+    assert errors == []
+    assert results == ['body'] * 6
+    # One request per credentials.
+    assert len(server.requests) == 2
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from authomatic.exceptions import FetchTimeoutError
+from authomatic.providers import _request_timeout
+
+
+def slow(seconds, status=200, headers=None):
+    def respond(request):
+        time.sleep(seconds)
+        return status, headers or {}, b'slow'
+    return respond
+
+
+def test_request_timeout_is_capped_by_deadline():
+    assert _request_timeout(None, None) == (None, None)
+    assert _request_timeout(10, None) == (10, 10)
+    assert _request_timeout((1, 10), 5) == (1, 5)
+    assert _request_timeout(None, 3) == (3, 3)
+
+
+def test_read_timeout(server, make_authomatic, make_credentials):
+    server.respond('/slow', slow(1))
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+
+    with pytest.raises(FetchTimeoutError):
+        authomatic.access(credentials, server.url('/slow'), timeout=0.1)
+
+
+def test_deadline_spans_redirects(server, make_authomatic, make_credentials):
+    server.respond('/a', slow(0.15, 302, {'Location': '/b'}))
+    server.respond('/b', slow(0.15, 302, {'Location': '/c'}))
+    server.respond('/c', slow(0.15))
+    authomatic = make_authomatic()
+    credentials = make_credentials(authomatic)
+
+    # Each request fits in the timeout, but not all of them in the deadline.
+    with pytest.raises(FetchTimeoutError):
+        authomatic.access(credentials, server.url('/a'), timeout=1,
+                          deadline=0.35)
+
+    response = authomatic.access(credentials, server.url('/a'), timeout=1,
+                                 deadline=5)
+    assert response.content == 'slow'
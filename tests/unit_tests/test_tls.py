@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import ssl
+import sys
+
+import pytest
+
+from authomatic.exceptions import ConfigError
+from authomatic.pool import ConnectionPool, TLSSessionCache, _HTTPSConnection
+
+
+class FakeSocket(object):
+
+    def __init__(self, session, reused):
+        self.session = session
+        self.session_reused = reused
+
+
+def test_tls_session_cache():
+    sessions = TLSSessionCache()
+    assert sessions.stats['resumption_ratio'] == 0.0
+
+    sessions.record('a:443', FakeSocket('first', False), handshake=True)
+    sessions.record('a:443', FakeSocket('second', True), handshake=True)
+    # Session ticket received after the handshake.
+    sessions.record('b:443', FakeSocket('third', False))
+
+    assert sessions.get('a:443') == 'second'
+    assert sessions.get('b:443') == 'third'
+    assert sessions.stats == dict(handshakes=2, resumed=1,
+                                  resumption_ratio=0.5)
+
+    sessions.clear()
+    assert sessions.get('a:443') is None
+
+
+def test_shared_ssl_context(make_authomatic):
+    context = ssl.create_default_context()
+    authomatic = make_authomatic(ssl_context=context)
+
+    assert authomatic.ssl_context is context
+    assert authomatic.connection_pool.ssl_context is context
+
+    connection = authomatic.connection_pool._new_connection('https',
+                                                           'example.com')
+    if hasattr(ssl, 'SSLSession'):
+        assert isinstance(connection, _HTTPSConnection)
+        assert connection._tls_sessions is \
+            authomatic.connection_pool.tls_sessions
+    assert connection._context is context
+
+    if sys.version_info >= (3, 5):
+        from authomatic import aio
+        assert aio._get_transport(authomatic).pool.ssl_context is context
+
+
+def test_ssl_context_of_connection_pool(make_authomatic):
+    pool = ConnectionPool()
+    authomatic = make_authomatic(connection_pool=pool)
+
+    assert authomatic.ssl_context is pool.ssl_context
+
+
+def test_ssl_context_conflicts_with_connection_pool(make_authomatic):
+    context = ssl.create_default_context()
+
+    with pytest.raises(ConfigError):
+        make_authomatic(connection_pool=ConnectionPool(), ssl_context=context)
+
+    pool = ConnectionPool(ssl_context=context)
+    authomatic = make_authomatic(connection_pool=pool, ssl_context=context)
+    assert authomatic.ssl_context is context
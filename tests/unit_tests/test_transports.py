@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from authomatic.transports import (BaseTransport, BufferedResponse,
+                                   HTTPClientTransport, Urllib3Response,
+                                   Urllib3Transport, split_timeout)
+
+
+class RecordingTransport(BaseTransport):
+
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        self.requests.append((method, url, body, headers))
+        return BufferedResponse(200, 'OK',
+                                [('Content-Type', 'application/json')],
+                                b'{"foo": "bar"}')
+
+
+def test_split_timeout():
+    assert split_timeout(None) == (None, None)
+    assert split_timeout(5) == (5, 5)
+    assert split_timeout((1, 2)) == (1, 2)
+
+
+def test_buffered_response():
+    response = BufferedResponse(200, 'OK', [('X-Foo', 'a'), ('x-foo', 'b')],
+                                b'body')
+    copy = response.copy()
+
+    assert response.getheader('X-FOO') == 'a, b'
+    assert response.getheader('X-Bar', 'default') == 'default'
+    assert response.read(2) == b'bo'
+    assert not response.isclosed()
+    assert response.read() == b'dy'
+    assert response.isclosed()
+    assert copy.read() == b'body'
+
+
+def test_http_client_transport(server):
+    server.respond('/foo', 201, {'X-Foo': 'bar'}, b'created')
+    transport = HTTPClientTransport()
+
+    response = transport.request('POST', server.url('/foo?a=b'), 'body',
+                                 {'Content-Type': 'text/plain'}, timeout=5)
+
+    assert response.status == 201
+    assert response.getheader('X-Foo') == 'bar'
+    assert response.read() == b'created'
+    request = server.requests[0]
+    assert (request.method, request.path, request.body) == \
+        ('POST', '/foo?a=b', b'body')
+
+
+def test_access_goes_through_transport(make_authomatic, make_credentials):
+    transport = RecordingTransport()
+    authomatic = make_authomatic(transport=transport)
+    credentials = make_credentials(authomatic)
+
+    response = authomatic.access(credentials, 'https://example.com/foo')
+
+    assert response.data == {'foo': 'bar'}
+    method, url, body, headers = transport.requests[0]
+    assert (method, url) == ('GET', 'https://example.com/foo')
+    assert headers['Authorization'] == 'Bearer token'
+
+
+class FakeUrllib3Response(object):
+
+    def __init__(self, drain=True):
+        self.status = 200
+        self.reason = 'OK'
+        self.version = 11
+        self.headers = {'X-Foo': 'bar'}
+        self.calls = []
+        if drain:
+            self.drain_conn = lambda: self.calls.append('drain_conn')
+
+    def close(self):
+        self.calls.append('close')
+
+    def release_conn(self):
+        self.calls.append('release_conn')
+
+
+def test_urllib3_response_drains_before_release():
+    fake = FakeUrllib3Response()
+    response = Urllib3Response(fake)
+
+    assert response.getheader('X-Foo') == 'bar'
+    response.close()
+    assert fake.calls == ['drain_conn', 'release_conn']
+
+
+def test_urllib3_response_closes_without_drain_conn():
+    fake = FakeUrllib3Response(drain=False)
+    Urllib3Response(fake).close()
+    assert fake.calls == ['close', 'release_conn']
+
+
+def test_urllib3_transport_doesnt_follow_redirects():
+    calls = []
+
+    class PoolManager(object):
+        def urlopen(self, method, url, **kwargs):
+            calls.append(kwargs)
+            return FakeUrllib3Response()
+
+    Urllib3Transport(PoolManager()).request('GET', 'https://example.com/')
+
+    assert calls[0]['redirect'] is False
+    assert calls[0]['retries'] is False
+    assert calls[0]['decode_content'] is False
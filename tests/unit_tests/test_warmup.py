@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import socket
+
+from authomatic import Authomatic
+from authomatic.pool import ConnectionPool
+from authomatic.providers.oauth2 import OAuth2
+
+
+class Warm(OAuth2):
+    user_authorization_url = 'https://example.com/authorize'
+    access_token_url = None
+    user_info_url = None
+
+
+PROVIDER_ID_MAP = [Warm]
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_preconnect(server):
+    server.respond('/', 200, body=b'foo')
+    pool = ConnectionPool()
+
+    assert pool.preconnect('http', server.host, timeout=5)
+    assert not pool.preconnect('http', server.host, timeout=5)
+
+    pool.request('http', server.host, 'GET', '/').read()
+
+    stats = pool.stats
+    assert stats['preconnects'] == 1
+    assert stats['warm_hits'] == 1
+    assert stats['misses'] == 0
+
+
+def test_warmup(server, monkeypatch):
+    server.respond('/token', 200, body=b'token')
+    monkeypatch.setattr(Warm, 'access_token_url', server.url('/token'))
+    monkeypatch.setattr(Warm, 'user_info_url', server.url('/me'))
+    authomatic = Authomatic({'warm': {'class_': Warm}}, 'secret')
+
+    # Both URLs have the same host.
+    assert len(authomatic.warmup()) == 1
+
+    authomatic.transport.request('GET', server.url('/token')).read()
+    assert authomatic.connection_pool.stats['warm_hits'] == 1
+
+
+def test_warmup_ignores_unreachable_hosts(monkeypatch):
+    url = 'http://127.0.0.1:{0}/token'.format(closed_port())
+    monkeypatch.setattr(Warm, 'access_token_url', url)
+    authomatic = Authomatic({'warm': {'class_': Warm}}, 'secret')
+
+    assert authomatic.warmup(timeout=1) == []
+    assert authomatic.connection_pool.stats['idle'] == 0